@@ -0,0 +1,53 @@
+"""Measure the construction time and memory of the API client.
+
+Three cases are compared: creating the client alone, creating it and using a
+single sub-handler, as a short-lived script would, and creating every chain
+handler, sub-handler, and websocket handler, which is what constructing the
+client used to do up front.
+
+Run with :code:`python benchmarks/client-construction.py`.
+"""
+
+import timeit
+import tracemalloc
+
+from web3data import Web3Data
+
+
+def client() -> Web3Data:
+    return Web3Data("<your key>")
+
+
+def single_handler() -> Web3Data:
+    w3d = Web3Data("<your key>")
+    w3d.eth.market
+    return w3d
+
+
+def all_handlers() -> Web3Data:
+    w3d = Web3Data("<your key>")
+    for name in w3d.CHAINS:
+        chain = getattr(w3d, name)
+        for subhandler in (*chain.SUBHANDLERS, "websocket"):
+            getattr(chain, subhandler)
+    return w3d
+
+
+def main(number: int = 200, repeat: int = 5):
+    print(f"{'case':16}{'time':>12}{'memory':>12}")
+    for label, construct in (
+        ("client", client),
+        ("single handler", single_handler),
+        ("all handlers", all_handlers),
+    ):
+        best = min(timeit.repeat(construct, number=number, repeat=repeat)) / number
+        tracemalloc.start()
+        instance = construct()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del instance
+        print(f"{label:16}{best * 1e6:>10.1f}us{size / 1024:>10.1f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure the time it takes to import the package and use its clients.
+
+Every statement runs in a fresh interpreter with :code:`-X importtime`, and
+the best cumulative import time of the web3data modules and their
+dependencies is reported.
+
+Run with :code:`python benchmarks/import-time.py`.
+"""
+
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import web3data": "import web3data",
+    "sync client": "from web3data import Web3Data; Web3Data('key').eth.market",
+    "async client": "from web3data import AsyncWeb3Data; AsyncWeb3Data('key').eth.market",
+    "websocket": "from web3data import Web3Data; Web3Data('key').eth.websocket",
+}
+
+
+def import_time(statement: str) -> float:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    total, started = 0, False
+    for line in process.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        # only count top-level imports, which include their dependencies
+        if name.strip() == "web3data":
+            started = True
+        if started and cumulative.strip().isdigit() and not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def main(repeat: int = 5):
+    print(f"{'case':16}{'import time':>14}")
+    for label, statement in STATEMENTS.items():
+        best = min(import_time(statement) for _ in range(repeat))
+        print(f"{label:16}{best:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
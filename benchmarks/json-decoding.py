@@ -0,0 +1,116 @@
+"""Compare the decoding time of the available JSON backends.
+
+The payloads mimic the responses the client parses most often: a page of
+block transactions with logs and token transfers included, a page of
+address transactions, and a websocket block message.
+
+Run with :code:`python benchmarks/json-decoding.py`.
+"""
+
+import json
+import random
+import timeit
+
+from web3data import jsonlib
+
+
+def hex_string(length: int) -> str:
+    return "0x" + "".join(random.choice("0123456789abcdef") for _ in range(length))
+
+
+def transaction(number: int, details: bool) -> dict:
+    record = {
+        "blockchainId": "1c9c969065fcd1cf",
+        "blockNumber": number,
+        "blockHash": hex_string(64),
+        "hash": hex_string(64),
+        "from": {"address": hex_string(40)},
+        "to": [{"address": hex_string(40)}],
+        "value": str(random.randrange(10**24)),
+        "fee": str(random.randrange(10**16)),
+        "gasLimit": str(random.randrange(10**6)),
+        "gasPrice": str(random.randrange(10**11)),
+        "gasUsed": str(random.randrange(10**6)),
+        "input": hex_string(random.randrange(8, 512)),
+        "nonce": str(random.randrange(10**5)),
+        "status": "0x1",
+        "timestamp": 1600000000000 + number,
+        "confirmations": random.randrange(100),
+    }
+    if details:
+        record["logs"] = [
+            {
+                "address": hex_string(40),
+                "data": [hex_string(64) for _ in range(2)],
+                "topics": [hex_string(64) for _ in range(3)],
+                "logIndex": str(index),
+            }
+            for index in range(random.randrange(1, 6))
+        ]
+        record["tokenTransfers"] = [
+            {
+                "tokenAddress": hex_string(40),
+                "from": hex_string(40),
+                "to": hex_string(40),
+                "amount": str(random.randrange(10**24)),
+                "decimals": "18",
+                "symbol": "TKN",
+            }
+            for _ in range(random.randrange(0, 3))
+        ]
+    return record
+
+
+def payloads() -> dict:
+    random.seed(0)
+    block = {
+        "status": 200,
+        "title": "OK",
+        "payload": {
+            "records": [transaction(11000000, details=True) for _ in range(100)]
+        },
+    }
+    address = {
+        "status": 200,
+        "title": "OK",
+        "payload": {
+            "totalRecords": 1000,
+            "records": [transaction(11000000 + i, details=False) for i in range(100)],
+        },
+    }
+    message = {
+        "jsonrpc": "2.0",
+        "method": "subscription",
+        "params": {
+            "subscription": hex_string(64),
+            "result": {"number": 11000000, "hash": hex_string(64)},
+        },
+    }
+    return {
+        "block transactions": json.dumps(block).encode("utf-8"),
+        "address transactions": json.dumps(address).encode("utf-8"),
+        "websocket message": json.dumps(message),
+    }
+
+
+def main(repeat: int = 5):
+    documents = payloads()
+    print(f"{'payload':24}{'size':>10}", *(f"{name:>12}" for name in jsonlib.BACKENDS))
+    for label, document in documents.items():
+        number = max(10, 2_000_000 // len(document))
+        timings = []
+        for backend in jsonlib.BACKENDS.values():
+            best = min(
+                timeit.repeat(
+                    lambda: backend.loads(document), number=number, repeat=repeat
+                )
+            )
+            timings.append(best / number * 1e6)
+        print(
+            f"{label:24}{len(document) // 1024:>8}KB",
+            *(f"{timing:>10.1f}us" for timing in timings),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare the peak memory of buffered and streamed record parsing.
+
+A large page of holder records is parsed once from a fully buffered body, as
+:code:`raw_query` does, and once chunk by chunk with the streaming record
+parser, as :code:`stream_query` does. Each record is discarded right away.
+
+Run with :code:`python benchmarks/record-streaming.py`.
+"""
+
+import json
+import random
+import time
+import tracemalloc
+
+from web3data import jsonlib
+from web3data.streaming import DEFAULT_CHUNK_SIZE, RecordParser
+
+
+def document(count: int) -> bytes:
+    random.seed(0)
+    records = [
+        {
+            "holderAddress": "0x%040x" % random.getrandbits(160),
+            "tokenAddress": "0x%040x" % random.getrandbits(160),
+            "numTokens": str(random.randrange(10**24)),
+            "decimals": "18",
+            "timestamp": 1600000000000 + index,
+        }
+        for index in range(count)
+    ]
+    payload = {"payload": {"totalRecords": count, "records": records}}
+    return json.dumps({"status": 200, "title": "OK", **payload}).encode("utf-8")
+
+
+def chunks(body: bytes):
+    for start in range(0, len(body), DEFAULT_CHUNK_SIZE):
+        yield body[start : start + DEFAULT_CHUNK_SIZE]
+
+
+def buffered(body: bytes) -> int:
+    content = b"".join(chunks(body))
+    return sum(1 for _ in jsonlib.loads(content)["payload"]["records"])
+
+
+def streamed(body: bytes) -> int:
+    parser, count = RecordParser(), 0
+    for chunk in chunks(body):
+        count += len(parser.feed(chunk))
+    return count + len(parser.close())
+
+
+def main(count: int = 100_000):
+    body = document(count)
+    print(f"{len(body) / 2**20:.1f}MB document with {count} records")
+    print(f"{'mode':12}{'peak memory':>14}{'time':>10}")
+    for label, parse in (("buffered", buffered), ("streamed", streamed)):
+        tracemalloc.start()
+        started = time.perf_counter()
+        assert parse(body) == count
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:12}{peak / 2**20:>12.1f}MB{elapsed:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure the cost of delivering websocket messages one by one or in batches.
+
+A burst of pending transaction messages is routed through the websocket
+handler, whose callback stores every transaction hash in an in-memory SQLite
+table. This is compared to batched delivery, where the callback inserts a
+whole batch with a single :code:`executemany`. The messages are decoded
+beforehand, so only routing, callback, and storage overhead is measured.
+
+Run with :code:`python benchmarks/websocket-batching.py`.
+"""
+
+import sqlite3
+import timeit
+
+from web3data.handlers.websocket import WebsocketHandler
+
+MESSAGES = [
+    {
+        "jsonrpc": "2.0",
+        "method": "subscription",
+        "params": {"subscription": "sub-1", "result": {"hash": f"0x{index:064x}"}},
+    }
+    for index in range(10000)
+]
+
+
+def route(batch_size) -> WebsocketHandler:
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE pending (hash TEXT)")
+    insert = "INSERT INTO pending VALUES (?)"
+
+    def store(ws, message):
+        db.execute(insert, (message["params"]["result"]["hash"],))
+
+    def store_batch(ws, batch):
+        db.executemany(
+            insert, [(message["params"]["result"]["hash"],) for message in batch]
+        )
+
+    handler = WebsocketHandler("<your key>", "<blockchain id>")
+    callback = store if batch_size is None else store_batch
+    internal_id = handler.register(
+        "pending_transaction", callback, batch_size=batch_size, max_latency=None
+    )
+    handler.external_registry["sub-1"] = internal_id
+    for message in MESSAGES:
+        handler._route(None, message)
+    return handler
+
+
+def main(number: int = 5, repeat: int = 5):
+    print(f"{'batch size':12}{'per message':>14}")
+    for batch_size in (None, 10, 100, 1000):
+        best = min(
+            timeit.repeat(lambda: route(batch_size), number=number, repeat=repeat)
+        )
+        per_message = best / number / len(MESSAGES) * 1e9
+        print(f"{str(batch_size or 1):12}{per_message:>12.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from os import environ
 
 from web3data import Web3Data
+from web3data.dispatch import Dispatcher
 
 
 def block_handler(ws, message):
@@ -17,6 +18,8 @@ def block_handler(ws, message):
 
 
 w3d = Web3Data(environ.get("AMBERDATA_API_KEY", ""))
+# query the block transactions off the socket thread, so reading messages never stalls
+w3d.eth.websocket.dispatcher = Dispatcher(workers=1)
 w3d.eth.websocket.on_open = lambda ws: print("{:15}{}".format("Block", "Value"))
 w3d.eth.websocket.register("block", block_handler)
 w3d.eth.websocket.run()
@@ -35,13 +35,13 @@ setup(
         "Typing :: Typed",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: Implementation :: PyPy",
     ],
     description="A Python library for the Amberdata web3 API",
     install_requires=requirements,
+    extras_require={"async": ["aiohttp>=3.7"], "orjson": ["orjson>=3.0"]},
     license="MIT license",
     long_description=readme + "\n\n" + history,
     long_description_content_type="text/x-rst",
@@ -49,6 +49,7 @@ setup(
     keywords="web3data,web3data-py,amberdata,ethereum,bitcoin,stellar,rinkeby,aion,litecoin,zcash",
     name="web3data",
     packages=find_packages(),
+    python_requires=">=3.7",
     setup_requires=setup_requirements,
     test_suite="tests",
     tests_require=test_requirements,
@@ -61,3 +61,71 @@ def test_address_handler(chain, method, parameters, raises):
             assert set(HEADERS.items()).issubset(
                 set(m.request_history[0].headers.items())
             )
+
+
+def test_address_handler_iter_transactions():
+    handler = AddressHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            [
+                {"json": {"payload": {"records": [1, 2]}}},
+                {"json": {"payload": {"records": [3]}}},
+            ],
+        )
+        records = handler.iter_transactions("ADDRESS", size=2)
+
+        assert m.call_count == 0
+        assert list(records) == [1, 2, 3]
+        assert m.call_count == 2
+        assert "page=1" in m.request_history[1].url
+        assert "size=2" in m.request_history[1].url
+
+
+def balances_response(request, context):
+    addresses = request.qs["addresses"][0].split(",")
+    if "fail" in addresses:
+        context.status_code = 500
+        return {"status": 500, "title": "Internal Server Error"}
+    if "limited" in addresses:
+        # an error reported only in the response envelope
+        return {"status": 429, "title": "Too Many Requests", "payload": {}}
+    return {"status": 200, "payload": {address: {"value": 1} for address in addresses}}
+
+
+def test_address_handler_balances_batch_chunked():
+    handler = AddressHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    addresses = [f"a{index}" for index in range(25)]
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=balances_response)
+        response = handler.balances_batch(addresses, chunk_size=10, workers=3)
+
+    assert m.call_count == 3
+    assert sorted(response["payload"]) == sorted(addresses)
+    assert "errors" not in response
+
+
+def test_address_handler_balances_batch_partial_failure():
+    handler = AddressHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    addresses = ["a", "b", "fail", "c", "limited", "d"]
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=balances_response)
+        response = handler.balances_batch(addresses, chunk_size=2)
+
+    assert response["status"] == 200
+    assert sorted(response["payload"]) == ["a", "b"]
+    assert [error["addresses"] for error in response["errors"]] == [
+        ["fail", "c"],
+        ["limited", "d"],
+    ]
+    assert all(isinstance(error["error"], APIError) for error in response["errors"])
+    assert "429" in str(response["errors"][1]["error"])
+
+
+def test_address_handler_balances_batch_total_failure():
+    handler = AddressHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=balances_response)
+        with pytest.raises(APIError):
+            handler.balances_batch(["fail", "fail"], chunk_size=1)
@@ -0,0 +1,672 @@
+import asyncio
+import gzip
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from aioresponses import aioresponses
+
+from web3data.cache import DiskCache, ResponseCache, SingleFlight
+from web3data.chains import Chains
+from web3data.client import AsyncWeb3Data
+from web3data.deadline import Deadline
+from web3data.exceptions import APIError, DeadlineExceededError, EmptyResponseError
+from web3data.handlers.aio import (
+    AsyncAddressHandler,
+    AsyncAPIHandler,
+    AsyncBlockHandler,
+    AsyncMarketHandler,
+    AsyncTokenHandler,
+    AsyncWebsocketHandler,
+)
+from web3data.ratelimit import RateLimiter
+from web3data.retry import RetryPolicy
+
+from . import API_PREFIX, HEADERS, RESPONSE
+
+ANY_URL = re.compile(r".*")
+# the end of the first 20-day window starting on 2020-01-01
+BOUNDARY = int(datetime(2020, 1, 21, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def query(handler, method, *args, **kwargs):
+    try:
+        return await getattr(handler, method)(*args, **kwargs)
+    finally:
+        await handler.session.close()
+
+
+@pytest.mark.parametrize(
+    "handler_class,method,parameters",
+    (
+        (AsyncAddressHandler, "transactions", ("ADDRESS",)),
+        (AsyncBlockHandler, "single", (1,)),
+        (AsyncMarketHandler, "price_pair_latest", ("eth_usd",)),
+        (AsyncTokenHandler, "holders_latest", ("ADDRESS",)),
+    ),
+)
+def test_async_handler(handler_class, method, parameters):
+    handler = handler_class(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=RESPONSE)
+        response = run(query(handler, method, *parameters, includePrice=True))
+
+    assert response == RESPONSE
+    (request_method, url), calls = next(iter(m.requests.items()))
+    assert request_method == "GET"
+    assert str(url).startswith(API_PREFIX)
+    assert "includePrice=True" in str(url)
+    assert calls[0].kwargs["headers"] == HEADERS
+
+
+def test_async_handler_unsupported_chain():
+    handler = AsyncTokenHandler(HEADERS, Chains.BTC)
+    with pytest.raises(APIError):
+        run(query(handler, "holders_latest", "ADDRESS"))
+
+
+@pytest.mark.parametrize(
+    "body,params,exception",
+    (
+        ("", {}, EmptyResponseError),
+        ("{}", {}, EmptyResponseError),
+        ("invalid", {}, APIError),
+        ("", {"format": "csv"}, EmptyResponseError),
+    ),
+)
+def test_async_raw_query_errors(body, params, exception):
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(ANY_URL, body=body)
+        with pytest.raises(exception):
+            run(query(handler, "raw_query", "http://example.com/", "", {}, params))
+
+
+def test_async_raw_query_csv():
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(ANY_URL, body="a,b")
+        response = run(
+            query(
+                handler, "raw_query", "http://example.com/", "", {}, {"format": "csv"}
+            )
+        )
+    assert response == "a,b"
+
+
+def test_async_rpc():
+    handler = AsyncAPIHandler("test-key", "test-id", Chains.ETH)
+    with aioresponses() as m:
+        m.post(ANY_URL, payload={"result": "0x1"})
+        response = run(query(handler, "rpc", "eth_gasPrice", []))
+
+    assert response == {"result": "0x1"}
+    (_, url), calls = next(iter(m.requests.items()))
+    assert str(url) == "https://rpc.web3api.io/?x-api-key=test-key"
+    assert calls[0].kwargs["json"]["method"] == "eth_gasPrice"
+
+
+def test_async_rpc_unsupported_chain():
+    handler = AsyncAPIHandler("test-key", "test-id", Chains.LTC)
+    with pytest.raises(APIError):
+        run(query(handler, "rpc", "eth_gasPrice", []))
+
+
+def test_async_client_shares_session():
+    async def main():
+        async with AsyncWeb3Data("test-key", pool_size=5) as client:
+            assert isinstance(client.eth, AsyncAPIHandler)
+            assert isinstance(client.eth.address, AsyncAddressHandler)
+            assert client.eth.market.session is client.session
+            assert client.btc.block.session is client.session
+            assert client.session.client.connector.limit == 5
+
+    run(main())
+
+
+def test_async_client_requires_async_with():
+    with pytest.raises(TypeError):
+        with AsyncWeb3Data("test-key"):
+            pass  # pragma: no cover
+
+
+def test_async_paginate():
+    async def collect(handler):
+        try:
+            return [r async for r in handler.iter_transfers("ADDRESS", size=2)]
+        finally:
+            await handler.session.close()
+
+    handler = AsyncTokenHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(ANY_URL, payload={"payload": {"records": [1, 2]}})
+        m.get(ANY_URL, payload={"payload": {"records": [3]}})
+        assert run(collect(handler)) == [1, 2, 3]
+
+
+def test_async_paginate_error_page():
+    async def collect(handler, records):
+        try:
+            async for record in handler.iter_transfers("ADDRESS", size=2):
+                records.append(record)
+        finally:
+            await handler.session.close()
+
+    handler = AsyncTokenHandler(HEADERS, Chains.ETH)
+    records = []
+    with aioresponses() as m:
+        m.get(ANY_URL, payload={"payload": {"records": [1, 2]}})
+        m.get(ANY_URL, payload={"status": 500, "message": "Internal server error"})
+        with pytest.raises(APIError):
+            run(collect(handler, records))
+    assert records == [1, 2]
+
+
+def test_async_paginate_prefetch():
+    async def collect(handler):
+        try:
+            iterator = handler.iter_transactions("ADDRESS", size=2, prefetch=3)
+            return [r async for r in iterator]
+        finally:
+            await handler.session.close()
+
+    handler = AsyncAddressHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        for page in (0, 1, 2):
+            m.get(
+                re.compile(rf".*page={page}.*"),
+                payload={
+                    "payload": {"records": [page * 2, page * 2 + 1][: 2 - page // 2]}
+                },
+            )
+        m.get(ANY_URL, payload={"payload": {"records": []}}, repeat=True)
+        assert run(collect(handler)) == [0, 1, 2, 3, 4]
+
+
+def test_async_sharded_query():
+    handler = AsyncMarketHandler(HEADERS, Chains.ETH)
+    start, boundary = BOUNDARY - 1, BOUNDARY
+    with aioresponses() as m:
+        m.get(ANY_URL, payload={"payload": {"data": [[boundary, "b"], [start, "a"]]}})
+        m.get(ANY_URL, payload={"payload": {"data": [[3e12, "c"], [boundary, "b"]]}})
+        response = run(
+            query(
+                handler,
+                "sharded_trade_pairs_historical",
+                "PAIR",
+                datetime(2020, 1, 1),
+                datetime(2020, 2, 1),
+                window=timedelta(days=20),
+            )
+        )
+    assert response["payload"]["data"] == [[start, "a"], [boundary, "b"], [3e12, "c"]]
+
+
+def test_async_sharded_query_failed_window():
+    handler = AsyncMarketHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(ANY_URL, payload={"payload": {"data": [[BOUNDARY - 1, "a"]]}})
+        m.get(ANY_URL, payload={"status": 429, "message": "Too many requests"})
+        with pytest.raises(APIError):
+            run(
+                query(
+                    handler,
+                    "sharded_trade_pairs_historical",
+                    "PAIR",
+                    datetime(2020, 1, 1),
+                    datetime(2020, 2, 1),
+                    window=timedelta(days=20),
+                )
+            )
+
+
+def test_async_scan_blocks():
+    async def collect(handler):
+        try:
+            scan = handler.scan_transactions("ADDRESS", 0, 4, shard_blocks=2, size=2)
+            return [record["blockNumber"] async for record in scan]
+        finally:
+            await handler.session.close()
+
+    handler = AsyncAddressHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(
+            re.compile(r".*blockNumberGte=0.*"),
+            payload={"payload": {"records": [{"blockNumber": 1}, {"blockNumber": 0}]}},
+        )
+        m.get(
+            re.compile(r".*blockNumberGte=0.*"),
+            payload={"payload": {"records": []}},
+        )
+        m.get(
+            re.compile(r".*blockNumberGte=2.*"),
+            payload={"payload": {"records": [{"blockNumber": 3}]}},
+        )
+        assert run(collect(handler)) == [0, 1, 3]
+
+
+def test_async_scan_blocks_error_page():
+    async def collect(handler):
+        try:
+            scan = handler.scan_transactions("ADDRESS", 0, 4, shard_blocks=2, size=2)
+            return [record["blockNumber"] async for record in scan]
+        finally:
+            await handler.session.close()
+
+    handler = AsyncAddressHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(
+            re.compile(r".*blockNumberGte=0.*"),
+            payload={"payload": {"records": [{"blockNumber": 1}]}},
+        )
+        m.get(
+            re.compile(r".*blockNumberGte=2.*"),
+            payload={"status": 429, "message": "Too many requests"},
+        )
+        with pytest.raises(APIError):
+            run(collect(handler))
+
+
+def test_async_balances_batch():
+    handler = AsyncAddressHandler(HEADERS, Chains.ETH)
+    with aioresponses() as m:
+        m.get(
+            re.compile(r".*addresses=a(%2C|%252C|,)b.*"),
+            payload={"payload": {"a": 1, "b": 2}},
+        )
+        m.get(re.compile(r".*addresses=c.*"), body="invalid")
+        response = run(query(handler, "balances_batch", ["a", "b", "c"], chunk_size=2))
+    assert response["payload"] == {"a": 1, "b": 2}
+    assert response["errors"][0]["addresses"] == ["c"]
+
+
+def test_async_rpc_batch():
+    handler = AsyncAPIHandler("test-key", "test-id", Chains.ETH)
+    with aioresponses() as m:
+        m.post(ANY_URL, payload=[{"id": 1, "result": "b"}, {"id": 0, "result": "a"}])
+        m.post(ANY_URL, payload=[{"id": 2, "result": "c"}])
+        results = run(query(handler, "rpc_batch", [("m", []), ("m", []), ("m", [])], 2))
+    assert [result["result"] for result in results] == ["a", "b", "c"]
+
+
+def test_async_rpc_batch_transport_error():
+    handler = AsyncAPIHandler("test-key", "test-id", Chains.ETH)
+    with aioresponses() as m:
+        m.post(ANY_URL, payload=[{"id": 0, "result": "a"}, {"id": 1, "result": "b"}])
+        m.post(ANY_URL, exception=aiohttp.ClientConnectionError("connection reset"))
+        m.post(ANY_URL, payload=[{"id": 4, "result": "e"}])
+        results = run(query(handler, "rpc_batch", [("m", [])] * 5, 2))
+
+    assert [result.get("result") for result in results] == ["a", "b", None, None, "e"]
+    assert results[2]["error"]["code"] == results[3]["error"]["code"] == -32603
+    assert isinstance(results[2]["error"]["data"], aiohttp.ClientConnectionError)
+
+
+def test_async_raw_query_cached():
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH, cache=ResponseCache())
+
+    async def main():
+        try:
+            return [await handler.single("1") for _ in range(3)]
+        finally:
+            await handler.session.close()
+
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=RESPONSE)
+        assert run(main()) == [RESPONSE] * 3
+    assert handler.cache.hits == 2
+
+
+def test_async_error_response_not_persisted(tmp_path):
+    handler = AsyncBlockHandler(
+        HEADERS, Chains.ETH, disk_cache=DiskCache(str(tmp_path / "db"))
+    )
+    block_hash = "0x" + "ab" * 32
+    with aioresponses() as m:
+        m.get(ANY_URL, status=503, payload={"status": 503})
+        with pytest.raises(APIError, match="503"):
+            run(query(handler, "single", block_hash))
+        assert len(handler.disk_cache) == 0
+        m.get(ANY_URL, payload=RESPONSE)
+        assert run(query(handler, "single", block_hash)) == RESPONSE
+    assert len(handler.disk_cache) == 1
+
+
+def test_async_raw_query_retries():
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH, retry=RetryPolicy(backoff=0))
+    with aioresponses() as m:
+        m.get(ANY_URL, status=503, body="unavailable")
+        m.get(ANY_URL, status=429, headers={"Retry-After": "0"})
+        m.get(ANY_URL, payload=RESPONSE)
+        assert run(query(handler, "single", "1")) == RESPONSE
+    assert handler.retry.retries == 2
+
+
+def test_async_rpc_retries():
+    handler = AsyncAPIHandler("key", "id", Chains.ETH, retry=RetryPolicy(backoff=0))
+    with aioresponses() as m:
+        m.post(ANY_URL, status=502)
+        m.post(ANY_URL, payload={"result": "0x1"})
+        assert run(query(handler, "rpc", "eth_gasPrice", [])) == {"result": "0x1"}
+    assert handler.retry.retries == 1
+
+
+def test_async_raw_query_rate_limited():
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH, rate_limiter=RateLimiter(100))
+
+    async def main():
+        try:
+            return await asyncio.gather(*(handler.single(i) for i in range(3)))
+        finally:
+            await handler.session.close()
+
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=RESPONSE, repeat=True)
+        assert run(main()) == [RESPONSE] * 3
+    assert handler.rate_limiter.throttled == 2
+
+
+def test_async_raw_query_coalesced():
+    handler = AsyncBlockHandler(HEADERS, Chains.ETH, singleflight=SingleFlight())
+
+    async def main():
+        try:
+            return await asyncio.gather(*(handler.transactions(1) for _ in range(3)))
+        finally:
+            await handler.session.close()
+
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=RESPONSE)
+        assert run(main()) == [RESPONSE] * 3
+    assert handler.singleflight.coalesced == 2
+
+
+def test_async_stream_holders_latest():
+    handler = AsyncTokenHandler(HEADERS, Chains.ETH)
+
+    async def collect():
+        try:
+            return [r async for r in handler.stream_holders_latest("ADDRESS")]
+        finally:
+            await handler.session.close()
+
+    document = {"payload": {"totalRecords": 2, "records": [{"a": 1}, {"b": 2}]}}
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=document)
+        assert run(collect()) == [{"a": 1}, {"b": 2}]
+        m.get(ANY_URL, status=401, body="Unauthorized")
+        with pytest.raises(APIError):
+            run(collect())
+
+
+def test_async_export_csv():
+    handler = AsyncAddressHandler(HEADERS, Chains.ETH)
+    sink = io.BytesIO()
+
+    async def export():
+        try:
+            rows = await handler.export_csv().transactions("ADDRESS")
+            rows = [row async for row in rows]
+            written = await handler.export_csv(sink, compress=True).logs("ADDRESS")
+            return rows, written
+        finally:
+            await handler.session.close()
+
+    with aioresponses() as m:
+        m.get(ANY_URL, body='a,b\n1,"x\ny"\n', repeat=True)
+        rows, written = run(export())
+
+    assert rows == [["a", "b"], ["1", "x\ny"]]
+    assert written == 12
+    assert gzip.decompress(sink.getvalue()) == b'a,b\n1,"x\ny"\n'
+    assert all("format=csv" in str(url) for _, url in m.requests)
+
+
+def test_async_raw_query_timeout():
+    handler = AsyncTokenHandler(HEADERS, Chains.ETH, timeout=(1, 2))
+
+    async def holders():
+        with Deadline(5):
+            return await query(handler, "holders_latest", "ADDRESS")
+
+    with aioresponses() as m:
+        m.get(ANY_URL, payload=RESPONSE)
+        run(holders())
+
+    calls = next(iter(m.requests.values()))
+    timeout = calls[0].kwargs["timeout"]
+    assert (timeout.sock_connect, timeout.sock_read) == (1, 2)
+    assert 4 < timeout.total <= 5
+
+
+def test_async_deadline_exceeded():
+    handler = AsyncAPIHandler("test-key", "test-id", Chains.ETH)
+
+    async def rpc():
+        with Deadline(0):
+            return await query(handler, "rpc", "eth_gasPrice", [])
+
+    with aioresponses() as m:
+        m.post(ANY_URL, payload={"result": "0x1"})
+        with pytest.raises(DeadlineExceededError):
+            run(rpc())
+    assert not m.requests
+
+
+class FakeWebsocketServer:
+    """A local websocket server confirming subscriptions and pushing messages."""
+
+    def __init__(self, messages=None, close_after=None):
+        self.messages = messages or {}  # event -> results to push once subscribed
+        self.close_after = close_after  # close after this many pushed messages
+        self.received = []
+        self.connections = []
+        app = web.Application()
+        app.router.add_get("/", self.handle)
+        self.server = TestServer(app)
+
+    @property
+    def url(self):
+        return str(self.server.make_url("/"))
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections.append(request.headers)
+        pushed = 0
+        async for message in ws:
+            payload = json.loads(message.data)
+            self.received.append(payload)
+            if payload["method"] == "unsubscribe":
+                await ws.send_json(
+                    {"jsonrpc": "2.0", "id": payload["id"], "result": True}
+                )
+                continue
+            event = payload["params"][0]
+            external_id = f"{event}-{len(self.received)}"
+            await ws.send_json(
+                {"jsonrpc": "2.0", "id": payload["id"], "result": external_id}
+            )
+            for result in self.messages.get(event, ()):
+                await ws.send_json(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "subscription",
+                        "params": {"subscription": external_id, "result": result},
+                    }
+                )
+                pushed += 1
+                if pushed == self.close_after:
+                    await ws.close()
+        return ws
+
+
+async def serve(server, test):
+    await server.server.start_server()
+    handler = AsyncWebsocketHandler("test-key", "test-id", url=server.url)
+    try:
+        return await test(handler)
+    finally:
+        await handler.close()
+        await handler.session.close()
+        await server.server.close()
+
+
+def test_async_websocket_subscriptions_share_connection():
+    server = FakeWebsocketServer(
+        messages={"block": [{"number": 1}, {"number": 2}], "pending": [{"hash": "0x"}]}
+    )
+
+    async def test(handler):
+        blocks, pending = handler.subscribe("block"), handler.subscribe("pending")
+        received = [await blocks.__anext__(), await pending.__anext__()]
+        received.append(await blocks.__anext__())
+        assert handler.external_registry[blocks.external_id] == blocks.internal_id
+        return received
+
+    received = run(serve(server, test))
+    assert [message["params"]["result"] for message in received] == [
+        {"number": 1},
+        {"hash": "0x"},
+        {"number": 2},
+    ]
+    assert len(server.connections) == 1
+    assert server.connections[0]["x-api-key"] == "test-key"
+    assert server.connections[0]["x-amberdata-blockchain-id"] == "test-id"
+    assert [payload["params"] for payload in server.received] == [
+        ["block"],
+        ["pending"],
+    ]
+
+
+def test_async_websocket_unsubscribe():
+    server = FakeWebsocketServer(messages={"block": [{"number": 1}]})
+
+    async def test(handler):
+        async with handler.subscribe("block") as blocks:
+            async for message in blocks:
+                external_id = blocks.external_id
+                break
+        remaining = [message async for message in blocks]
+        await asyncio.sleep(0.05)  # let the server answer the unsubscribe
+        return handler, external_id, remaining
+
+    handler, external_id, remaining = run(serve(server, test))
+    assert remaining == []
+    assert server.received[-1]["method"] == "unsubscribe"
+    assert server.received[-1]["params"] == [external_id]
+    assert not handler.internal_registry
+    assert not handler.external_registry
+    assert not handler.expected_ids
+
+
+def test_async_websocket_close_ends_iteration():
+    server = FakeWebsocketServer(
+        messages={"block": [{"number": 1}, {"number": 2}]}, close_after=2
+    )
+    closed = []
+
+    async def test(handler):
+        handler.on_close = closed.append
+        return [message async for message in handler.subscribe("block")]
+
+    messages = run(serve(server, test))
+    assert len(messages) == 2
+    assert len(closed) == 1
+
+
+def test_async_websocket_run_callbacks():
+    server = FakeWebsocketServer(
+        messages={"block": [{"number": 1}], "pending": [{"hash": "0x"}]},
+        close_after=2,
+    )
+    blocks, pending = [], []
+
+    async def on_pending(ws, message):
+        pending.append(message["params"]["result"])
+
+    async def test(handler):
+        handler.register("block", lambda ws, message: blocks.append(message))
+        handler.register("pending", on_pending)
+        await handler.run()
+        await asyncio.sleep(0)  # let the scheduled coroutine callback finish
+
+    run(serve(server, test))
+    assert blocks[0]["params"]["result"] == {"number": 1}
+    assert pending == [{"hash": "0x"}]
+
+
+def test_async_websocket_callback_error():
+    server = FakeWebsocketServer(messages={"block": [{"number": 1}]}, close_after=1)
+    errors = []
+
+    def fail(ws, message):
+        raise ValueError("callback failed")
+
+    async def test(handler):
+        handler.on_error = lambda ws, error: errors.append(error)
+        handler.register("block", fail)
+        await handler.run()
+
+    run(serve(server, test))
+    assert [str(error) for error in errors] == ["callback failed"]
+
+
+def test_async_websocket_cancelled_before_confirmation():
+    handler = AsyncWebsocketHandler("test-key", "test-id")
+    sent = []
+
+    async def send(payload):
+        sent.append(payload)
+
+    async def test():
+        handler._websocket_send = send
+        subscription = handler.subscribe("block")
+        handler.expected_ids.add(subscription.internal_id)
+        await subscription.unsubscribe()
+        handler._route(None, {"id": subscription.internal_id, "result": "sub-1"})
+        # data sent before the unsubscribe took effect is dropped
+        handler._route(None, {"params": {"subscription": "sub-1", "result": {}}})
+        await asyncio.sleep(0)
+        return [message async for message in subscription]
+
+    assert run(test()) == []
+    assert sent[0]["method"] == "unsubscribe"
+    assert sent[0]["params"] == ["sub-1"]
+    assert handler.expected_ids == {sent[0]["id"]}
+    assert not handler.internal_registry
+
+
+def test_async_client_websocket():
+    client = AsyncWeb3Data("test-key")
+    websocket = client.eth.websocket
+    assert isinstance(websocket, AsyncWebsocketHandler)
+    assert websocket.session is client.eth.session
+    assert websocket.ws is None
+
+
+def test_async_client_close_websocket():
+    server = FakeWebsocketServer(messages={"block": [{"number": 1}]})
+
+    async def test():
+        await server.server.start_server()
+        client = AsyncWeb3Data("test-key")
+        client.eth.websocket.url = server.url
+        try:
+            async with client:
+                subscription = client.eth.websocket.subscribe("block")
+                await subscription.__anext__()
+            return client.eth.websocket.connected
+        finally:
+            await server.server.close()
+
+    assert run(test()) is False
@@ -1,4 +1,5 @@
 import pytest
+import requests
 import requests_mock
 
 from web3data.chains import Chains
@@ -11,6 +12,7 @@ from web3data.handlers.market import MarketHandler
 from web3data.handlers.signature import SignatureHandler
 from web3data.handlers.token import TokenHandler
 from web3data.handlers.transaction import TransactionHandler
+from web3data.handlers.websocket import WebsocketHandler
 
 TEST_KEY = "test-key"
 TEST_ID = "test-id"
@@ -70,3 +72,116 @@ def test_non_rpc(chain):
     handler = APIHandler(TEST_KEY, TEST_ID, chain)
     with pytest.raises(APIError):
         handler.rpc("test-method", ["test-param"])
+
+
+def test_rpc_uses_shared_session():
+    session = requests.Session()
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH, session=session)
+    assert handler.address.session is session
+    with requests_mock.Mocker(session=session) as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=TEST_RPC)
+        assert handler.rpc("test-method", []) == TEST_RPC
+        assert m.call_count == 1
+
+
+def batch_response(request, context):
+    calls = request.json()
+    # answer in reverse order and fail one call to check matching by id
+    return [
+        (
+            {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000}}
+            if call["params"] == ["fail"]
+            else {"jsonrpc": "2.0", "id": call["id"], "result": call["params"][0]}
+        )
+        for call in reversed(calls)
+    ]
+
+
+def test_rpc_batch():
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH)
+    calls = [("eth_getBalance", [str(index)]) for index in range(5)]
+    calls[3] = ("eth_getBalance", ["fail"])
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=batch_response)
+        results = handler.rpc_batch(calls, batch_size=2)
+
+    assert m.call_count == 3
+    assert [len(request.json()) for request in m.request_history] == [2, 2, 1]
+    assert [result.get("result") for result in results] == ["0", "1", "2", None, "4"]
+    assert results[3]["error"] == {"code": -32000}
+
+
+def test_rpc_batch_batch_error():
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            [
+                {"json": {"error": {"code": -32600}}},
+                {"json": [{"jsonrpc": "2.0", "id": 2, "result": "0x0"}]},
+            ],
+        )
+        results = handler.rpc_batch([("a", []), ("b", []), ("c", []), ("d", [])], 2)
+
+    assert results[0]["error"] == results[1]["error"] == {"code": -32600}
+    assert results[2]["result"] == "0x0"
+    assert results[3]["error"]["code"] == -32603
+
+
+def test_rpc_batch_transport_error():
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH)
+    error = requests.ConnectionError("connection reset")
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            [
+                {"json": [{"id": 0, "result": "a"}, {"id": 1, "result": "b"}]},
+                {"exc": error},
+                {"json": [{"id": 4, "result": "e"}]},
+            ],
+        )
+        results = handler.rpc_batch([("m", [])] * 5, batch_size=2)
+
+    assert m.call_count == 3
+    assert [result.get("result") for result in results] == ["a", "b", None, None, "e"]
+    assert [result["id"] for result in results] == [0, 1, 2, 3, 4]
+    for result in results[2:4]:
+        assert result["error"]["code"] == -32603
+        assert result["error"]["data"] is error
+
+
+def test_rpc_batch_invalid_json():
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY, requests_mock.ANY, status_code=502, text="<html>"
+        )
+        results = handler.rpc_batch([("m", [])])
+
+    assert results[0]["error"]["code"] == -32603
+
+
+@pytest.mark.parametrize("chain", NON_RPC_CHAINS)
+def test_non_rpc_batch(chain):
+    handler = APIHandler(TEST_KEY, TEST_ID, chain)
+    with pytest.raises(APIError):
+        handler.rpc_batch([("test-method", [])])
+
+
+def test_api_handler_lazy_subhandlers():
+    handler = APIHandler(TEST_KEY, TEST_ID, Chains.ETH)
+    assert not set(APIHandler.SUBHANDLERS).intersection(vars(handler))
+    assert "websocket" not in vars(handler)
+
+    market = handler.market
+    assert vars(handler)["market"] is market is handler.market
+    assert market.initial_headers is handler.headers
+    assert "token" not in vars(handler)
+    assert isinstance(handler.websocket, WebsocketHandler)
+    assert handler.websocket.blockchain_id == TEST_ID
+    assert handler.websocket.blocks is handler.block
+
+    with pytest.raises(AttributeError):
+        handler.unknown
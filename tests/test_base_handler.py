@@ -125,3 +125,141 @@ def test_base_handler_valid_response_csv(chain):
 
         assert resp == "test"
         assert_request_mock(m)
+
+
+def page_query(total, calls):
+    def query(*args, page, size, **kwargs):
+        calls.append((args, page, size, kwargs))
+        start = page * size
+        return {"payload": {"records": list(range(start, min(start + size, total)))}}
+
+    return query
+
+
+@pytest.mark.parametrize("total,pages", ((0, 1), (5, 1), (10, 2), (25, 3)))
+def test_base_handler_paginate(total, pages):
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+    records = handler._paginate(page_query(total, calls), "arg", size=10, foo="bar")
+
+    assert not calls  # nothing is requested before iteration starts
+    assert list(records) == list(range(total))
+    assert len(calls) == pages
+    assert calls[0] == (("arg",), 0, 10, {"foo": "bar"})
+
+
+def test_base_handler_paginate_total_records():
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+
+    def query(page, size):
+        calls.append(page)
+        return {"payload": {"data": [page] * size, "totalRecords": 20}}
+
+    assert list(handler._paginate(query, size=10)) == [0] * 10 + [1] * 10
+    assert calls == [0, 1]
+
+
+def failing_page_query(failed_page):
+    def query(page, size):
+        if page == failed_page:
+            return {"status": 429, "message": "Too many requests"}
+        return {"payload": {"records": [page] * size}}
+
+    return query
+
+
+def test_base_handler_paginate_error_page():
+    handler = BaseHandler(Chains.ETH)
+    records = handler._paginate(failing_page_query(1), size=2)
+
+    assert [next(records), next(records)] == [0, 0]
+    with pytest.raises(APIError):
+        next(records)
+
+
+@pytest.mark.parametrize("total", (0, 5, 10, 25, 95))
+@pytest.mark.parametrize("prefetch", (1, 3, 8))
+def test_base_handler_paginate_prefetch(total, prefetch):
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+    query = page_query(total, calls)
+    records = handler._paginate(query, size=10, prefetch=prefetch)
+
+    assert list(records) == list(range(total))
+    # pages are only requested up to the window past the last one
+    assert len(calls) <= total // 10 + prefetch
+
+
+@pytest.mark.parametrize("prefetch", (1, 3))
+def test_base_handler_paginate_prefetch_error_page(prefetch):
+    handler = BaseHandler(Chains.ETH)
+    records = handler._paginate(failing_page_query(2), size=2, prefetch=prefetch)
+
+    assert [next(records) for _ in range(4)] == [0, 0, 1, 1]
+    with pytest.raises(APIError):
+        next(records)
+
+
+def test_base_handler_paginate_prefetch_stops_early():
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+    records = handler._paginate(page_query(1000, calls), size=10, prefetch=4)
+
+    assert [next(records) for _ in range(15)] == list(range(15))
+    records.close()
+    assert len(calls) <= 6
+
+
+def block_query(records_per_block, calls):
+    def query(*args, blockNumberGte, blockNumberLt, page, size, **kwargs):
+        calls.append((blockNumberGte, blockNumberLt, page))
+        records = [
+            {"blockNumber": block, "index": index}
+            for block in reversed(range(blockNumberGte, blockNumberLt))
+            for index in range(records_per_block(block))
+        ]
+        return {"payload": {"records": records[page * size : (page + 1) * size]}}
+
+    return query
+
+
+@pytest.mark.parametrize("workers", (1, 4))
+def test_base_handler_scan_blocks(workers):
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+    # a few very busy blocks force adaptive splitting of their shards
+    query = block_query(lambda block: 40 if block in (17, 18, 95) else block % 3, calls)
+    records = handler._scan_blocks(
+        query,
+        start_block=0,
+        end_block=100,
+        shard_blocks=25,
+        max_pages=2,
+        workers=workers,
+        size=10,
+    )
+
+    numbers = [record["blockNumber"] for record in records]
+    assert numbers == sorted(numbers)
+    assert len(numbers) == sum(40 if b in (17, 18, 95) else b % 3 for b in range(100))
+    # busy shards were split into smaller block ranges
+    assert (17, 18, 0) in calls
+    assert all(upper - lower <= 25 for lower, upper, _ in calls)
+
+
+def test_base_handler_scan_blocks_error_page():
+    handler = BaseHandler(Chains.ETH)
+    calls = []
+    crawl = block_query(lambda block: 1, calls)
+
+    def query(*args, blockNumberGte, **kwargs):
+        if blockNumberGte == 25:
+            return {"status": 503, "message": "Service unavailable"}
+        return crawl(*args, blockNumberGte=blockNumberGte, **kwargs)
+
+    records = handler._scan_blocks(
+        query, start_block=0, end_block=100, shard_blocks=25, workers=2, size=10
+    )
+    with pytest.raises(APIError):
+        list(records)
@@ -0,0 +1,397 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+from web3data.cache import (
+    IMMUTABLE_ENDPOINTS,
+    MISSING,
+    BlockCache,
+    DiskCache,
+    ResponseCache,
+    SingleFlight,
+)
+from web3data.chains import Chains
+from web3data.client import Web3Data
+from web3data.exceptions import APIError
+from web3data.handlers.base import BaseHandler
+from web3data.handlers.block import BlockHandler
+from web3data.handlers.signature import SignatureHandler
+from web3data.handlers.transaction import TransactionHandler
+from web3data.handlers.websocket import WebsocketHandler
+
+URL = "https://web3api.io/api/v2/market/prices/eth_usd/latest"
+HEADERS = {"x-amberdata-blockchain-id": "test-id"}
+
+
+def test_cache_key():
+    key = ResponseCache.make_key(URL, HEADERS, {"b": 1, "a": True})
+    assert key == (URL, "test-id", (("a", "True"), ("b", "1")))
+    assert key != ResponseCache.make_key(URL, {}, {"b": 1, "a": True})
+
+
+def test_cache_hit_miss():
+    cache = ResponseCache()
+    assert cache.get("key") is MISSING
+    cache.set("key", {"value": 1}, URL)
+    assert cache.get("key") == {"value": 1}
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 0)
+
+
+def test_cache_ttl():
+    cache = ResponseCache(ttl=10, rules={"/signatures/": None, "/prices/": 0})
+    with patch("web3data.cache.time.monotonic", return_value=100):
+        cache.set("sig", "a", "https://web3api.io/api/v2/signatures/0x1")
+        cache.set("latest", "b", URL)
+        cache.set("other", "c", "https://web3api.io/api/v2/blocks/1/")
+    assert len(cache) == 2
+
+    with patch("web3data.cache.time.monotonic", return_value=109):
+        assert cache.get("other") == "c"
+    with patch("web3data.cache.time.monotonic", return_value=1e9):
+        assert cache.get("other") is MISSING
+        assert cache.get("sig") == "a"
+    assert len(cache) == 1
+
+
+def test_cache_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", 1, URL)
+    cache.set("b", 2, URL)
+    cache.get("a")
+    cache.set("c", 3, URL)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+@pytest.mark.parametrize(
+    "url,immutable",
+    (
+        ("https://web3api.io/api/v2/signatures/0xa9059cbb", True),
+        ("https://web3api.io/api/v2/contracts/0x06012c8cf97b/", True),
+        ("https://web3api.io/api/v2/contracts/0x06012c8cf97b/functions", True),
+        ("https://web3api.io/api/v2/contracts/0x06012c8cf97b/audit", False),
+        (URL, False),
+    ),
+)
+def test_cache_immutable_endpoints(url, immutable):
+    cache = ResponseCache(ttl=5, rules=IMMUTABLE_ENDPOINTS)
+    assert (cache.ttl_for(url) is None) == immutable
+
+
+def test_raw_query_cached():
+    handler = BaseHandler(Chains.ETH, cache=ResponseCache())
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"a": 1})
+        for _ in range(3):
+            response = handler.raw_query("http://example.com/", "", HEADERS, {"x": 1})
+        handler.raw_query("http://example.com/", "", HEADERS, {"x": 2})
+
+    assert response == {"a": 1}
+    assert m.call_count == 2
+    assert handler.cache.hits == 2
+
+
+@pytest.mark.parametrize(
+    "error,raised",
+    (
+        ({"status_code": 429, "json": {"status": 429, "title": "Too Many"}}, True),
+        # an error reported only in the response envelope
+        ({"json": {"status": 500, "title": "Internal Server Error"}}, False),
+    ),
+)
+def test_error_response_not_cached(error, raised):
+    handler = SignatureHandler(
+        HEADERS, Chains.ETH, cache=ResponseCache(rules=IMMUTABLE_ENDPOINTS)
+    )
+    ok = {"status": 200, "payload": ["transfer(address,uint256)"]}
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, [error, {"json": ok}])
+        if raised:
+            with pytest.raises(APIError):
+                handler.details("0xa9059cbb")
+        else:
+            assert handler.details("0xa9059cbb")["status"] == 500
+        assert len(handler.cache) == 0
+        assert handler.details("0xa9059cbb") == ok
+        assert handler.details("0xa9059cbb") == ok
+
+    assert m.call_count == 2
+    assert handler.cache.hits == 1
+
+
+def test_client_shares_cache():
+    cache = ResponseCache()
+    client = Web3Data("test-key", cache=cache)
+    assert client.eth.market.cache is cache
+    assert client.btc.block.cache is cache
+
+
+def test_disk_cache_persists(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DiskCache(path)
+    assert cache.get(["key"]) is MISSING
+    cache.set(["key"], {"value": 1})
+    cache.close()
+
+    cache = DiskCache(path)
+    assert cache.get(["key"]) == {"value": 1}
+    assert (len(cache), cache.hits, cache.misses) == (1, 1, 0)
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=20)
+    with patch("web3data.cache.time.time", side_effect=range(10)):
+        cache.set("a", "x" * 8)
+        cache.set("b", "y" * 8)
+        cache.get("a")
+        cache.set("c", "z" * 8)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == "x" * 8
+    assert cache.evictions == 1
+
+    cache.max_bytes = 10
+    cache.compact()
+    assert len(cache) == 1
+
+
+def test_raw_query_persisted(tmp_path):
+    handler = BaseHandler(Chains.ETH, disk_cache=DiskCache(str(tmp_path / "db")))
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"a": 1})
+        for persist in (False, True, True):
+            handler.raw_query("http://example.com/", "", HEADERS, {}, persist=persist)
+
+    assert m.call_count == 2
+    assert handler.disk_cache.hits == 1
+
+
+def test_error_response_not_persisted(tmp_path):
+    handler = SignatureHandler(
+        HEADERS, Chains.ETH, disk_cache=DiskCache(str(tmp_path / "db"))
+    )
+    with requests_mock.Mocker() as m:
+        m.get(
+            requests_mock.ANY,
+            [
+                {"status_code": 429, "json": {"status": 429, "title": "Too Many"}},
+                {"json": {"status": 200, "payload": ["transfer(address,uint256)"]}},
+            ],
+        )
+        with pytest.raises(APIError, match="429"):
+            handler.details("0xa9059cbb")
+        assert len(handler.disk_cache) == 0
+        response = handler.details("0xa9059cbb")
+
+    assert response["status"] == 200
+    assert len(handler.disk_cache) == 1
+
+
+@pytest.mark.parametrize(
+    "block_id,persisted", (("0x" + "ab" * 32, True), ("ab" * 32, True), (100, False))
+)
+def test_block_persisted_by_hash(tmp_path, block_id, persisted):
+    handler = BlockHandler(
+        HEADERS, Chains.ETH, disk_cache=DiskCache(str(tmp_path / "db"))
+    )
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"a": 1})
+        handler.single(block_id)
+    assert len(handler.disk_cache) == int(persisted)
+
+
+@pytest.mark.parametrize("block_number,persisted", ((None, False), (100, True)))
+def test_transaction_persisted_when_mined(tmp_path, block_number, persisted):
+    handler = TransactionHandler(
+        HEADERS, Chains.ETH, disk_cache=DiskCache(str(tmp_path / "db"))
+    )
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            json={"payload": {"hash": "0x1", "blockNumber": block_number}},
+        )
+        handler.information("0x1")
+    assert len(handler.disk_cache) == int(persisted)
+
+
+def test_block_cache_confirmations():
+    cache = BlockCache(confirmations=10, tip_ttl=5)
+    cache.observe(Chains.ETH, 100)
+    with patch("web3data.cache.time.monotonic", return_value=0):
+        cache.set(Chains.ETH, 90, "deep", "a")
+        cache.set(Chains.ETH, 95, "tip", "b")
+        cache.set(Chains.BTC, 90, "other", "c")
+
+    assert cache.head(Chains.ETH) == 100
+    with patch("web3data.cache.time.monotonic", return_value=1e9):
+        assert cache.get("deep") == "a"
+        assert cache.get("tip") is MISSING
+        assert cache.get("other") is MISSING
+    assert len(cache) == 1
+
+
+def test_block_cache_reorg():
+    cache = BlockCache(confirmations=0)
+    cache.set(Chains.ETH, 5, "block", "a", block_hash="0xa")
+    cache.set(Chains.ETH, 5, "transactions", "b")
+    cache.observe(Chains.ETH, 5, "0xa")
+    assert len(cache) == 2
+
+    cache.observe(Chains.ETH, 5, "0xb")
+    assert cache.get("block") is MISSING
+    assert cache.get("transactions") is MISSING
+    assert (cache.reorgs, cache.evictions) == (1, 2)
+
+
+def test_block_handler_cache():
+    handler = BlockHandler(HEADERS, Chains.ETH, block_cache=BlockCache(confirmations=2))
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json={"payload": {"number": 8, "hash": "0x8"}})
+        m.get(
+            "https://web3api.io/api/v2/blocks//",
+            json={"payload": {"records": [{"number": 10}, {"number": 9}]}},
+        )
+        handler.total()
+        for _ in range(3):
+            assert handler.single(8)["payload"]["hash"] == "0x8"
+        handler.transactions(8)
+        handler.transactions(9)
+
+    assert handler.block_cache.head(Chains.ETH) == 10
+    assert m.call_count == 4
+    assert handler.block_cache.hits == 2
+
+
+def test_block_persisted_when_confirmed(tmp_path):
+    handler = BlockHandler(
+        HEADERS,
+        Chains.ETH,
+        disk_cache=DiskCache(str(tmp_path / "db")),
+        block_cache=BlockCache(confirmations=2),
+    )
+    handler.block_cache.observe(Chains.ETH, 10)
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"a": 1})
+        handler.single(8)
+        handler.single(9)
+    assert len(handler.disk_cache) == 1
+
+
+def test_block_track_head():
+    handler = BlockHandler(HEADERS, Chains.ETH, block_cache=BlockCache())
+    websocket = WebsocketHandler("test-key", "test-id")
+    handler.track_head(websocket)
+    internal_id, subscription = next(iter(websocket.internal_registry.items()))
+    assert subscription["payload"]["params"] == ("block",)
+
+    handler.block_cache.set(Chains.ETH, 7, "key", "a", block_hash="0xa")
+    message = {"params": {"result": {"number": 7, "hash": "0xb"}}}
+    subscription["callback"](None, message)
+    assert handler.block_cache.get("key") is MISSING
+    assert handler.block_cache.head(Chains.ETH) == 7
+
+
+def test_block_track_head_requires_cache():
+    with pytest.raises(ValueError):
+        BlockHandler(HEADERS, Chains.ETH).track_head(WebsocketHandler("key", "id"))
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_singleflight_threads():
+    group = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(2)
+        return {"a": 1}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(group.do, "key", load) for _ in range(5)]
+        wait_for(lambda: group.coalesced == 4)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert group.do("key", lambda: "fresh") == "fresh"
+
+
+def test_singleflight_error():
+    group = SingleFlight()
+    with pytest.raises(KeyError):
+        group.do("key", lambda: {}["missing"])
+    assert group.do("key", lambda: 1) == 1
+
+
+def test_singleflight_async():
+    group = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"a": 1}
+
+    async def main():
+        return await asyncio.gather(*(group.do_async("key", load) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert group.coalesced == 4
+    assert all(result is results[0] for result in results)
+
+
+def test_raw_query_coalesced():
+    handler = BlockHandler(HEADERS, Chains.ETH, singleflight=SingleFlight())
+
+    def respond(request, context):
+        wait_for(lambda: handler.singleflight.coalesced == 3)
+        return {"payload": {"records": []}}
+
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=respond)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: handler.transactions(1), range(4)))
+
+    assert m.call_count == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_raw_query_not_coalesced_across_api_keys():
+    group = SingleFlight()
+    handlers = [
+        BlockHandler(
+            dict(HEADERS, **{"x-api-key": key}), Chains.ETH, singleflight=group
+        )
+        for key in ("key-a", "key-b")
+    ]
+    keys = []
+
+    def do(key, function):
+        keys.append(key)
+        return function()
+
+    with requests_mock.Mocker() as m, patch.object(group, "do", side_effect=do):
+        m.get(requests_mock.ANY, json={"payload": {"records": []}})
+        for handler in handlers:
+            handler.transactions(1)
+
+    assert m.call_count == 2
+    assert keys[0] != keys[1]
+    assert keys[0][:-1] == keys[1][:-1]
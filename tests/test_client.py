@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from web3data.client import Web3Data
@@ -28,3 +30,41 @@ def test_client_initialized(client):
     assert isinstance(client, APIHandler)
     assert isinstance(client, APIHandler)
     assert isinstance(client, APIHandler)
+
+
+def test_client_shares_session():
+    client = Web3Data("test-key", pool_size=4)
+    for chain in (client.btc, client.eth, client.zec):
+        assert chain.session is client.session
+        for handler in (
+            chain.address,
+            chain.block,
+            chain.contract,
+            chain.market,
+            chain.signature,
+            chain.token,
+            chain.transaction,
+        ):
+            assert handler.session is client.session
+    assert client.session.get_adapter("https://web3api.io/")._pool_maxsize == 4
+
+
+def test_client_context_manager():
+    with Web3Data("test-key", keep_alive=False) as client:
+        assert client.session.headers["Connection"] == "close"
+
+
+def test_client_lazy_chain_handlers():
+    client = Web3Data("test-key", timeout=5)
+    assert "eth" not in vars(client)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        handlers = set(executor.map(lambda _: client.eth, range(32)))
+    assert handlers == {client.eth}
+    assert vars(client)["eth"] is client.eth
+    assert client.eth.blockchain_id == "1c9c969065fcd1cf"
+    assert client.eth.timeout == 5
+    assert "btc" not in vars(client)
+
+    with pytest.raises(AttributeError):
+        client.doge
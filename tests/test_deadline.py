@@ -0,0 +1,155 @@
+import time
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+from web3data.chains import Chains
+from web3data.client import Web3Data
+from web3data.deadline import (
+    DEFAULT_TIMEOUT,
+    ContextExecutor,
+    Deadline,
+    check_deadline,
+    current_deadline,
+    request_timeout,
+)
+from web3data.exceptions import APIError, DeadlineExceededError
+from web3data.handlers.api import APIHandler
+from web3data.handlers.token import TokenHandler
+from web3data.retry import RetryPolicy
+
+from . import HEADERS, RESPONSE
+
+
+def test_deadline_context():
+    assert current_deadline() is None
+    with Deadline(10) as outer:
+        assert current_deadline() is outer
+        assert 9 < outer.remaining() <= 10
+        with Deadline(60) as inner:
+            assert current_deadline() is inner
+            assert inner.expires == outer.expires
+        assert current_deadline() is outer
+    assert current_deadline() is None
+    check_deadline()
+
+
+def test_deadline_expired():
+    deadline = Deadline(0)
+    assert deadline.expired
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceededError):
+        deadline.check()
+    with deadline, pytest.raises(APIError):
+        check_deadline()
+
+
+@pytest.mark.parametrize(
+    "timeout,expected",
+    (
+        (None, None),
+        (5, (5, 5)),
+        ((1, 20), (1, 20)),
+    ),
+)
+def test_request_timeout(timeout, expected):
+    assert request_timeout(timeout) == expected
+    with Deadline(2):
+        capped = request_timeout(timeout)
+    assert capped[0] == min((expected or (2, 2))[0], capped[1])
+    assert 1 < capped[1] <= 2
+
+
+def test_context_executor():
+    with Deadline(10) as deadline, ContextExecutor(max_workers=2) as executor:
+        assert executor.submit(current_deadline).result() is deadline
+        assert (
+            list(executor.map(lambda _: current_deadline(), range(3))) == [deadline] * 3
+        )
+    with ContextExecutor(max_workers=1) as executor:
+        assert executor.submit(current_deadline).result() is None
+
+
+def test_raw_query_timeout():
+    handler = TokenHandler(HEADERS, Chains.ETH)
+    assert handler.timeout == DEFAULT_TIMEOUT
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=RESPONSE)
+        handler.holders_latest("ADDRESS")
+        with Deadline(5):
+            handler.holders_latest("ADDRESS")
+
+    assert m.request_history[0].timeout == DEFAULT_TIMEOUT
+    connect, read = m.request_history[1].timeout
+    assert 4 < connect <= 5 and 4 < read <= 5
+
+
+def test_raw_query_deadline_exceeded():
+    handler = TokenHandler(HEADERS, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=RESPONSE)
+        with Deadline(0), pytest.raises(DeadlineExceededError):
+            handler.holders_latest("ADDRESS")
+    assert m.call_count == 0
+
+
+def test_paginate_prefetch_deadline():
+    handler = TokenHandler(HEADERS, Chains.ETH, timeout=None)
+    page = {"payload": {"records": [{"a": 1}, {"a": 2}]}}
+    executors = []
+
+    class TrackedExecutor(ContextExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            executors.append(self)
+
+    with patch(
+        "web3data.handlers.base.ContextExecutor", TrackedExecutor
+    ), requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, json=page)
+        with Deadline(30):
+            records = handler.iter_holders_latest("ADDRESS", size=2, prefetch=3)
+            for _ in range(6):
+                next(records)
+            records.close()
+        # let pages still in flight finish before the mock is removed
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+    assert m.call_count >= 3
+    assert all(0 < request.timeout[1] <= 30 for request in m.request_history)
+
+
+def test_retry_respects_deadline():
+    retry = RetryPolicy(backoff=10, jitter=False)
+    handler = TokenHandler(HEADERS, Chains.ETH, retry=retry)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, status_code=503, json={"status": 503})
+        started = time.monotonic()
+        with Deadline(5), pytest.raises(APIError, match="503"):
+            handler.holders_latest("ADDRESS")
+
+    assert time.monotonic() - started < 1
+    assert m.call_count == 1
+    assert (retry.retries, retry.give_ups) == (0, 1)
+
+
+def test_rpc_timeout():
+    handler = APIHandler("test-key", "test-id", Chains.ETH, timeout=3)
+    assert handler.address.timeout == 3
+    with requests_mock.Mocker() as m:
+        m.post(requests_mock.ANY, json={"result": "0x1"})
+        handler.rpc("eth_gasPrice", [])
+        with Deadline(0), pytest.raises(DeadlineExceededError):
+            handler.rpc("eth_gasPrice", [])
+
+    assert m.call_count == 1
+    assert m.request_history[0].timeout == (3, 3)
+
+
+def test_client_timeout():
+    client = Web3Data("test-key", timeout=(1, 2))
+    assert client.timeout == (1, 2)
+    assert client.eth.timeout == (1, 2)
+    assert client.eth.market.timeout == (1, 2)
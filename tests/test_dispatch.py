@@ -0,0 +1,238 @@
+import threading
+
+import pytest
+
+from web3data.dispatch import BLOCK, CONFLATE, DROP_OLDEST, Batcher, Dispatcher
+
+TIMEOUT = 5
+
+
+def gated(dispatcher, key, received):
+    """Occupy the subscription's worker until the returned gate is opened."""
+    started, gate = threading.Event(), threading.Event()
+
+    def wait(item):
+        started.set()
+        gate.wait(TIMEOUT)
+        received.append(item)
+
+    dispatcher.submit(key, wait, "first")
+    assert started.wait(TIMEOUT)
+    return gate
+
+
+def test_dispatch_order():
+    dispatcher = Dispatcher(workers=4, drain_limit=3)
+    received = {"a": [], "b": []}
+    for number in range(50):
+        for key in received:
+            dispatcher.submit(key, received[key].append, number)
+    dispatcher.join()
+
+    assert received == {"a": list(range(50)), "b": list(range(50))}
+    assert dispatcher.stats()["a"] == {"depth": 0, "dropped": 0, "delivered": 50}
+    dispatcher.close()
+
+
+def test_dispatch_concurrent_subscriptions():
+    dispatcher = Dispatcher(workers=2)
+    event = threading.Event()
+    results = []
+
+    dispatcher.submit("a", lambda: results.append(event.wait(TIMEOUT)))
+    dispatcher.submit("b", event.set)
+    dispatcher.join()
+
+    assert results == [True]
+    dispatcher.close()
+
+
+def test_dispatch_drop_oldest():
+    dispatcher = Dispatcher(workers=1, maxsize=2, overflow=DROP_OLDEST)
+    received = []
+    gate = gated(dispatcher, "a", received)
+    for number in range(5):
+        dispatcher.submit("a", received.append, number)
+    assert dispatcher.stats()["a"]["depth"] == 2
+
+    gate.set()
+    dispatcher.join()
+
+    assert received == ["first", 3, 4]
+    assert dispatcher.stats()["a"] == {"depth": 0, "dropped": 3, "delivered": 3}
+    assert dispatcher.dropped == 3
+    dispatcher.close()
+
+
+def test_dispatch_conflate():
+    dispatcher = Dispatcher(workers=1, maxsize=3, overflow=CONFLATE)
+    received = []
+    gate = gated(dispatcher, "a", received)
+    for number in range(5):
+        dispatcher.submit("a", received.append, number)
+
+    gate.set()
+    dispatcher.join()
+
+    # the third message made the queue overflow, conflating it to the newest
+    assert received == ["first", 3, 4]
+    assert dispatcher.stats()["a"]["dropped"] == 3
+    dispatcher.close()
+
+
+def test_dispatch_block():
+    dispatcher = Dispatcher(workers=1, maxsize=1, overflow=BLOCK)
+    received = []
+    gate = gated(dispatcher, "a", received)
+    dispatcher.submit("a", received.append, 1)
+
+    producer = threading.Thread(
+        target=dispatcher.submit, args=("a", received.append, 2)
+    )
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+
+    gate.set()
+    producer.join(TIMEOUT)
+    dispatcher.join()
+
+    assert received == ["first", 1, 2]
+    assert dispatcher.dropped == 0
+    dispatcher.close()
+
+
+def test_dispatch_error():
+    dispatcher = Dispatcher(workers=1)
+    received = []
+
+    def fail(item):
+        raise ValueError(item)
+
+    dispatcher.submit("a", fail, 1)
+    dispatcher.submit("a", received.append, 2)
+    dispatcher.join()
+
+    assert received == [2]
+    dispatcher.close()
+
+
+def test_dispatch_remove():
+    dispatcher = Dispatcher()
+    dispatcher.submit("a", lambda: None)
+    dispatcher.join()
+    dispatcher.remove("a")
+    dispatcher.remove("unknown")
+
+    assert dispatcher.stats() == {}
+    dispatcher.close()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    ({"overflow": "unknown"}, {"workers": 0}, {"maxsize": 0}, {"drain_limit": 0}),
+)
+def test_dispatch_invalid(kwargs):
+    with pytest.raises(ValueError):
+        Dispatcher(**kwargs)
+
+
+def test_batcher_size():
+    batches = []
+    batcher = Batcher(batches.append, size=3, max_latency=None)
+    for number in range(7):
+        batcher.add(number)
+
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+    assert batcher.pending == 1
+    batcher.flush()
+    batcher.flush()
+    assert batches[-1] == [6]
+    assert batcher.batches == 3
+
+
+def test_batcher_latency():
+    flushed = threading.Event()
+    batches = []
+
+    def flush(batch):
+        batches.append(batch)
+        flushed.set()
+
+    batcher = Batcher(flush, size=100, max_latency=0.01)
+    batcher.add(1)
+    batcher.add(2)
+
+    assert flushed.wait(TIMEOUT)
+    assert batches == [[1, 2]]
+    assert batcher.pending == 0
+
+
+def test_batcher_flusher_thread():
+    threads = []
+    flushed = threading.Semaphore(0)
+
+    def flush(batch):
+        threads.append(threading.get_ident())
+        flushed.release()
+
+    batcher = Batcher(flush, size=100, max_latency=0.01)
+    for number in range(3):
+        batcher.add(number)
+        assert flushed.acquire(timeout=TIMEOUT)
+
+    assert len(set(threads)) == 1
+    assert threading.get_ident() not in threads
+    batcher.close()
+    batcher._flusher.join(TIMEOUT)
+    assert not batcher._flusher.is_alive()
+
+
+def test_batcher_flush_unlocked():
+    started, gate = threading.Event(), threading.Event()
+    batches = []
+
+    def flush(batch):
+        started.set()
+        gate.wait(TIMEOUT)
+        batches.append(batch)
+
+    batcher = Batcher(flush, size=2, max_latency=None)
+    thread = threading.Thread(target=lambda: [batcher.add(1), batcher.add(2)])
+    thread.start()
+    assert started.wait(TIMEOUT)
+
+    # adding items does not wait for the slow flush
+    adder = threading.Thread(target=batcher.add, args=(3,), daemon=True)
+    adder.start()
+    adder.join(1)
+    assert not adder.is_alive()
+    assert batcher.pending == 1
+    gate.set()
+    thread.join(TIMEOUT)
+    batcher.flush()
+    assert batches == [[1, 2], [3]]
+
+
+def test_batcher_reentrant_flush():
+    batches = []
+
+    def flush(batch):
+        batches.append(batch)
+        if batch == [1]:
+            batcher.add(2)
+            batcher.flush()
+
+    batcher = Batcher(flush, size=1, max_latency=None)
+    thread = threading.Thread(target=batcher.add, args=(1,), daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+
+    assert not thread.is_alive()
+    assert batches == [[1], [2]]
+
+
+@pytest.mark.parametrize("kwargs", ({"size": 0}, {"size": 1, "max_latency": 0}))
+def test_batcher_invalid(kwargs):
+    with pytest.raises(ValueError):
+        Batcher(list.append, **kwargs)
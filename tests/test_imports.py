@@ -0,0 +1,92 @@
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+ASYNC_MODULES = {"aiohttp", "asyncio"}
+# "-X importtime" is only supported by CPython
+importtime = pytest.mark.skipif(
+    platform.python_implementation() != "CPython",
+    reason="import times are only reported by CPython",
+)
+
+
+def import_times(statement):
+    """Return the cumulative import time in microseconds of every module loaded."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def loaded_modules(statement):
+    """Return the names of all modules loaded after running a statement."""
+    process = subprocess.run(
+        [sys.executable, "-c", f"import sys; {statement}; print(*sys.modules)"],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return set(process.stdout.split())
+
+
+@importtime
+def test_import_package():
+    times = import_times("import web3data")
+    # the bare package import stays cheaper than a small standard library
+    # module measured on the same machine
+    baseline = import_times("import json")
+    assert times["web3data"] < baseline["json"]
+    assert not {"requests", "websocket", "web3data.client"}.intersection(times)
+    assert not ASYNC_MODULES.intersection(times)
+
+
+@importtime
+@pytest.mark.parametrize(
+    "statement",
+    (
+        "from web3data import Web3Data; Web3Data('key').eth.market",
+        "from web3data import Web3Data, Chains; Web3Data('key').btc.rpc",
+        "from web3data.handlers import TokenHandler",
+    ),
+)
+def test_import_sync_client(statement):
+    times = import_times(statement)
+    assert "requests" in times
+    assert not ASYNC_MODULES.intersection(times)
+    assert "websocket" not in times
+
+
+def test_import_single_subhandler():
+    modules = loaded_modules(
+        "from web3data import Web3Data; Web3Data('key').eth.market"
+    )
+    handlers = {name for name in modules if name.startswith("web3data.handlers.")}
+    assert handlers == {
+        "web3data.handlers.api",
+        "web3data.handlers.base",
+        "web3data.handlers.market",
+    }
+    assert "web3data.dispatch" not in modules
+
+
+@importtime
+def test_import_on_demand():
+    times = import_times(
+        "from web3data import AsyncWeb3Data, Web3Data;"
+        "AsyncWeb3Data('key').eth.market; Web3Data('key').eth.websocket"
+    )
+    assert {"aiohttp", "websocket"}.issubset(times)
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+import requests_mock
+
+from web3data import jsonlib
+from web3data.chains import Chains
+from web3data.exceptions import APIError
+from web3data.handlers.base import BaseHandler
+from web3data.handlers.websocket import WebsocketHandler
+from web3data.jsonlib import JSONBackend
+
+BACKENDS = sorted(jsonlib.BACKENDS)
+
+
+@pytest.fixture
+def backend(request):
+    previous = jsonlib.set_backend(request.param)
+    yield jsonlib.get_backend()
+    jsonlib.set_backend(previous)
+
+
+@pytest.mark.parametrize("backend", BACKENDS, indirect=True)
+def test_loads_dumps(backend):
+    document = b'{"a": [1, "b", null, 1.5], "value": "123456789012345678901234"}'
+    assert jsonlib.loads(document) == json.loads(document)
+    assert jsonlib.loads(document.decode()) == json.loads(document)
+    assert jsonlib.loads(b'{"a": NaN}')["a"] != 0
+    assert json.loads(jsonlib.dumps({"a": (1, 2)})) == {"a": [1, 2]}
+    with pytest.raises(json.JSONDecodeError):
+        jsonlib.loads(b"<html>")
+
+
+def test_json_backend_exact_integers():
+    previous = jsonlib.set_backend("json")
+    try:
+        assert (
+            jsonlib.loads(b"123456789012345678901234567890")
+            == 123456789012345678901234567890
+        )
+    finally:
+        jsonlib.set_backend(previous)
+
+
+def test_default_backend_exact_integers():
+    assert jsonlib.get_backend().name == "json"
+    handler = BaseHandler(Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(
+            requests_mock.ANY,
+            content=b'{"payload": {"balance": 123456789012345678901234567890}}',
+        )
+        response = handler.raw_query("http://example.com/", "", {}, {})
+    assert response["payload"]["balance"] == 123456789012345678901234567890
+
+
+@pytest.mark.parametrize("backend", BACKENDS, indirect=True)
+def test_raw_query_backend(backend):
+    handler = BaseHandler(Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=b'{"payload": {"records": [1]}}')
+        assert handler.raw_query("http://example.com/", "", {}, {}) == {
+            "payload": {"records": [1]}
+        }
+        m.get(requests_mock.ANY, content=b"\xff\xfe")
+        with pytest.raises(APIError):
+            handler.raw_query("http://example.com/", "", {}, {})
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [JSONBackend("custom", lambda data: {"id": "1", "result": True}, str)],
+    indirect=True,
+)
+def test_custom_backend(backend):
+    handler = WebsocketHandler("test-key", "test-id")
+    handler.expected_ids.add("1")
+    handler._on_message(None, "ignored")
+    assert handler.expected_ids == set()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        jsonlib.set_backend("simdjson")
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from itertools import product
 
 import pytest
@@ -5,7 +6,7 @@ import requests_mock
 
 from web3data.chains import Chains
 from web3data.exceptions import APIError
-from web3data.handlers.market import MarketHandler
+from web3data.handlers.market import MarketHandler, _merge_windows
 
 from . import API_PREFIX, CHAINS, HEADERS, RESPONSE
 
@@ -68,3 +69,117 @@ def test_market_handler(chain, method, parameters, raises):
             assert set(HEADERS.items()).issubset(
                 set(m.request_history[0].headers.items())
             )
+
+
+DAY = 24 * 60 * 60 * 1000
+
+
+def window_response(request, context):
+    start = int(request.qs["startdate"][0])
+    end = int(request.qs["enddate"][0])
+    # rows at both window edges to provoke duplicates between windows
+    rows = [[end, "edge"], [start + DAY, "inner"], [start, "edge"]]
+    return {
+        "payload": {
+            "metadata": {"columns": ["timestamp", "value"], "startDate": start},
+            "data": {"bitfinex": rows} if "ohlcv" in request.url else rows,
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "method,exchange",
+    (
+        ("sharded_ohlcv_pair_historical", "bitfinex"),
+        ("sharded_trade_pairs_historical", None),
+        ("sharded_ticker_bid_ask_historical", None),
+        ("sharded_uniswap_liquidity", None),
+    ),
+)
+def test_market_handler_sharded(method, exchange):
+    handler = MarketHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=window_response)
+        response = getattr(handler, method)(
+            "PAIR", 0, 10 * DAY, window=timedelta(days=4), workers=2
+        )
+
+    assert m.call_count == 3
+    data = response["payload"]["data"]
+    rows = data[exchange] if exchange else data
+    assert rows == [
+        [0, "edge"],
+        [DAY, "inner"],
+        [4 * DAY, "edge"],
+        [5 * DAY, "inner"],
+        [8 * DAY, "edge"],
+        [9 * DAY, "inner"],
+        [10 * DAY, "edge"],
+    ]
+    assert response["payload"]["metadata"]["startDate"] == 0
+
+
+@pytest.mark.parametrize(
+    "failure",
+    (
+        {"status_code": 429, "json": {"status": 429, "message": "Too many requests"}},
+        {"json": {"status": 500, "message": "Internal server error"}},
+    ),
+)
+def test_market_handler_sharded_failed_window(failure):
+    handler = MarketHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json=window_response)
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            additional_matcher=lambda r: r.qs["startdate"] == [str(4 * DAY)],
+            **failure,
+        )
+        with pytest.raises(APIError):
+            handler.sharded_ohlcv_pair_historical(
+                "PAIR", 0, 10 * DAY, window=timedelta(days=4), workers=2
+            )
+
+
+def test_market_handler_sharded_invalid_window():
+    handler = MarketHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with pytest.raises(ValueError):
+        handler.sharded_ohlcv_pair_historical(
+            "PAIR", 0, DAY, window=timedelta(days=365)
+        )
+    with pytest.raises(ValueError):
+        handler.sharded_ohlcv_pair_historical("PAIR", DAY, 0)
+
+
+def merge(*chunks):
+    responses = [{"payload": {"data": list(chunk)}} for chunk in chunks]
+    windows = [(0, 4), (4, 8)]
+    return _merge_windows(responses, windows)["payload"]["data"]
+
+
+def test_merge_windows_keeps_identical_rows():
+    # two equal trades in the same millisecond of one window
+    rows = merge([[1, "trade"], [1, "trade"], [4, "edge"]], [[4, "edge"], [5, "trade"]])
+    assert rows == [[1, "trade"], [1, "trade"], [4, "edge"], [5, "trade"]]
+
+
+def test_merge_windows_boundary_duplicates():
+    rows = merge(
+        [[4, "edge"], [4, "edge"]], [[4, "edge"], [4, "edge"], [4, "edge"], [5, "x"]]
+    )
+    # both windows report the two boundary rows, the third one is new
+    assert rows == [[4, "edge"]] * 3 + [[5, "x"]]
+
+
+def test_merge_windows_timestamps():
+    rows = merge(
+        [{"value": "no timestamp"}, {"timestamp": "1970-01-01T00:00:00.003Z"}],
+        [{"timestamp": 4}, {"timestamp": "2"}],
+    )
+    assert rows == [
+        {"timestamp": "2"},
+        {"timestamp": "1970-01-01T00:00:00.003Z"},
+        {"timestamp": 4},
+        {"value": "no timestamp"},
+    ]
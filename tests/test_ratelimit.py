@@ -0,0 +1,231 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+from web3data.chains import Chains
+from web3data.client import Web3Data
+from web3data.exceptions import APIError
+from web3data.handlers.api import APIHandler
+from web3data.handlers.base import BaseHandler
+from web3data.ratelimit import ConcurrencyLimiter, RateLimiter, TokenBucket
+
+
+@patch("web3data.ratelimit.time.monotonic", return_value=0)
+def test_token_bucket_burst(_):
+    bucket = TokenBucket(rate=1, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 1, 2]
+
+
+@patch("web3data.ratelimit.time.monotonic")
+def test_token_bucket_refill(monotonic):
+    bucket = TokenBucket(rate=2)
+    monotonic.return_value = 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    monotonic.return_value = 10
+    assert bucket.reserve() == 0
+
+
+@pytest.mark.parametrize("rate,burst", ((0, 1), (1, 0)))
+def test_token_bucket_invalid(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+@patch("web3data.ratelimit.time.monotonic", return_value=0)
+def test_token_bucket_threads(_):
+    bucket = TokenBucket(rate=10)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        delays = list(executor.map(lambda _: bucket.reserve(), range(20)))
+    assert sorted(round(delay, 6) for delay in delays) == [i / 10 for i in range(20)]
+
+
+MARKET_URL = "https://web3api.io/api/v2/market/prices/eth_usd/latest"
+BLOCK_URL = "https://web3api.io/api/v2/blocks/1/"
+
+
+def send_times(limiter, urls, use_async=False):
+    """Acquire the limiter for each URL in turn on a simulated clock."""
+    clock = [0.0]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    async def async_sleep(seconds):
+        sleep(seconds)
+
+    async def acquire_all():
+        for url in urls:
+            await limiter.acquire_async(url)
+            times.append(clock[0])
+
+    times = []
+    with patch("web3data.ratelimit.time.monotonic", lambda: clock[0]), patch(
+        "web3data.ratelimit.time.sleep", sleep
+    ), patch("asyncio.sleep", async_sleep):
+        if use_async:
+            asyncio.run(acquire_all())
+        else:
+            for url in urls:
+                limiter.acquire(url)
+                times.append(clock[0])
+    return times
+
+
+def test_rate_limiter_families():
+    limiter = RateLimiter(rate=10, families={r"/market/": 1})
+    times = send_times(limiter, [MARKET_URL] * 3 + [BLOCK_URL])
+    assert times == pytest.approx([0, 1, 2, 2.1])
+    assert limiter.throttled == 3
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_rate_limiter_global_and_family(use_async):
+    limiter = RateLimiter(rate=1, families={r"/market/": 0.2})
+    urls = [MARKET_URL, MARKET_URL, BLOCK_URL, MARKET_URL, BLOCK_URL, BLOCK_URL]
+    times = send_times(limiter, urls, use_async)
+    # no two requests within one second, and market requests five seconds apart
+    assert all(later - earlier >= 1 for earlier, later in zip(times, times[1:]))
+    market = [time for time, url in zip(times, urls) if url == MARKET_URL]
+    assert all(later - earlier >= 5 for earlier, later in zip(market, market[1:]))
+    assert times == pytest.approx([0, 5, 6, 10, 11, 12])
+
+
+@patch("web3data.ratelimit.time.sleep")
+@patch("web3data.ratelimit.time.monotonic", return_value=0)
+def test_raw_query_rate_limited(_, sleep):
+    handler = BaseHandler(Chains.ETH, rate_limiter=RateLimiter(rate=2))
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"a": 1})
+        for _ in range(3):
+            handler.raw_query("http://example.com/", "", {}, {})
+    assert [call[0][0] for call in sleep.call_args_list] == [0.5, 1.0]
+
+
+@patch("web3data.ratelimit.time.sleep")
+@patch("web3data.ratelimit.time.monotonic", return_value=0)
+def test_rpc_rate_limited(_, sleep):
+    handler = APIHandler("test-key", "test-id", Chains.ETH, rate_limiter=RateLimiter(1))
+    with requests_mock.Mocker() as m:
+        m.register_uri(requests_mock.ANY, requests_mock.ANY, json={"result": "0x1"})
+        handler.rpc("eth_gasPrice", [])
+        handler.block.single(1)
+    sleep.assert_called_once_with(1)
+
+
+def test_client_shares_rate_limiter():
+    limiter = RateLimiter(rate=5)
+    client = Web3Data("test-key", rate_limiter=limiter)
+    assert client.eth.rate_limiter is limiter
+    assert client.btc.market.rate_limiter is limiter
+
+
+@patch("web3data.ratelimit.time.monotonic", return_value=10.0)
+def test_concurrency_limiter_aimd(_):
+    limiter = ConcurrencyLimiter(initial_limit=2, max_limit=3)
+    limiter.acquire()
+    limiter.acquire()
+    limiter.release(9.9, 200)
+    limiter.release(9.9, 200)
+    assert (limiter.limit, limiter.inflight) == (2, 0)
+    assert limiter.baseline == pytest.approx(0.1)
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.acquire()
+        limiter.release(9.9, 200)
+        limiter.release(9.9, 200)
+    assert limiter.limit == 3
+
+    limiter.acquire()
+    limiter.acquire()
+    limiter.release(9.9, 429)
+    assert limiter.limit == 1
+    # requests started before the decrease do not shrink the limit again
+    limiter.release(9.9, None)
+    assert limiter.limit == 1
+
+
+@patch("web3data.ratelimit.time.monotonic")
+def test_concurrency_limiter_latency_spike(monotonic):
+    limiter = ConcurrencyLimiter(initial_limit=4)
+    monotonic.return_value = 1.0
+    for started in (0.9, 0.9, 0.0):
+        limiter.acquire()
+        limiter.release(started, 200)
+    assert limiter.limit == 2
+
+
+@pytest.mark.parametrize("limits", ((0, 1, 2), (2, 1, 4), (1, 5, 4)))
+def test_concurrency_limiter_invalid(limits):
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(*limits[1:2], min_limit=limits[0], max_limit=limits[2])
+
+
+def test_concurrency_limiter_blocks_threads():
+    limiter = ConcurrencyLimiter(initial_limit=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.inflight == 1
+
+
+def test_concurrency_limiter_async():
+    limiter = ConcurrencyLimiter(initial_limit=1, max_limit=1)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        peak = max(peak, limiter.inflight)
+        await asyncio.sleep(0)
+        return 200, {}, b""
+
+    async def main():
+        await asyncio.gather(*(limiter.call_async(request) for _ in range(5)))
+
+    asyncio.run(main())
+    assert (peak, limiter.inflight) == (1, 0)
+
+
+def test_raw_query_concurrency_limited():
+    limiter = ConcurrencyLimiter(initial_limit=4, max_limit=16)
+    handler = BaseHandler(Chains.ETH, concurrency_limiter=limiter)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY, requests_mock.ANY, status_code=429, json={"status": 429}
+        )
+        with pytest.raises(APIError):
+            handler.raw_query("http://example.com/", "", {}, {})
+    assert (limiter.limit, limiter.inflight) == (2, 0)
+    assert handler._fanout(4) == 16
+    assert BaseHandler(Chains.ETH)._fanout(4) == 4
+
+
+def test_prefetch_window_not_widened_by_limiter():
+    limiter = ConcurrencyLimiter(initial_limit=4, max_limit=32)
+    handler = BaseHandler(Chains.ETH, concurrency_limiter=limiter)
+    calls = []
+
+    def query(page, size):
+        calls.append(page)
+        return {"payload": {"records": [page] * (size if page == 0 else 1)}}
+
+    records = list(handler._paginate(query, size=2, prefetch=2))
+
+    assert records == [0, 0, 1]
+    # the two pages of the window, and at most the one requested after page 0
+    assert len(calls) <= 3
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import patch
+
+import pytest
+import requests
+import requests_mock
+
+from web3data.chains import Chains
+from web3data.exceptions import APIError
+from web3data.handlers.api import APIHandler
+from web3data.handlers.base import BaseHandler
+from web3data.retry import RetryPolicy, parse_retry_after
+
+URL = "http://example.com/"
+
+
+def test_parse_retry_after():
+    later = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert parse_retry_after("7") == 7
+    assert 50 < parse_retry_after(format_datetime(later)) <= 60
+    assert parse_retry_after("invalid") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_delay():
+    policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [1, 2, 4, 5]
+    assert policy.delay(1, retry_after="10") == 10
+    assert 0 <= RetryPolicy(backoff=1).delay(3) <= 4
+
+
+def test_retry_invalid_attempts():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+@patch("web3data.retry.time.sleep")
+def test_raw_query_retries(sleep):
+    handler = BaseHandler(Chains.ETH, retry=RetryPolicy())
+    with requests_mock.Mocker() as m:
+        m.get(
+            URL,
+            [
+                {"status_code": 429, "headers": {"Retry-After": "3"}},
+                {"exc": requests.ConnectionError},
+                {"status_code": 502, "text": "<html>Bad Gateway</html>"},
+                {"json": {"a": 1}},
+            ],
+        )
+        assert handler.raw_query(URL, "", {}, {}) == {"a": 1}
+
+    assert m.call_count == 4
+    assert sleep.call_count == 3
+    assert sleep.call_args_list[0][0] == (3,)
+    assert (handler.retry.retries, handler.retry.give_ups) == (3, 0)
+
+
+@patch("web3data.retry.time.sleep")
+def test_raw_query_gives_up(sleep):
+    handler = BaseHandler(Chains.ETH, retry=RetryPolicy(max_attempts=2))
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=503, text="unavailable")
+        with pytest.raises(APIError):
+            handler.raw_query(URL, "", {}, {})
+        m.get(URL, exc=requests.ConnectionError)
+        with pytest.raises(requests.ConnectionError):
+            handler.raw_query(URL, "", {}, {})
+
+    assert m.call_count == 4
+    assert (handler.retry.retries, handler.retry.give_ups) == (2, 2)
+
+
+def test_raw_query_no_retry_on_client_error():
+    handler = BaseHandler(Chains.ETH, retry=RetryPolicy())
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=404, json={"status": 404})
+        with pytest.raises(APIError, match="404"):
+            handler.raw_query(URL, "", {}, {})
+    assert m.call_count == 1
+
+
+@patch("web3data.retry.time.sleep")
+def test_rpc_retries(sleep):
+    handler = APIHandler("test-key", "test-id", Chains.ETH, retry=RetryPolicy())
+    assert handler.block.retry is handler.retry
+    with requests_mock.Mocker() as m:
+        m.post(requests_mock.ANY, [{"status_code": 500}, {"json": {"result": "0x1"}}])
+        assert handler.rpc("eth_gasPrice", []) == {"result": "0x1"}
+    assert handler.retry.retries == 1
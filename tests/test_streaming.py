@@ -0,0 +1,215 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+import requests_mock
+
+from web3data.chains import Chains
+from web3data.exceptions import APIError, EmptyResponseError
+from web3data.handlers.address import AddressHandler
+from web3data.handlers.token import TokenHandler
+from web3data.retry import RetryPolicy
+from web3data.streaming import CSVParser, RecordParser
+
+from . import API_PREFIX, HEADERS
+
+RECORDS = [
+    {"address": "0x1", "value": "123456789012345678901234", "numTokens": 1},
+    {"address": "0x2", "nested": {"list": [1, 2.5, None]}, "name": "ü€"},
+    42,
+    "string ] with } brackets",
+]
+DOCUMENT = json.dumps(
+    {
+        "status": 200,
+        "title": "OK",
+        "description": {"records": ["not these"]},
+        "payload": {"totalRecords": 4, "records": RECORDS, "metadata": {"a": 1}},
+    },
+    ensure_ascii=False,
+    indent=1,
+).encode("utf-8")
+
+
+def parse(document, size, path=("payload", "records")):
+    parser = RecordParser(path)
+    records = []
+    for start in range(0, len(document), size):
+        records.extend(parser.feed(document[start : start + size]))
+    records.extend(parser.close())
+    return records
+
+
+@pytest.mark.parametrize("size", (1, 2, 7, 64, len(DOCUMENT)))
+def test_record_parser_chunks(size):
+    assert parse(DOCUMENT, size) == RECORDS
+
+
+def test_record_parser_split_numbers():
+    document = b'{"payload":{"rate":12.5,"records":[-0.25,1.5e3,7,{"a":2E-2},10]}}'
+    expected = [-0.25, 1500.0, 7, {"a": 0.02}, 10]
+    for offset in range(len(document) + 1):
+        parser = RecordParser()
+        records = parser.feed(document[:offset])
+        records.extend(parser.feed(document[offset:]))
+        records.extend(parser.close())
+        assert records == expected, offset
+
+
+def test_record_parser_yields_incrementally():
+    parser = RecordParser()
+    assert parser.feed(b'{"payload": {"records": [{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b": 2}, 12") == [{"b": 2}]
+    assert parser.feed(b"3]") == [123]
+    assert parser.done
+    assert parser.feed(b", ignored") == []
+    assert parser.close() == []
+
+
+@pytest.mark.parametrize(
+    "document",
+    (b'{"payload": {"totalRecords": 0}}', b'{"payload": null}', b"{}", b"{ }"),
+)
+def test_record_parser_missing_path(document):
+    assert parse(document, 3) == []
+
+
+@pytest.mark.parametrize(
+    "document",
+    (b"<html>", b"[1, 2]", b'{"payload": {"records": [1, 2', b'{"payload" 1}', b""),
+)
+def test_record_parser_invalid(document):
+    with pytest.raises(ValueError):
+        parse(document, 3)
+
+
+def test_record_parser_custom_path():
+    assert parse(b'{"a": {"b": {"c": [1, 2]}}}', 4, ("a", "b", "c")) == [1, 2]
+
+
+def test_stream_holders_latest():
+    handler = TokenHandler(HEADERS, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=DOCUMENT)
+        records = handler.stream_holders_latest("ADDRESS", size=4)
+        assert m.call_count == 0
+        assert list(records) == RECORDS
+
+    assert m.call_count == 1
+    assert m.request_history[0].url.startswith(API_PREFIX + "tokens/ADDRESS/")
+    assert m.request_history[0].qs == {"size": ["4"]}
+
+
+def test_stream_holders_latest_unsupported_chain():
+    handler = TokenHandler(HEADERS, Chains.BTC)
+    with pytest.raises(APIError):
+        handler.stream_holders_latest("ADDRESS")
+
+
+def test_stream_total():
+    handler = AddressHandler(HEADERS, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=DOCUMENT)
+        assert list(handler.stream_total(size=4)) == RECORDS
+
+
+@pytest.mark.parametrize(
+    "status,body,exception",
+    (
+        (200, b"", EmptyResponseError),
+        (200, b"invalid", APIError),
+        (200, b'{"payload": {"records": [1,', APIError),
+        (401, b'{"title": "Unauthorized"}', APIError),
+    ),
+)
+def test_stream_query_errors(status, body, exception):
+    handler = AddressHandler(HEADERS, Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, status_code=status, content=body)
+        with pytest.raises(exception):
+            list(handler.stream_total())
+
+
+def test_stream_query_retries():
+    handler = AddressHandler(
+        HEADERS, Chains.ETH, retry=RetryPolicy(backoff=0, jitter=False)
+    )
+    with requests_mock.Mocker() as m:
+        m.get(
+            requests_mock.ANY,
+            [{"status_code": 503, "content": b"busy"}, {"content": DOCUMENT}],
+        )
+        assert list(handler.stream_total()) == RECORDS
+    assert m.call_count == 2
+
+
+CSV = 'hash,value,note\r\n0x1,10,"multi\nline"\r\n0x2,20,"quoted ""€"""\r\n\r\n0x3,30,'.encode()
+CSV_ROWS = list(csv.reader(io.StringIO(CSV.decode(), newline="")))
+
+
+def parse_csv(document, size):
+    parser = CSVParser()
+    rows = []
+    for start in range(0, len(document), size):
+        rows.extend(parser.feed(document[start : start + size]))
+    rows.extend(parser.close())
+    return rows
+
+
+@pytest.mark.parametrize("size", (1, 2, 5, len(CSV)))
+def test_csv_parser_chunks(size):
+    assert parse_csv(CSV, size) == CSV_ROWS
+
+
+def test_csv_parser_yields_incrementally():
+    parser = CSVParser()
+    assert parser.feed(b'a,b\n1,"x\n') == [["a", "b"]]
+    assert parser.feed(b'y"\n2') == [["1", "x\ny"]]
+    assert parser.close() == [["2"]]
+
+
+def test_csv_parser_unterminated_quote():
+    assert parse_csv(b'a\n"b\nc', 2) == [["a"], ["b\nc"]]
+
+
+def test_export_csv_rows():
+    handler = AddressHandler(HEADERS, Chains.ETH)
+    exporter = handler.export_csv()
+    assert handler._export is None
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=CSV)
+        rows = exporter.transactions("ADDRESS", size=2)
+        assert m.call_count == 0
+        assert list(rows) == CSV_ROWS
+
+    assert m.request_history[0].qs == {"size": ["2"], "format": ["csv"]}
+
+
+@pytest.mark.parametrize("compress", (False, True))
+def test_export_csv_sink(compress):
+    handler = TokenHandler(HEADERS, Chains.ETH)
+    sink = io.BytesIO()
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=CSV)
+        written = handler.export_csv(sink, compress=compress).transfers("ADDRESS")
+
+    assert written == len(CSV)
+    data = sink.getvalue()
+    assert (gzip.decompress(data) if compress else data) == CSV
+
+
+@pytest.mark.parametrize("sink", (None, io.BytesIO()))
+@pytest.mark.parametrize(
+    "status,body,exception",
+    ((200, b"", EmptyResponseError), (404, b"Not Found", APIError)),
+)
+def test_export_csv_errors(sink, status, body, exception):
+    handler = AddressHandler(HEADERS, Chains.ETH).export_csv(sink)
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, status_code=status, content=body)
+        with pytest.raises(exception):
+            result = handler.transactions("ADDRESS")
+            if sink is None:
+                list(result)
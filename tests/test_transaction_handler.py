@@ -51,3 +51,22 @@ def test_transaction_handler(chain, method, parameters, raises):
             assert set(HEADERS.items()).issubset(
                 set(m.request_history[0].headers.items())
             )
+
+
+def test_transaction_handler_scan_find():
+    handler = TransactionHandler(initial_headers=HEADERS, chain=Chains.ETH)
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            requests_mock.ANY,
+            requests_mock.ANY,
+            json={"payload": {"records": [{"blockNumber": 2}, {"blockNumber": 1}]}},
+        )
+        records = list(
+            handler.scan_find(0, 20, shard_blocks=10, workers=2, status="completed")
+        )
+
+    assert [record["blockNumber"] for record in records] == [1, 2, 1, 2]
+    assert m.call_count == 2
+    queries = sorted(request.qs["blocknumbergte"][0] for request in m.request_history)
+    assert queries == ["0", "10"]
+    assert m.request_history[0].qs["status"] == ["completed"]
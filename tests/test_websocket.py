@@ -1,12 +1,17 @@
 import json
+import threading
+import time
 from json.decoder import JSONDecodeError
 from types import FunctionType
 from unittest.mock import Mock
 
 import pytest
+import requests
 
+from web3data.dispatch import Dispatcher
 from web3data.exceptions import APIError
 from web3data.handlers.websocket import WebsocketHandler
+from web3data.retry import RetryPolicy
 
 DATA_RESPONSE = json.dumps(
     {
@@ -178,3 +183,375 @@ def test_error_on_open():
 
     with pytest.raises(ValueError):
         handler._on_open(None)
+
+
+def confirm(handler, internal_id, external_id):
+    handler._on_message(
+        None, json.dumps({"jsonrpc": "2.0", "id": internal_id, "result": external_id})
+    )
+
+
+def block_message(external_id, number, block_hash=None):
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "method": "subscription",
+            "params": {
+                "subscription": external_id,
+                "result": {"number": number, "hash": block_hash or f"0x{number}"},
+            },
+        }
+    )
+
+
+def test_reconnect_resubscribes():
+    handler = get_handler()
+    handler.backoff = RetryPolicy(backoff=0, jitter=False)
+    callback = Mock()
+    internal_id = handler.register("block", callback)
+    connections = iter(("sub-1", "sub-2"))
+
+    def run_forever():
+        handler._on_open(None)
+        external_id = next(connections)
+        confirm(handler, internal_id, external_id)
+        handler._on_message(None, block_message(external_id, 1))
+        if external_id == "sub-2":
+            handler.close()
+        handler._on_close(None)
+
+    handler.ws = Mock(run_forever=Mock(side_effect=run_forever))
+    handler.run()
+
+    assert handler.ws.run_forever.call_count == 2
+    assert handler.reconnects == 1
+    assert handler._websocket_send.call_count == 2
+    assert [call[0][0]["id"] for call in handler._websocket_send.call_args_list] == [
+        internal_id,
+        internal_id,
+    ]
+    assert callback.call_count == 2
+    assert callback.call_args[0][1]["params"]["subscription"] == "sub-2"
+    handler.ws.close.assert_called_once()
+
+
+def test_reconnect_gives_up():
+    handler = get_handler()
+    handler.backoff = RetryPolicy(max_attempts=3, backoff=0, jitter=False)
+    handler.ws = Mock()
+
+    handler.run()
+
+    assert handler.ws.run_forever.call_count == 3
+    assert handler.reconnects == 2
+
+
+def test_reconnect_disabled():
+    handler = get_handler()
+    handler.reconnect = False
+    handler.ws = Mock()
+
+    handler.run()
+
+    handler.ws.run_forever.assert_called_once()
+    assert handler.reconnects == 0
+
+
+def test_on_close_clears_subscription_ids():
+    handler = get_handler()
+    internal_id = handler.register("block")
+    confirm(handler, internal_id, "sub-1")
+
+    handler._on_close(None)
+
+    assert not handler.external_registry
+    assert not handler.expected_ids
+    assert internal_id in handler.internal_registry
+
+
+def get_backfill_handler(**kwargs):
+    handler = get_handler()
+    handler.blocks = Mock(single=Mock(side_effect=lambda n: {"payload": {"number": n}}))
+    for key, value in kwargs.items():
+        setattr(handler, key, value)
+    callback = Mock()
+    internal_id = handler.register("block", callback)
+    confirm(handler, internal_id, "sub-1")
+    return handler, callback
+
+
+def delivered(callback):
+    return [
+        call[0][1]["params"]["result"]["number"] for call in callback.call_args_list
+    ]
+
+
+def test_backfill_blocks():
+    handler, callback = get_backfill_handler()
+
+    handler._on_message(None, block_message("sub-1", 10))
+    handler._on_message(None, block_message("sub-1", 13))
+    # the current head is sent again after resubscribing
+    handler._on_message(None, block_message("sub-1", 13))
+
+    assert delivered(callback) == [10, 11, 12, 13]
+    assert [call[0] for call in handler.blocks.single.call_args_list] == [
+        (11,),
+        (12,),
+    ]
+    assert callback.call_args_list[1][0][1]["params"]["subscription"] == "sub-1"
+    assert handler.backfilled == 2
+
+
+def test_backfill_reorg():
+    handler, callback = get_backfill_handler()
+
+    handler._on_message(None, block_message("sub-1", 10))
+    handler._on_message(None, block_message("sub-1", 10, "0xother"))
+
+    assert delivered(callback) == [10, 10]
+    handler.blocks.single.assert_not_called()
+
+
+def test_backfill_limit():
+    handler, callback = get_backfill_handler(max_backfill=2)
+
+    handler._on_message(None, block_message("sub-1", 10))
+    handler._on_message(None, block_message("sub-1", 20))
+
+    assert delivered(callback) == [10, 18, 19, 20]
+
+
+def test_backfill_error():
+    handler, callback = get_backfill_handler(on_error=Mock())
+    error = APIError("Block not found")
+    handler.blocks.single.side_effect = [error, {"payload": {"number": 12}}]
+
+    handler._on_message(None, block_message("sub-1", 10))
+    handler._on_message(None, block_message("sub-1", 13))
+
+    assert delivered(callback) == [10, 12, 13]
+    handler.on_error.assert_called_once_with(handler.ws, error)
+
+
+def test_backfill_connection_error():
+    handler, callback = get_backfill_handler(on_error=Mock())
+    error = requests.ConnectionError("connection reset")
+    handler.blocks.single.side_effect = [
+        {"payload": {"number": 11}},
+        error,
+        {"payload": {"number": 12}},
+        {"payload": {"number": 13}},
+    ]
+
+    handler._on_message(None, block_message("sub-1", 10))
+    handler._on_message(None, block_message("sub-1", 13))
+    assert delivered(callback) == [10, 11]
+    handler.on_error.assert_called_once_with(handler.ws, error)
+
+    # the rest of the gap is fetched again with the next block
+    handler._on_message(None, block_message("sub-1", 14))
+    assert delivered(callback) == [10, 11, 12, 13, 14]
+
+
+def test_backfill_dispatched():
+    release = threading.Event()
+    fetched_on = set()
+
+    def single(number):
+        fetched_on.add(threading.get_ident())
+        release.wait(2)
+        return {"payload": {"number": number}}
+
+    handler, callback = get_backfill_handler(dispatcher=Dispatcher())
+    handler.blocks.single.side_effect = single
+    for number in (10, 13, 14):
+        handler._on_message(None, block_message("sub-1", number))
+    # the socket thread returned while the missed blocks are still fetched
+    handler.dispatcher.join()
+    assert delivered(callback) == [10]
+
+    release.set()
+    for thread in list(handler._backfills):
+        thread.join()
+    handler.dispatcher.join()
+
+    assert delivered(callback) == [10, 11, 12, 13, 14]
+    assert threading.get_ident() not in fetched_on
+    assert not handler._backfills
+    handler.dispatcher.close()
+
+
+def test_backfill_other_events():
+    handler = get_handler()
+    handler.blocks = Mock()
+    callback = Mock()
+    internal_id = handler.register("block", callback)
+    other_id = handler.register(("block", "other"), callback)
+    confirm(handler, internal_id, "sub-1")
+    confirm(handler, other_id, "sub-2")
+
+    handler._on_message(None, block_message("sub-2", 10))
+    handler._on_message(None, block_message("sub-2", 13))
+
+    assert delivered(callback) == [10, 13]
+    handler.blocks.single.assert_not_called()
+
+
+def test_dispatch_callbacks():
+    handler = get_handler()
+    handler.dispatcher = Dispatcher(workers=2)
+    threads, numbers = set(), []
+
+    def callback(ws, message):
+        threads.add(threading.get_ident())
+        numbers.append(message["params"]["result"]["number"])
+
+    internal_id = handler.register("block", callback)
+    confirm(handler, internal_id, "sub-1")
+    for number in range(20):
+        handler._on_message(None, block_message("sub-1", number))
+    handler.dispatcher.join()
+
+    assert numbers == list(range(20))
+    assert threading.get_ident() not in threads
+    assert handler.dispatcher.stats()[internal_id]["delivered"] == 20
+
+    handler.unregister("sub-1")
+    assert handler.dispatcher.stats() == {}
+    handler.dispatcher.close()
+
+
+def test_dispatch_callback_error():
+    handler = get_handler()
+    handler.dispatcher = Dispatcher()
+    handler.on_error = Mock()
+    error = ValueError("callback failed")
+    callback = Mock(side_effect=[error, None])
+
+    internal_id = handler.register("block", callback)
+    confirm(handler, internal_id, "sub-1")
+    handler._on_message(None, block_message("sub-1", 1))
+    handler._on_message(None, block_message("sub-1", 2))
+    handler.dispatcher.join()
+
+    handler.on_error.assert_called_once_with(None, error)
+    assert callback.call_count == 2
+    handler.dispatcher.close()
+
+
+def test_run_waits_for_dispatched_callbacks():
+    handler = get_handler()
+    handler.reconnect = False
+    handler.dispatcher = Dispatcher(workers=1)
+    callback = Mock(side_effect=lambda ws, message: time.sleep(0.01))
+    internal_id = handler.register("block", callback)
+
+    def run_forever():
+        confirm(handler, internal_id, "sub-1")
+        for number in range(5):
+            handler._on_message(None, block_message("sub-1", number))
+
+    handler.ws = Mock(run_forever=Mock(side_effect=run_forever))
+    handler.run()
+
+    assert callback.call_count == 5
+    handler.dispatcher.close()
+
+
+def test_register_batches():
+    handler = get_handler()
+    callback = Mock()
+    internal_id = handler.register("block", callback, batch_size=3, max_latency=None)
+    confirm(handler, internal_id, "sub-1")
+    for number in range(7):
+        handler._on_message(None, block_message("sub-1", number))
+
+    batches = [call[0][1] for call in callback.call_args_list]
+    assert [
+        [message["params"]["result"]["number"] for message in batch]
+        for batch in batches
+    ] == [
+        [0, 1, 2],
+        [3, 4, 5],
+    ]
+
+    # unsubscribing delivers the incomplete batch
+    handler.unregister("sub-1")
+    assert len(callback.call_args[0][1]) == 1
+
+
+def test_batch_callback_unregisters():
+    handler = get_handler()
+    batches = []
+
+    def callback(ws, batch):
+        batches.append(batch)
+        handler.unregister("sub-1")
+
+    internal_id = handler.register("block", callback, batch_size=2, max_latency=None)
+    confirm(handler, internal_id, "sub-1")
+    thread = threading.Thread(
+        target=lambda: [
+            handler._on_message(None, block_message("sub-1", number))
+            for number in range(2)
+        ],
+        daemon=True,
+    )
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(batches) == 1
+    assert internal_id not in handler.internal_registry
+
+
+def test_register_batches_latency():
+    handler = get_handler()
+    handler.dispatcher = Dispatcher()
+    batches, flushed = [], threading.Event()
+
+    def callback(ws, batch):
+        batches.append(batch)
+        flushed.set()
+
+    internal_id = handler.register("block", callback, batch_size=100, max_latency=0.01)
+    confirm(handler, internal_id, "sub-1")
+    handler._on_message(None, block_message("sub-1", 1))
+    handler._on_message(None, block_message("sub-1", 2))
+
+    assert flushed.wait(5)
+    assert len(batches) == 1
+    assert len(batches[0]) == 2
+    handler.dispatcher.close()
+
+
+def test_run_flushes_batches():
+    handler = get_handler()
+    handler.reconnect = False
+    callback = Mock()
+    internal_id = handler.register("block", callback, batch_size=10, max_latency=None)
+
+    def run_forever():
+        confirm(handler, internal_id, "sub-1")
+        handler._on_message(None, block_message("sub-1", 1))
+        handler._on_message(None, block_message("sub-1", 2))
+
+    handler.ws = Mock(run_forever=Mock(side_effect=run_forever))
+    handler.run()
+
+    callback.assert_called_once()
+    assert len(callback.call_args[0][1]) == 2
+
+
+def test_batch_callback_error():
+    handler = get_handler()
+    handler.on_error = Mock()
+    error = ValueError("callback failed")
+    internal_id = handler.register(
+        "block", Mock(side_effect=error), batch_size=1, max_latency=None
+    )
+    confirm(handler, internal_id, "sub-1")
+    handler._on_message(None, block_message("sub-1", 1))
+
+    handler.on_error.assert_called_once_with(handler.ws, error)
@@ -4,4 +4,27 @@ __author__ = """Dominik Muhs"""
 __email__ = "dominik.muhs@protonmail.ch"
 __version__ = "0.1.7"
 
-from web3data.client import Chains, Web3Data
+import importlib
+
+__all__ = ["AsyncWeb3Data", "Chains", "Web3Data"]
+
+# the client pulls in the HTTP stack and the handlers, so it is only imported
+# once one of its names is accessed (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "AsyncWeb3Data": "web3data.client",
+    "Chains": "web3data.chains",
+    "Web3Data": "web3data.client",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,510 @@
+"""This module contains the API response caches."""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+MISSING = object()
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 1.0
+DEFAULT_DISK_CACHE_BYTES = 1024**3
+DEFAULT_CONFIRMATIONS = 12
+DEFAULT_TIP_TTL = 2.0
+
+# endpoints whose responses never change for a given URL
+IMMUTABLE_ENDPOINTS = {
+    r"/signatures/": None,
+    r"/contracts/[^/]+/(functions)?$": None,
+}
+
+
+class ResponseCache:
+    """A thread-safe, size-bounded TTL cache for parsed API responses.
+
+    Entries are keyed by request URL, blockchain ID, and query parameters. Each
+    entry expires after a time-to-live, which can be overridden per endpoint
+    by matching the request URL against regular expressions. A TTL of
+    :code:`None` caches the response indefinitely, and a TTL of :code:`0`
+    disables caching for the endpoint. Once the cache is full, the least
+    recently used entry is evicted.
+
+    Cached responses are shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        rules: Dict[str, Optional[float]] = None,
+    ):
+        """Return a new :code:`ResponseCache` instance.
+
+        :param maxsize: The maximum number of responses to keep
+        :param ttl: The default time-to-live of an entry in seconds
+        :param rules: A mapping of URL regular expressions to their TTL, the first
+            matching rule wins
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.rules = [
+            (re.compile(pattern), ttl) for pattern, ttl in (rules or {}).items()
+        ]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  # key -> (expiry timestamp or None, value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        url: str, headers: Dict[str, str], params: Dict[str, Any]
+    ) -> Tuple[Hashable, ...]:
+        """Build the cache key of a request.
+
+        :param url: The full request URL
+        :param headers: The request headers
+        :param params: The request's query parameters
+        :return: The hashable cache key
+        """
+        return (
+            url,
+            headers.get("x-amberdata-blockchain-id"),
+            tuple(sorted((key, str(value)) for key, value in params.items())),
+        )
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """Return the time-to-live for responses of an endpoint.
+
+        :param url: The full request URL
+        :return: The TTL in seconds, or None to cache indefinitely
+        """
+        for pattern, ttl in self.rules:
+            if pattern.search(url):
+                return ttl
+        return self.ttl
+
+    def get(self, key: Hashable) -> Any:
+        """Look up a cached response.
+
+        :param key: The request's cache key
+        :return: The cached response, or :code:`MISSING` if there is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key: Hashable, value: Any, url: str):
+        """Store a response, evicting the least recently used entries if needed.
+
+        :param key: The request's cache key
+        :param value: The parsed response to store
+        :param url: The full request URL, used to look up the endpoint's TTL
+        """
+        ttl = self.ttl_for(url)
+        if ttl is not None and ttl <= 0:
+            return
+        expiry = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """A persistent, size-bounded SQLite cache for immutable API responses.
+
+    The cache is meant for data that never changes once it exists, such as
+    confirmed blocks, transactions, and signatures, so entries do not expire.
+    Once the stored responses exceed :code:`max_bytes`, the least recently
+    used entries are evicted. The database file can be shared between
+    processes, and re-running a backfill reads from disk instead of the API.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_DISK_CACHE_BYTES):
+        """Return a new :code:`DiskCache` instance.
+
+        :param path: The path of the SQLite database file
+        :param max_bytes: The maximum total size of the stored responses
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+        self._size = self._total_size()
+
+    @staticmethod
+    def _serialize_key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"))
+
+    def _total_size(self) -> int:
+        row = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return row[0]
+
+    def get(self, key: Hashable) -> Any:
+        """Look up a stored response and mark it as recently used.
+
+        :param key: The request's cache key
+        :return: The stored response, or :code:`MISSING` if there is no entry
+        """
+        key = self._serialize_key(key)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any):
+        """Store a response, evicting the least recently used entries if needed.
+
+        :param key: The request's cache key
+        :param value: The parsed response to store
+        """
+        key = self._serialize_key(key)
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._size += len(data) - (row[0] if row else 0)
+            self._evict()
+
+    def _evict(self):
+        """Delete the least recently used entries until the size limit is met."""
+        while self._size > self.max_bytes:
+            row = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._size -= row[1]
+            self.evictions += 1
+
+    def compact(self):
+        """Enforce the size limit and reclaim unused space in the database file."""
+        with self._lock:
+            with self._connection:
+                self._size = self._total_size()
+                self._evict()
+            self._connection.execute("VACUUM")
+
+    def clear(self):
+        """Remove all stored responses."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self):
+        """Close the underlying database connection."""
+        self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+
+class BlockCache:
+    """A reorg-aware cache for block responses addressed by block number.
+
+    The cache tracks the current chain head of every chain it is used with.
+    Responses for blocks at least :code:`confirmations` blocks below the head
+    are considered final and kept until evicted by size, while responses for
+    blocks near the tip only live for :code:`tip_ttl` seconds. Whenever a block
+    number is seen with a different hash than before, all responses cached for
+    that block are dropped.
+    """
+
+    def __init__(
+        self,
+        confirmations: int = DEFAULT_CONFIRMATIONS,
+        tip_ttl: float = DEFAULT_TIP_TTL,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+    ):
+        """Return a new :code:`BlockCache` instance.
+
+        :param confirmations: The depth below the head after which blocks are final
+        :param tip_ttl: The time-to-live in seconds of blocks that are not final yet
+        :param maxsize: The maximum number of responses to keep
+        """
+        self.confirmations = confirmations
+        self.tip_ttl = tip_ttl
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reorgs = 0
+
+        self._heads = {}  # chain -> highest known block number
+        self._hashes = {}  # (chain, number) -> block hash
+        self._blocks = {}  # (chain, number) -> cache keys of the block
+        self._entries = OrderedDict()  # key -> (chain, number, expiry, value)
+        self._lock = threading.Lock()
+
+    def head(self, chain: Hashable) -> Optional[int]:
+        """Return the highest known block number of a chain.
+
+        :param chain: The chain to look up
+        :return: The head block number, or None if it is unknown
+        """
+        return self._heads.get(chain)
+
+    def is_confirmed(self, chain: Hashable, number: int) -> bool:
+        """Determine whether a block is deep enough below the head to be final.
+
+        :param chain: The chain of the block
+        :param number: The block number
+        :return: True if the block has enough confirmations
+        """
+        head = self._heads.get(chain)
+        return head is not None and number <= head - self.confirmations
+
+    def observe(self, chain: Hashable, number: int, block_hash: str = None):
+        """Record a block seen on the chain, e.g. from a response or websocket.
+
+        The head is advanced if the block is newer than the known head. If the
+        block's hash differs from the one seen before for its number, the
+        block was reorganized and its cached responses are evicted.
+
+        :param chain: The chain of the block
+        :param number: The block number
+        :param block_hash: The block's hash, if known
+        """
+        with self._lock:
+            if number > self._heads.get(chain, -1):
+                self._heads[chain] = number
+            if block_hash is None:
+                return
+            known = self._hashes.get((chain, number))
+            if known is not None and known != block_hash:
+                self.reorgs += 1
+                for key in self._blocks.pop((chain, number), ()):
+                    del self._entries[key]
+                    self.evictions += 1
+                del self._hashes[(chain, number)]
+
+    def get(self, key: Hashable) -> Any:
+        """Look up a cached block response.
+
+        :param key: The request's cache key
+        :return: The cached response, or :code:`MISSING` if there is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+
+    def set(
+        self,
+        chain: Hashable,
+        number: int,
+        key: Hashable,
+        value: Any,
+        block_hash: str = None,
+    ):
+        """Store a block response with a lifetime based on its confirmations.
+
+        :param chain: The chain of the block
+        :param number: The block number
+        :param key: The request's cache key
+        :param value: The parsed response to store
+        :param block_hash: The block's hash as contained in the response, if any
+        """
+        self.observe(chain, number, block_hash)
+        if self.is_confirmed(chain, number):
+            expiry = None
+        elif self.tip_ttl > 0:
+            expiry = time.monotonic() + self.tip_ttl
+        else:
+            return
+        with self._lock:
+            self._entries[key] = (chain, number, expiry, value)
+            self._entries.move_to_end(key)
+            self._blocks.setdefault((chain, number), set()).add(key)
+            if block_hash is not None:
+                self._hashes[(chain, number)] = block_hash
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        """Delete an entry and its block index reference."""
+        chain, number, _, _ = self._entries.pop(key)
+        keys = self._blocks.get((chain, number))
+        keys.discard(key)
+        if not keys:
+            del self._blocks[(chain, number)]
+            self._hashes.pop((chain, number), None)
+
+    def clear(self):
+        """Remove all entries and known block hashes from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._blocks.clear()
+            self._hashes.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesce identical concurrent requests into a single one.
+
+    While a request for a cache key is in flight, further callers asking for
+    the same key wait for it instead of sending their own request, and all of
+    them receive the same parsed response or exception. Threads and each
+    event loop are coalesced separately. The number of coalesced calls is
+    counted.
+
+    As with cached responses, shared results must not be mutated.
+    """
+
+    def __init__(self):
+        """Return a new :code:`SingleFlight` instance."""
+        self.coalesced = 0
+
+        self._calls = {}  # key -> future of the threaded call in flight
+        self._tasks = {}  # (event loop, key) -> task of the async call in flight
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        url: str, headers: Dict[str, str], params: Dict[str, Any]
+    ) -> Tuple[Hashable, ...]:
+        """Build the key identifying identical requests.
+
+        Unlike the cache key, it includes the API key, so the requests of
+        different accounts are never coalesced.
+
+        :param url: The full request URL
+        :param headers: The request headers
+        :param params: The request's query parameters
+        :return: The hashable request key
+        """
+        return ResponseCache.make_key(url, headers, params) + (
+            headers.get("x-api-key"),
+        )
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Call a function unless an identical call is already in flight.
+
+        :param key: The request's key
+        :param function: The function performing the request
+        :return: The function's result, shared with all coalesced callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(function())
+        except BaseException as exc:
+            call.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+    async def do_async(self, key: Hashable, function: Callable[[], Awaitable]) -> Any:
+        """Await a coroutine function unless an identical call is in flight.
+
+        The request runs as a separate task, so it keeps going for the other
+        callers if the caller that started it is cancelled.
+
+        :param key: The request's key
+        :param function: The coroutine function performing the request
+        :return: The function's result, shared with all coalesced callers
+        """
+        import asyncio
+
+        task_key = (asyncio.get_event_loop(), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(function())
+                task.add_done_callback(lambda _: self._forget(task_key, task))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[Any, Hashable], task: "asyncio.Future"):
+        """Remove a finished task unless a newer one has replaced it."""
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
@@ -1,47 +1,222 @@
 """This module contains the main API client class."""
 
+import threading
+from typing import Optional
+
+from web3data.cache import BlockCache, DiskCache, ResponseCache, SingleFlight
 from web3data.chains import Chains
+from web3data.deadline import DEFAULT_TIMEOUT, Timeout
 from web3data.handlers.api import APIHandler
+from web3data.ratelimit import ConcurrencyLimiter, RateLimiter
+from web3data.retry import RetryPolicy
+from web3data.session import (
+    DEFAULT_ASYNC_POOL_SIZE,
+    DEFAULT_POOL_SIZE,
+    AsyncSession,
+    create_session,
+)
 
 
 class Web3Data:
     """The Amberdata API client object."""
 
-    def __init__(self, api_key: str):
+    CHAINS = {
+        "btc": (Chains.BTC, "408fa195a34b533de9ad9889f076045e"),
+        "bch": (Chains.BCH, "43b45e71cc0615b491cb699e7071fc06"),
+        "bsv": (Chains.BSV, "a818635d36dbe125e26167c4438e2217"),
+        "eth": (Chains.ETH, "1c9c969065fcd1cf"),
+        "eth_rinkeby": (Chains.ETH_RINKEBY, "1b3f7a72b3e99c13"),
+        "ltc": (Chains.LTC, "f94be61fd9f4fa684f992ddfd4e92272"),
+        "zec": (Chains.ZEC, "b7d4f994f33c709be4ce6cbae31d7b8e"),
+    }
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keep_alive: bool = True,
+        cache: ResponseCache = None,
+        disk_cache: DiskCache = None,
+        block_cache: BlockCache = None,
+        retry: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        concurrency_limiter: ConcurrencyLimiter = None,
+        singleflight: SingleFlight = None,
+        timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    ):
         """Return a new API client instance.
 
+        All chain handlers share a single pooled HTTP session, so connections
+        to the API are reused across every sub-handler and RPC call. Chain
+        handlers and their sub-handlers are only created when first accessed.
+
         :param api_key: The Amberdata API key to perform requests with
+        :param pool_size: The maximum number of pooled connections per host
+        :param keep_alive: Whether to keep connections open between requests
+        :param cache: An optional response cache shared by all chains
+        :param disk_cache: An optional persistent cache for immutable responses
+        :param block_cache: An optional reorg-aware cache for blocks by number
+        :param retry: An optional policy for retrying failed requests
+        :param rate_limiter: An optional limiter pacing the requests of all chains
+        :param concurrency_limiter: An optional adaptive limit on the number of
+            requests in flight across all chains
+        :param singleflight: An optional group coalescing identical requests that
+            are in flight at the same time
+        :param timeout: The connect and read timeout in seconds of all requests,
+            either as one number or a (connect, read) tuple, or None to wait
+            indefinitely
         """
-        self.btc = APIHandler(
-            api_key=api_key,
-            blockchain_id="408fa195a34b533de9ad9889f076045e",
-            chain=Chains.BTC,
-        )
-        self.bch = APIHandler(
-            api_key=api_key,
-            blockchain_id="43b45e71cc0615b491cb699e7071fc06",
-            chain=Chains.BCH,
-        )
-        self.bsv = APIHandler(
-            api_key=api_key,
-            blockchain_id="a818635d36dbe125e26167c4438e2217",
-            chain=Chains.BSV,
-        )
-        self.eth = APIHandler(
-            api_key=api_key, blockchain_id="1c9c969065fcd1cf", chain=Chains.ETH
-        )
-        self.eth_rinkeby = APIHandler(
-            api_key=api_key,
-            blockchain_id="1b3f7a72b3e99c13",
-            chain=Chains.ETH_RINKEBY,
+        self.session = self._create_session(pool_size=pool_size, keep_alive=keep_alive)
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.block_cache = block_cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.singleflight = singleflight
+        self.timeout = timeout
+        self.api_key = api_key
+        self._options = {
+            "session": self.session,
+            "cache": cache,
+            "disk_cache": disk_cache,
+            "block_cache": block_cache,
+            "retry": retry,
+            "rate_limiter": rate_limiter,
+            "concurrency_limiter": concurrency_limiter,
+            "singleflight": singleflight,
+            "timeout": timeout,
+        }
+        # chain handlers are created on first access
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        """Create a chain handler on first access.
+
+        The handler is then stored as a regular attribute, so later lookups
+        do not pass through here again.
+
+        :param name: The name of the missing attribute
+        :return: The newly created chain handler
+        """
+        if name not in self.CHAINS:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        with self._lock:
+            handler = self.__dict__.get(name)
+            if handler is None:
+                chain, blockchain_id = self.CHAINS[name]
+                handler = self._create_handler(chain, blockchain_id)
+                setattr(self, name, handler)
+        return handler
+
+    def _create_handler(self, chain: Chains, blockchain_id: str) -> APIHandler:
+        return APIHandler(
+            api_key=self.api_key,
+            blockchain_id=blockchain_id,
+            chain=chain,
+            **self._options,
         )
-        self.ltc = APIHandler(
-            api_key=api_key,
-            blockchain_id="f94be61fd9f4fa684f992ddfd4e92272",
-            chain=Chains.LTC,
+
+    @staticmethod
+    def _create_session(pool_size: int, keep_alive: bool):
+        return create_session(pool_size=pool_size, keep_alive=keep_alive)
+
+    def close(self):
+        """Close the client's HTTP session and release its pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncWeb3Data(Web3Data):
+    """The asynchronous Amberdata API client object.
+
+    It exposes the same chain attributes and sub-handlers as :code:`Web3Data`,
+    but every handler method and RPC call returns an awaitable. All requests
+    run over a single pooled :code:`aiohttp` session, so one event loop can
+    keep many requests in flight at once.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = DEFAULT_ASYNC_POOL_SIZE,
+        keep_alive: bool = True,
+        cache: ResponseCache = None,
+        disk_cache: DiskCache = None,
+        block_cache: BlockCache = None,
+        retry: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        concurrency_limiter: ConcurrencyLimiter = None,
+        singleflight: SingleFlight = None,
+        timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    ):
+        """Return a new asynchronous API client instance.
+
+        :param api_key: The Amberdata API key to perform requests with
+        :param pool_size: The maximum number of simultaneous connections
+        :param keep_alive: Whether to keep connections open between requests
+        :param cache: An optional response cache shared by all chains
+        :param disk_cache: An optional persistent cache for immutable responses
+        :param block_cache: An optional reorg-aware cache for blocks by number
+        :param retry: An optional policy for retrying failed requests
+        :param rate_limiter: An optional limiter pacing the requests of all chains
+        :param concurrency_limiter: An optional adaptive limit on the number of
+            requests in flight across all chains
+        :param singleflight: An optional group coalescing identical requests that
+            are in flight at the same time
+        :param timeout: The connect and read timeout in seconds of all requests,
+            either as one number or a (connect, read) tuple, or None to wait
+            indefinitely
+        """
+        super().__init__(
+            api_key,
+            pool_size=pool_size,
+            keep_alive=keep_alive,
+            cache=cache,
+            disk_cache=disk_cache,
+            block_cache=block_cache,
+            retry=retry,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            singleflight=singleflight,
+            timeout=timeout,
         )
-        self.zec = APIHandler(
-            api_key=api_key,
-            blockchain_id="b7d4f994f33c709be4ce6cbae31d7b8e",
-            chain=Chains.ZEC,
+
+    @staticmethod
+    def _create_session(pool_size: int, keep_alive: bool):
+        return AsyncSession(pool_size=pool_size, keep_alive=keep_alive)
+
+    def _create_handler(self, chain: Chains, blockchain_id: str) -> APIHandler:
+        # imported on first use, so the synchronous client never loads aiohttp
+        from web3data.handlers.aio import AsyncAPIHandler
+
+        return AsyncAPIHandler(
+            api_key=self.api_key,
+            blockchain_id=blockchain_id,
+            chain=chain,
+            **self._options,
         )
+
+    async def close(self):
+        """Close the client's websocket connections and HTTP session."""
+        for name in self.CHAINS:
+            handler = vars(self).get(name)
+            if handler is not None and "websocket" in vars(handler):
+                await handler.websocket.close()
+        await self.session.close()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' to manage an AsyncWeb3Data client")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,107 @@
+"""This module contains request timeouts and per-operation deadlines."""
+
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, Union
+
+from web3data.exceptions import DeadlineExceededError
+
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_TIMEOUT = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+MIN_TIMEOUT = 0.001  # a zero timeout would make the socket non-blocking
+
+# a timeout in seconds for both connecting and reading, or a (connect, read) pair
+Timeout = Union[float, Tuple[float, float]]
+
+_deadline = contextvars.ContextVar("web3data_deadline", default=None)
+
+
+class Deadline:
+    """An overall time budget for a high-level operation.
+
+    While the deadline is active as a context manager, the timeouts of every
+    request made in its context are capped at the remaining time, and no
+    request is started or retried once the time is up. This includes requests
+    sent from the worker pools of pagination prefetching, block range scans,
+    and other fan-out paths. A nested deadline never extends an outer one.
+
+    The clock starts when the deadline is created.
+    """
+
+    def __init__(self, seconds: float):
+        """Return a new :code:`Deadline` instance.
+
+        :param seconds: The time budget of the operation
+        """
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self._tokens = []
+
+    def remaining(self) -> float:
+        """Return the number of seconds left, or zero once the deadline passed."""
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """Return whether the deadline has passed."""
+        return time.monotonic() >= self.expires
+
+    def check(self):
+        """Raise a :code:`DeadlineExceededError` if the deadline has passed."""
+        if self.expired:
+            raise DeadlineExceededError(
+                f"The operation exceeded its deadline of {self.seconds} seconds"
+            )
+
+    def __enter__(self):
+        outer = _deadline.get()
+        if outer is not None:
+            self.expires = min(self.expires, outer.expires)
+        self._tokens.append(_deadline.set(self))
+        return self
+
+    def __exit__(self, *args):
+        _deadline.reset(self._tokens.pop())
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline active in the current context, if any."""
+    return _deadline.get()
+
+
+def check_deadline():
+    """Raise a :code:`DeadlineExceededError` if the active deadline has passed."""
+    deadline = _deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def request_timeout(timeout: Optional[Timeout]) -> Optional[Tuple[float, float]]:
+    """Return the connect and read timeouts for the next request.
+
+    :param timeout: The configured timeout, or None to wait indefinitely
+    :return: The (connect, read) timeouts capped at the active deadline, or None
+    """
+    if timeout is not None and not isinstance(timeout, tuple):
+        timeout = (timeout, timeout)
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = max(deadline.remaining(), MIN_TIMEOUT)
+    if timeout is None:
+        return remaining, remaining
+    return min(timeout[0], remaining), min(timeout[1], remaining)
+
+
+class ContextExecutor(ThreadPoolExecutor):
+    """A thread pool running every task in a copy of the submitting context.
+
+    Worker threads do not inherit context variables, so without this the
+    requests of fan-out paths would not see the caller's active deadline.
+    """
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
@@ -0,0 +1,355 @@
+"""This module contains the delivery of websocket messages to callbacks.
+
+The dispatcher runs callbacks on worker threads, and the batcher groups
+messages into lists to deliver them in bulk.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_DRAIN_LIMIT = 100
+DEFAULT_MAX_LATENCY = 1.0
+
+# the overflow policies of a full subscription queue
+BLOCK = "block"  # wait until a worker made room, pushing back on the socket
+DROP_OLDEST = "drop_oldest"  # discard the oldest pending message
+CONFLATE = "conflate"  # discard all pending messages in favour of the newest
+OVERFLOW_POLICIES = frozenset((BLOCK, DROP_OLDEST, CONFLATE))
+
+# a callback and the arguments to call it with
+Call = Tuple[Callable, Tuple[Any, ...]]
+
+
+class SubscriptionQueue:
+    """A bounded queue of the pending callback calls of one subscription.
+
+    At most one worker drains the queue at a time, so the calls of a
+    subscription run in the order their messages arrived.
+    """
+
+    def __init__(self, maxsize: int, overflow: str):
+        """Return a new :code:`SubscriptionQueue` instance.
+
+        :param maxsize: The maximum number of pending calls
+        :param overflow: The policy applied when the queue is full
+        """
+        self.maxsize = maxsize
+        self.overflow = overflow
+
+        self.dropped = 0
+        self.delivered = 0
+
+        self._calls = deque()
+        self._scheduled = False  # whether a worker is draining the queue
+        self._condition = threading.Condition()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of pending calls."""
+        return len(self._calls)
+
+    def put(self, call: Call) -> bool:
+        """Add a call to the queue, applying the overflow policy if it is full.
+
+        :param call: The callback and its arguments
+        :return: Whether a worker needs to be scheduled to drain the queue
+        """
+        with self._condition:
+            if len(self._calls) >= self.maxsize:
+                if self.overflow == BLOCK:
+                    while len(self._calls) >= self.maxsize:
+                        self._condition.wait()
+                elif self.overflow == DROP_OLDEST:
+                    self._calls.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += len(self._calls)
+                    self._calls.clear()
+            self._calls.append(call)
+            schedule, self._scheduled = not self._scheduled, True
+            return schedule
+
+    def drain(self, limit: int) -> bool:
+        """Run pending calls in order until the queue is empty.
+
+        :param limit: The maximum number of calls to run, so that a busy
+            subscription does not occupy a worker indefinitely
+        :return: Whether calls are still pending and the queue needs to be
+            drained again
+        """
+        for _ in range(limit):
+            with self._condition:
+                if not self._calls:
+                    self._scheduled = False
+                    self._condition.notify_all()
+                    return False
+                callback, args = self._calls.popleft()
+                self._condition.notify_all()
+            callback(*args)
+            with self._condition:
+                self.delivered += 1
+        return True
+
+    def join(self):
+        """Block until all pending calls have run."""
+        with self._condition:
+            while self._scheduled:
+                self._condition.wait()
+
+
+class Dispatcher:
+    """A worker pool running callbacks through bounded per-subscription queues.
+
+    Calls of the same subscription run one at a time and in order, while
+    different subscriptions are served concurrently by up to :code:`workers`
+    threads. When a subscription's queue is full, the overflow policy either
+    blocks the caller until there is room (:code:`"block"`), discards the
+    oldest pending message (:code:`"drop_oldest"`), or discards all pending
+    messages in favour of the newest one (:code:`"conflate"`).
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        overflow: str = BLOCK,
+        drain_limit: int = DEFAULT_DRAIN_LIMIT,
+    ):
+        """Return a new :code:`Dispatcher` instance.
+
+        :param workers: The number of worker threads
+        :param maxsize: The maximum number of pending calls per subscription
+        :param overflow: The policy applied when a subscription's queue is full,
+            one of "block", "drop_oldest", or "conflate"
+        :param drain_limit: The number of calls a worker runs for one
+            subscription before serving the others
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        if workers < 1 or maxsize < 1 or drain_limit < 1:
+            raise ValueError(
+                "The workers, queue size, and drain limit must be positive"
+            )
+        self.workers = workers
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.drain_limit = drain_limit
+
+        self.queues = {}  # subscription key -> queue
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, key: Hashable, callback: Callable, *args):
+        """Queue a callback call for a subscription.
+
+        :param key: The key identifying the subscription
+        :param callback: The function to call on a worker thread
+        :param args: The arguments to call it with
+        """
+        with self._lock:
+            queue = self.queues.get(key)
+            if queue is None:
+                queue = self.queues[key] = SubscriptionQueue(
+                    self.maxsize, self.overflow
+                )
+        if queue.put((callback, args)):
+            self._executor.submit(self._drain, queue)
+
+    def _drain(self, queue: SubscriptionQueue):
+        """Drain a queue on a worker and reschedule it while calls are pending.
+
+        :param queue: The queue to drain
+        """
+        pending = True
+        try:
+            pending = queue.drain(self.drain_limit)
+        finally:
+            if pending:
+                self._executor.submit(self._drain, queue)
+
+    def remove(self, key: Hashable):
+        """Stop tracking a subscription, its pending calls still run.
+
+        :param key: The key identifying the subscription
+        """
+        with self._lock:
+            self.queues.pop(key, None)
+
+    @property
+    def dropped(self) -> int:
+        """Return the number of messages dropped across all subscriptions."""
+        return sum(queue.dropped for queue in list(self.queues.values()))
+
+    def stats(self) -> Dict[Hashable, Dict[str, int]]:
+        """Return the queue depth and message counters of every subscription.
+
+        :return: A mapping of subscription keys to their current queue
+            :code:`depth` and the numbers of :code:`dropped` and
+            :code:`delivered` messages
+        """
+        return {
+            key: {
+                "depth": queue.depth,
+                "dropped": queue.dropped,
+                "delivered": queue.delivered,
+            }
+            for key, queue in list(self.queues.items())
+        }
+
+    def join(self):
+        """Block until the pending calls of all subscriptions have run."""
+        for queue in list(self.queues.values()):
+            queue.join()
+
+    def close(self, wait: bool = True):
+        """Shut down the worker threads.
+
+        :param wait: Whether to wait for the pending calls to run
+        """
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
+
+
+class Batcher:
+    """A buffer grouping items into batches flushed by count or latency.
+
+    A batch is flushed once it holds :code:`size` items, or
+    :code:`max_latency` seconds after its first item arrived, whichever
+    comes first. Full batches are flushed on the thread adding their last
+    item, and flushes due to latency happen on one long-lived flusher
+    thread. Batches are flushed one at a time, in the order their items
+    were added. The buffer is not locked while a batch is flushed, so a slow
+    flush does not block adding items, and the flush function may add items
+    or flush the batcher itself.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        size: int,
+        max_latency: Optional[float] = DEFAULT_MAX_LATENCY,
+    ):
+        """Return a new :code:`Batcher` instance.
+
+        :param flush: The function receiving every batch as a list
+        :param size: The maximum number of items per batch
+        :param max_latency: The maximum number of seconds an item waits before
+            its batch is flushed, or None to only flush full batches
+        """
+        if size < 1:
+            raise ValueError("The batch size must be positive")
+        if max_latency is not None and max_latency <= 0:
+            raise ValueError("The maximum latency must be positive")
+        self.size = size
+        self.max_latency = max_latency
+
+        self.batches = 0
+
+        self._flush = flush
+        self._items = []
+        self._deadline = None  # the monotonic time the current batch is due
+        self._flusher = None
+        self._closed = False
+        self._generation = 0  # the number of the last batch taken
+        self._lock = threading.Condition()  # guards the buffer
+        self._order = threading.Condition()  # guards the flush order
+        self._flushed = 0  # the number of the last batch flushed
+        self._owner = None  # the ident of the thread flushing a batch
+
+    @property
+    def pending(self) -> int:
+        """Return the number of items waiting in the current batch."""
+        return len(self._items)
+
+    def add(self, item: Any):
+        """Add an item, flushing the batch if it is full.
+
+        :param item: The item to add
+        """
+        batch = None
+        with self._lock:
+            self._items.append(item)
+            if len(self._items) >= self.size:
+                batch = self._take()
+            elif self._deadline is None and self.max_latency is not None:
+                self._deadline = time.monotonic() + self.max_latency
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._expire, daemon=True)
+                    self._flusher.start()
+                self._lock.notify()
+        if batch is not None:
+            self._deliver(*batch)
+
+    def flush(self):
+        """Flush the current batch, if it holds any items."""
+        with self._lock:
+            batch = self._take()
+        if batch is not None:
+            self._deliver(*batch)
+
+    def close(self):
+        """Flush the current batch and stop the flusher thread."""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+
+    def _expire(self):
+        """Flush batches once their maximum latency passed, until closed."""
+        while True:
+            with self._lock:
+                while not self._closed and (
+                    self._deadline is None or self._deadline > time.monotonic()
+                ):
+                    timeout = None
+                    if self._deadline is not None:
+                        timeout = self._deadline - time.monotonic()
+                    self._lock.wait(timeout)
+                if self._closed:
+                    return
+                batch = self._take()
+            if batch is not None:
+                self._deliver(*batch)
+
+    def _take(self) -> Optional[Tuple[int, List[Any]]]:
+        """Take the current batch out of the buffer, with the lock held.
+
+        :return: The batch's number and items, or None if it is empty
+        """
+        self._deadline = None
+        if not self._items:
+            return None
+        items, self._items = self._items, []
+        self._generation += 1
+        self.batches += 1
+        return self._generation, items
+
+    def _deliver(self, number: int, items: List[Any]):
+        """Flush a batch once all batches taken before it were flushed.
+
+        :param number: The number of the batch
+        :param items: The items of the batch
+        """
+        ident = threading.get_ident()
+        with self._order:
+            # a batch taken by the flush function itself is flushed right away
+            nested = self._owner == ident
+            while not nested and (
+                self._owner is not None or self._flushed < number - 1
+            ):
+                self._order.wait()
+            self._owner = ident
+        try:
+            self._flush(items)
+        finally:
+            with self._order:
+                self._flushed = max(self._flushed, number)
+                if not nested:
+                    self._owner = None
+                self._order.notify_all()
@@ -18,3 +18,13 @@ class EmptyResponseError(APIError):
     """
 
     pass
+
+
+class DeadlineExceededError(APIError):
+    """An exception denoting an exhausted deadline.
+
+    This error is raised when a request would be started or retried after the deadline of
+    the operation it belongs to has passed.
+    """
+
+    pass
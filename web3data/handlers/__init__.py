@@ -1,11 +1,44 @@
 """This package defines the sub-handlers and the main one."""
 
-from web3data.handlers.address import AddressHandler
-from web3data.handlers.api import APIHandler
-from web3data.handlers.block import BlockHandler
-from web3data.handlers.contract import ContractHandler
-from web3data.handlers.market import MarketHandler
-from web3data.handlers.signature import SignatureHandler
-from web3data.handlers.token import TokenHandler
-from web3data.handlers.transaction import TransactionHandler
-from web3data.handlers.websocket import WebsocketHandler
+import importlib
+
+__all__ = [
+    "AddressHandler",
+    "AsyncAPIHandler",
+    "APIHandler",
+    "BlockHandler",
+    "ContractHandler",
+    "MarketHandler",
+    "SignatureHandler",
+    "TokenHandler",
+    "TransactionHandler",
+    "WebsocketHandler",
+]
+
+# handlers are imported on first access, so the async and websocket
+# dependencies are only loaded when needed (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "AddressHandler": "web3data.handlers.address",
+    "AsyncAPIHandler": "web3data.handlers.aio",
+    "APIHandler": "web3data.handlers.api",
+    "BlockHandler": "web3data.handlers.block",
+    "ContractHandler": "web3data.handlers.contract",
+    "MarketHandler": "web3data.handlers.market",
+    "SignatureHandler": "web3data.handlers.signature",
+    "TokenHandler": "web3data.handlers.token",
+    "TransactionHandler": "web3data.handlers.transaction",
+    "WebsocketHandler": "web3data.handlers.websocket",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,22 +1,66 @@
 """This module contains the address subhandler."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
 from web3data.chains import Chains
-from web3data.handlers.base import BaseHandler
+from web3data.deadline import ContextExecutor
+from web3data.exceptions import APIError
+from web3data.handlers.base import BaseHandler, is_error_response
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_WORKERS = 4
+
+
+def _merge_balances(outcomes: List[Tuple[List[str], Union[Dict, Exception]]]) -> Dict:
+    """Merge the responses of several balance chunks into one.
+
+    A chunk whose response reports an error status counts as failed, just
+    like a chunk whose request raised an exception.
+
+    :param outcomes: Tuples of each chunk's addresses and its response or error
+    :return: The merged API response with failed chunks listed under :code:`errors`
+    """
+    outcomes = [
+        (
+            chunk,
+            (
+                APIError(f"The API returned status {result.get('status')}: {result}")
+                if is_error_response(result)
+                else result
+            ),
+        )
+        for chunk, result in outcomes
+    ]
+    responses = [result for _, result in outcomes if not isinstance(result, Exception)]
+    errors = [
+        {"addresses": chunk, "error": result}
+        for chunk, result in outcomes
+        if isinstance(result, Exception)
+    ]
+    if not responses:
+        raise errors[0]["error"]
+
+    merged = dict(responses[0])
+    merged["payload"] = {}
+    for response in responses:
+        merged["payload"].update(response.get("payload") or {})
+    if errors:
+        merged["errors"] = errors
+    return merged
 
 
 class AddressHandler(BaseHandler):
     """The subhandler for address-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`AddressHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain=chain)
+        super().__init__(chain=chain, **kwargs)
         self.initial_headers = initial_headers
         self.chain = chain
         self.base_url = "https://web3api.io/api/v2/addresses/{hash}/"
@@ -27,6 +71,7 @@ class AddressHandler(BaseHandler):
         headers: Dict[str, str],
         params: Dict[str, Any],
         address: str = "",
+        stream: bool = False,
     ) -> Dict:
         """Base method to perform address queries.
 
@@ -34,9 +79,11 @@ class AddressHandler(BaseHandler):
         :param headers: The headers to attach to the request
         :param params: The request's query parameters
         :param address: The address string to query for
-        :return: The parsed API response
+        :param stream: Whether to stream the response's records instead
+        :return: The parsed API response, or an iterator over its records
         """
-        return self.raw_query(
+        query = self.stream_query if stream else self.raw_query
+        return query(
             base_url=self.base_url.format(hash=address),
             route=route,
             headers=headers,
@@ -68,6 +115,32 @@ class AddressHandler(BaseHandler):
             route="", headers=self.initial_headers, params=kwargs
         )
 
+    def iter_total(self, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over every address seen on the network, page by page.
+
+        This takes the same filters as :code:`total`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.total, **kwargs)
+
+    def stream_total(self, **kwargs) -> Iterator[Dict]:
+        """Stream the addresses seen on the network without buffering the response.
+
+        This takes the same filters as :code:`total`, but parses the records of a
+        single, possibly very large page incrementally and yields them one by one.
+
+        :key page: The page number to return. (int)
+        :key size: Number of records per page. (int)
+        :return: An iterator over the records of the page
+        """
+        return self._address_query(
+            route="", headers=self.initial_headers, params=kwargs, stream=True
+        )
+
     def adoption(self, address: str, **kwargs) -> Dict:
         """Retrieves the historical adoption for the specified address.
 
@@ -114,6 +187,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_balance_historical(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the historical balance records of an address, page by page.
+
+        This takes the same filters as :code:`balance_historical`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.balance_historical, address, **kwargs)
+
     def balance_latest(self, address: str, **kwargs) -> Dict:
         """Retrieves the current account balance for the specified address.
 
@@ -130,14 +216,67 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
-    def balances_batch(self, addresses: List[str], **kwargs) -> Dict:
+    def _balances_chunk(self, addresses: List[str], params: Dict[str, Any]) -> Dict:
+        """Retrieve the balances of a single chunk of addresses.
+
+        :param addresses: The addresses to fetch information for
+        :param params: The request's query parameters
+        :return: The parsed API response
+        """
+        return self._address_query(
+            route="balances",
+            headers=self.initial_headers,
+            params=dict(params, addresses=",".join(addresses)),
+        )
+
+    def _balances_chunks(
+        self, chunks: List[List[str]], workers: int, params: Dict[str, Any]
+    ) -> Dict:
+        """Retrieve the balances of several address chunks concurrently.
+
+        :param chunks: The address chunks to fetch information for
+        :param workers: The number of chunks to fetch concurrently
+        :param params: The request's query parameters
+        :return: The merged API responses
+        """
+        if len(chunks) <= 1:
+            return self._balances_chunk(chunks[0] if chunks else [], params)
+
+        with ContextExecutor(max_workers=self._fanout(workers)) as executor:
+            futures = [
+                executor.submit(self._balances_chunk, chunk, params) for chunk in chunks
+            ]
+        outcomes = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                outcomes.append((chunk, future.result()))
+            except Exception as exc:
+                outcomes.append((chunk, exc))
+        return _merge_balances(outcomes)
+
+    def balances_batch(
+        self,
+        addresses: List[str],
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = DEFAULT_BATCH_WORKERS,
+        **kwargs,
+    ) -> Dict:
         """Retrieves the latest account and token balances for the specified
         addresses.
 
         This is super useful if you want to get an entire portfolio's summary in a single call.
         Get totals for ETH & all token amounts with market prices.
 
+        Large address lists are split into chunks of :code:`chunk_size` addresses, which are
+        requested concurrently and merged into a single payload. If some chunks fail, or their
+        responses report an error status, the successful ones are still returned and the
+        failures are listed under the :code:`errors` key, each with its :code:`addresses` and
+        the raised :code:`error`.
+        If every chunk fails, the first error is raised.
+
         :param addresses: The addresses to fetch information for
+        :param chunk_size: The maximum number of addresses per request
+        :param workers: The number of chunks to request concurrently
         :key includePrice: Indicates whether or not to include price data with the results.
             Options: true, false. (bool)
         :key currency: The currency of the price information (usd or btc.)
@@ -145,10 +284,12 @@ class AddressHandler(BaseHandler):
         :key timeFormat: The time format to use for the timestamps (milliseconds, ms, iso, iso8611). (str)
         :return: The API response parsed into a dict
         """
-        kwargs.update({"addresses": ",".join(addresses)})
-        return self._address_query(
-            route="balances", headers=self.initial_headers, params=kwargs
-        )
+        addresses = [addresses] if type(addresses) is str else list(addresses)
+        chunks = [
+            addresses[index : index + chunk_size]
+            for index in range(0, len(addresses), chunk_size)
+        ]
+        return self._balances_chunks(chunks, workers, kwargs)
 
     def balances(self, address: str, **kwargs) -> Dict:
         """Retrieves the latest account and token balances for the specified
@@ -214,6 +355,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_internal_messages(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the internal messages of an address, page by page.
+
+        This takes the same filters as :code:`internal_messages`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.internal_messages, address, **kwargs)
+
     def logs(self, address: str, **kwargs) -> Dict:
         """Retrieves the logs for the transactions where this address is either
         the originator or a recipient.
@@ -236,6 +390,49 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def scan_logs(
+        self,
+        address: str,
+        start_block: int,
+        end_block: int,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """Crawl the logs of an address over a block range in concurrent shards.
+
+        The block range is split into shards that are fetched in parallel, and
+        shards spanning too many pages are split again. This takes the same
+        filters as :code:`logs` and yields the records ordered by block number.
+
+        :param address: The address to fetch information for
+        :param start_block: The first block number to include
+        :param end_block: The block number to stop at (exclusive)
+        :key shard_blocks: The initial number of blocks per shard (int)
+        :key max_pages: The number of pages after which a shard is split (int)
+        :key workers: The number of shards to crawl concurrently (int)
+        :key size: The number of records to request per page (int)
+        :return: An iterator over the records of the block range
+        """
+        return self._scan_blocks(
+            self.logs,
+            address,
+            start_block=start_block,
+            end_block=end_block,
+            **kwargs,
+        )
+
+    def iter_logs(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the logs of an address, page by page.
+
+        This takes the same filters as :code:`logs`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.logs, address, **kwargs)
+
     def metadata(self, address: str, **kwargs) -> Dict:
         """Retrieves statistics about the specified address: balances,
         holdings, etc.
@@ -274,6 +471,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_pending_transactions(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the pending transactions of an address, page by page.
+
+        This takes the same filters as :code:`pending_transactions`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.pending_transactions, address, **kwargs)
+
     def token_balances_historical(self, address: str, **kwargs) -> Dict:
         """Retrieves the historical (time series) token balances for the
         specified address.
@@ -298,6 +508,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_token_balances_historical(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the historical token balances of an address, page by page.
+
+        This takes the same filters as :code:`token_balances_historical`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.token_balances_historical, address, **kwargs)
+
     def token_balances_latest(self, address: str, **kwargs) -> Dict:
         """Retrieves the tokens this address is holding.
 
@@ -320,6 +543,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_token_balances_latest(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the latest token balances of an address, page by page.
+
+        This takes the same filters as :code:`token_balances_latest`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.token_balances_latest, address, **kwargs)
+
     def token_transfers(self, address: str, **kwargs) -> Dict:
         """Retrieves all token transfers involving the specified address.
 
@@ -355,6 +591,19 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_token_transfers(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the token transfers of an address, page by page.
+
+        This takes the same filters as :code:`token_transfers`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.token_transfers, address, **kwargs)
+
     def transactions(self, address: str, **kwargs) -> Dict:
         """Retrieves the transactions where this address was either the
         originator or a recipient.
@@ -388,6 +637,49 @@ class AddressHandler(BaseHandler):
             params=kwargs,
         )
 
+    def scan_transactions(
+        self,
+        address: str,
+        start_block: int,
+        end_block: int,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """Crawl the transactions of an address over a block range in concurrent shards.
+
+        The block range is split into shards that are fetched in parallel, and
+        shards spanning too many pages are split again. This takes the same
+        filters as :code:`transactions` and yields the records ordered by block number.
+
+        :param address: The address to fetch information for
+        :param start_block: The first block number to include
+        :param end_block: The block number to stop at (exclusive)
+        :key shard_blocks: The initial number of blocks per shard (int)
+        :key max_pages: The number of pages after which a shard is split (int)
+        :key workers: The number of shards to crawl concurrently (int)
+        :key size: The number of records to request per page (int)
+        :return: An iterator over the records of the block range
+        """
+        return self._scan_blocks(
+            self.transactions,
+            address,
+            start_block=start_block,
+            end_block=end_block,
+            **kwargs,
+        )
+
+    def iter_transactions(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the transactions of an address, page by page.
+
+        This takes the same filters as :code:`transactions`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.transactions, address, **kwargs)
+
     def usage(self, address: str, **kwargs) -> Dict:
         """Retrieves the historical usage for the specified address.
 
@@ -0,0 +1,956 @@
+"""This module contains the asynchronous handler variants.
+
+Each async handler reuses the endpoint definitions of its synchronous
+counterpart and only swaps out the transport. Every handler method therefore
+returns an awaitable that resolves to the parsed API response, and every
+:code:`iter_*` and :code:`stream_*` method returns an asynchronous iterator
+over the records. The websocket handler shares one connection across all
+subscriptions, each of which can be consumed as an asynchronous iterator.
+"""
+
+import asyncio
+import gzip
+from collections import deque
+from datetime import timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from uuid import uuid4
+
+from requests.compat import urljoin
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from web3data import jsonlib
+from web3data.cache import MISSING, ResponseCache, SingleFlight
+from web3data.deadline import (
+    Timeout,
+    check_deadline,
+    current_deadline,
+    request_timeout,
+)
+from web3data.exceptions import APIError, EmptyResponseError
+from web3data.handlers.address import AddressHandler, _merge_balances
+from web3data.handlers.api import DEFAULT_RPC_BATCH_SIZE, APIHandler
+from web3data.handlers.base import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SCAN_WORKERS,
+    DEFAULT_SHARD_BLOCKS,
+    DEFAULT_SHARD_PAGES,
+    Persist,
+    is_error_response,
+)
+from web3data.handlers.block import BlockHandler
+from web3data.handlers.contract import ContractHandler
+from web3data.handlers.market import (
+    MarketHandler,
+    Timestamp,
+    _merge_windows,
+    _time_windows,
+)
+from web3data.handlers.signature import SignatureHandler
+from web3data.handlers.token import TokenHandler
+from web3data.handlers.transaction import TransactionHandler
+from web3data.handlers.websocket import WebsocketHandler
+from web3data.retry import Outcome
+from web3data.session import AsyncSession
+from web3data.streaming import DEFAULT_CHUNK_SIZE, CSVParser, RecordParser
+
+
+def _query_params(params: Dict[str, Any]) -> Dict[str, Union[str, int, float]]:
+    """Convert query parameters to the types accepted by aiohttp.
+
+    This mirrors the behaviour of :code:`requests`, which drops :code:`None`
+    values and converts everything else to its string representation.
+
+    :param params: The request's query parameters
+    :return: The converted query parameters
+    """
+    return {
+        key: (
+            value
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool)
+            else str(value)
+        )
+        for key, value in params.items()
+        if value is not None
+    }
+
+
+def _client_timeout(timeout: Optional[Timeout]) -> "aiohttp.ClientTimeout":
+    """Convert a timeout to the per-request timeout settings of aiohttp.
+
+    Unlike with :code:`requests`, the whole request can be bounded, so an
+    active deadline also limits the total time spent on it.
+
+    :param timeout: The configured timeout, or None to wait indefinitely
+    :return: The aiohttp timeout settings
+    """
+    deadline = current_deadline()
+    total = deadline.remaining() if deadline is not None else None
+    timeout = request_timeout(timeout)
+    if timeout is None:
+        return aiohttp.ClientTimeout(total=total)
+    return aiohttp.ClientTimeout(
+        total=total, sock_connect=timeout[0], sock_read=timeout[1]
+    )
+
+
+async def send_request_async(
+    handler: Any, url: str, request: Callable[[], Awaitable[Outcome]]
+) -> Outcome:
+    """Perform a request within the rate limit, retrying it if configured.
+
+    This is the asynchronous counterpart of
+    :code:`web3data.handlers.base.send_request`.
+
+    :param handler: The handler whose transport options apply
+    :param url: The full request URL
+    :param request: A coroutine function performing the request once
+    :return: The status code, headers, and body of the final response
+    """
+
+    async def attempt() -> Outcome:
+        check_deadline()
+        if handler.rate_limiter is not None:
+            await handler.rate_limiter.acquire_async(url)
+        if handler.concurrency_limiter is not None:
+            return await handler.concurrency_limiter.call_async(request)
+        return await request()
+
+    if handler.retry is None:
+        return await attempt()
+    return await handler.retry.call_async(attempt)
+
+
+class AsyncHandlerMixin:
+    """A mixin replacing the blocking transport of a handler with aiohttp."""
+
+    @staticmethod
+    def _create_session():
+        return AsyncSession()
+
+    async def raw_query(
+        self,
+        base_url: str,
+        route: str,
+        headers: Dict[str, str],
+        params: Dict[str, str],
+        persist: Persist = False,
+    ) -> Union[Dict, str]:
+        """Perform an asynchronous HTTP GET request on an API REST endpoint.
+
+        :param base_url: The API base URL (common prefix)
+        :param route: The endpoint route after the base (variable suffix)
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :param persist: Whether the response is immutable and may be kept in the
+            persistent cache, or a predicate on the response deciding that
+        :return: The API response parsed into a dict, or the CSV rows or number of
+            bytes written by an :code:`export_csv` copy
+        """
+        url = urljoin(base_url, route)
+        if self._export is not None:
+            sink, compress = self._export
+            params = dict(params, format="csv")
+            if sink is None:
+                return self._stream_csv(url, headers, params)
+            return await self._download_csv(url, headers, params, sink, compress)
+
+        key = ResponseCache.make_key(url, headers, params)
+        result = self._cache_lookup(key, url, persist)
+        if result is not MISSING:
+            return result
+
+        async def fetch() -> Outcome:
+            async with self.session.client.get(
+                url,
+                headers=headers,
+                params=_query_params(params),
+                timeout=_client_timeout(self.timeout),
+            ) as resp:
+                return resp.status, resp.headers, await resp.read()
+
+        async def load() -> Union[Dict, str]:
+            status, _, content = await send_request_async(self, url, fetch)
+            if status >= 400:
+                # error responses are neither parsed nor cached
+                raise APIError(f"The API returned status {status}: {content}")
+            result = self._parse_response(content, params)
+            if not is_error_response(result):
+                self._cache_store(key, url, persist, result)
+            return result
+
+        if self.singleflight is None:
+            return await load()
+        return await self.singleflight.do_async(
+            SingleFlight.make_key(url, headers, params), load
+        )
+
+    async def _open_stream(
+        self, url: str, headers: Dict[str, str], params: Dict[str, str]
+    ) -> "aiohttp.ClientResponse":
+        """Send a GET request and return the response before reading its body.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: The response, whose body still needs to be streamed and released
+        """
+
+        async def fetch() -> Outcome:
+            resp = await self.session.client.get(
+                url,
+                headers=headers,
+                params=_query_params(params),
+                timeout=_client_timeout(self.timeout),
+            )
+            if resp.status >= 400:
+                # error bodies are small, reading them releases the connection
+                await resp.read()
+            return resp.status, resp.headers, resp
+
+        status, _, resp = await send_request_async(self, url, fetch)
+        if status >= 400:
+            content = await resp.read()
+            raise APIError(f"The API returned status {status}: {content}")
+        return resp
+
+    async def stream_query(
+        self,
+        base_url: str,
+        route: str,
+        headers: Dict[str, str],
+        params: Dict[str, str],
+    ) -> AsyncIterator[Dict]:
+        """Stream the records of an API REST endpoint without buffering the response.
+
+        :param base_url: The API base URL (common prefix)
+        :param route: The endpoint route after the base (variable suffix)
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: An asynchronous iterator over the response's records
+        """
+        url = urljoin(base_url, route)
+        async with await self._open_stream(url, headers, params) as resp:
+            parser, received = RecordParser(), 0
+            try:
+                async for chunk in resp.content.iter_chunked(DEFAULT_CHUNK_SIZE):
+                    received += len(chunk)
+                    for record in parser.feed(chunk):
+                        yield record
+                if not received:
+                    raise EmptyResponseError("The API returned an empty JSON response")
+                for record in parser.close():
+                    yield record
+            except ValueError as exc:
+                raise APIError(f"Unable to parse API response to JSON: {exc}")
+
+    async def _stream_csv(
+        self, url: str, headers: Dict[str, str], params: Dict[str, str]
+    ) -> AsyncIterator[List[str]]:
+        """Stream the rows of a CSV response.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: An asynchronous iterator over the parsed rows
+        """
+        async with await self._open_stream(url, headers, params) as resp:
+            parser, received = CSVParser(), 0
+            async for chunk in resp.content.iter_chunked(DEFAULT_CHUNK_SIZE):
+                received += len(chunk)
+                for row in parser.feed(chunk):
+                    yield row
+            if not received:
+                raise EmptyResponseError("The API returned an empty CSV response")
+            for row in parser.close():
+                yield row
+
+    async def _download_csv(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        params: Dict[str, str],
+        sink: BinaryIO,
+        compress: bool,
+    ) -> int:
+        """Write a CSV response to a file-like object chunk by chunk.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :param sink: The binary file-like object to write to
+        :param compress: Whether to gzip-compress the written data
+        :return: The number of CSV bytes received
+        """
+        received = 0
+        async with await self._open_stream(url, headers, params) as resp:
+            target = gzip.GzipFile(fileobj=sink, mode="wb") if compress else sink
+            try:
+                async for chunk in resp.content.iter_chunked(DEFAULT_CHUNK_SIZE):
+                    received += len(chunk)
+                    target.write(chunk)
+            finally:
+                if compress:
+                    target.close()
+        if not received:
+            raise EmptyResponseError("The API returned an empty CSV response")
+        return received
+
+    async def _paginate(
+        self,
+        query: Callable[..., Any],
+        *args,
+        size: int = DEFAULT_PAGE_SIZE,
+        page: int = 0,
+        prefetch: int = 0,
+        **kwargs,
+    ) -> AsyncIterator[Dict]:
+        """Lazily iterate over the records of a paginated endpoint.
+
+        With a prefetch window, up to :code:`prefetch` upcoming pages are
+        requested concurrently while records are still yielded in page order.
+        A page reporting an error status raises an :code:`APIError` once the
+        records of all preceding pages have been yielded.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param size: The number of records to request per page
+        :param page: The zero-based index of the first page to request
+        :param prefetch: The number of pages to fetch ahead concurrently
+        :param kwargs: Additional filters to pass to the query method
+        :return: An asynchronous iterator over the records of all pages
+        """
+        exhausted = False
+
+        async def fetch(number: int) -> Dict:
+            nonlocal exhausted
+            response = self._check_page(
+                await query(*args, page=number, size=size, **kwargs)
+            )
+            count = len(self._page_records(response))
+            if self._is_last_page(response, number, size, count):
+                exhausted = True
+            return response
+
+        prefetch = max(prefetch, 1)
+        pending = deque()
+        try:
+            for _ in range(prefetch):
+                pending.append((page, asyncio.ensure_future(fetch(page))))
+                page += 1
+            while pending:
+                number, task = pending.popleft()
+                response = await task
+                records = self._page_records(response)
+                for record in records:
+                    yield record
+                if self._is_last_page(response, number, size, len(records)):
+                    return
+                if not exhausted:
+                    pending.append((page, asyncio.ensure_future(fetch(page))))
+                    page += 1
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _crawl_shard(
+        self,
+        query: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict,
+        shard: range,
+        size: int,
+        max_pages: int,
+    ) -> Optional[List[Dict]]:
+        """Fetch all records of a block range shard ordered by block number.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param kwargs: Additional filters to pass to the query method
+        :param shard: The block range to fetch records for
+        :param size: The number of records to request per page
+        :param max_pages: The number of pages after which to give up on the shard
+        :return: The shard's records, or None if the shard should be split
+        """
+        filters = dict(kwargs, blockNumberGte=shard.start, blockNumberLt=shard.stop)
+        records = []
+        for page in range(max_pages):
+            response = self._check_page(
+                await query(*args, page=page, size=size, **filters)
+            )
+            page_records = self._page_records(response)
+            records.extend(page_records)
+            if self._is_last_page(response, page, size, len(page_records)):
+                return sorted(records, key=self._block_number)
+        if len(shard) == 1:
+            # a single block cannot be split any further
+            remaining = self._paginate(
+                query, *args, size=size, page=max_pages, **filters
+            )
+            records.extend([record async for record in remaining])
+            return records
+        return None
+
+    async def _scan_blocks(
+        self,
+        query: Callable[..., Any],
+        *args,
+        start_block: int,
+        end_block: int,
+        shard_blocks: int = DEFAULT_SHARD_BLOCKS,
+        max_pages: int = DEFAULT_SHARD_PAGES,
+        workers: int = DEFAULT_SCAN_WORKERS,
+        size: int = DEFAULT_PAGE_SIZE,
+        **kwargs,
+    ) -> AsyncIterator[Dict]:
+        """Crawl a block range in concurrent shards, ordered by block number.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param start_block: The first block number to include
+        :param end_block: The block number to stop at (exclusive)
+        :param shard_blocks: The initial number of blocks per shard
+        :param max_pages: The number of pages after which a shard is split
+        :param workers: The number of shards to crawl concurrently
+        :param size: The number of records to request per page
+        :param kwargs: Additional filters to pass to the query method
+        :return: An asynchronous iterator over the records of the block range
+        """
+        shards = (
+            range(lower, min(lower + shard_blocks, end_block))
+            for lower in range(start_block, end_block, shard_blocks)
+        )
+        workers = self._fanout(workers)
+
+        def submit(shard: range):
+            crawl = self._crawl_shard(query, args, kwargs, shard, size, max_pages)
+            return shard, asyncio.ensure_future(crawl)
+
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < workers:
+                    shard = next(shards, None)
+                    if shard is None:
+                        break
+                    pending.append(submit(shard))
+                if not pending:
+                    return
+                shard, task = pending.popleft()
+                records = await task
+                if records is None:
+                    middle = shard.start + len(shard) // 2
+                    pending.appendleft(submit(range(middle, shard.stop)))
+                    pending.appendleft(submit(range(shard.start, middle)))
+                    continue
+                for record in records:
+                    yield record
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+
+class AsyncAddressHandler(AsyncHandlerMixin, AddressHandler):
+    """The asynchronous subhandler for address-related queries."""
+
+    async def _balances_chunks(
+        self, chunks: List[List[str]], workers: int, params: Dict[str, Any]
+    ) -> Dict:
+        """Retrieve the balances of several address chunks concurrently.
+
+        :param chunks: The address chunks to fetch information for
+        :param workers: The number of chunks to fetch concurrently
+        :param params: The request's query parameters
+        :return: The merged API responses
+        """
+        if len(chunks) <= 1:
+            return await self._balances_chunk(chunks[0] if chunks else [], params)
+
+        semaphore = asyncio.Semaphore(self._fanout(workers))
+
+        async def fetch(chunk):
+            async with semaphore:
+                return await self._balances_chunk(chunk, params)
+
+        results = await asyncio.gather(*map(fetch, chunks), return_exceptions=True)
+        return _merge_balances(list(zip(chunks, results)))
+
+
+class AsyncBlockHandler(AsyncHandlerMixin, BlockHandler):
+    """The asynchronous subhandler for block-related queries."""
+
+
+class AsyncContractHandler(AsyncHandlerMixin, ContractHandler):
+    """The asynchronous subhandler for contract-related queries."""
+
+
+class AsyncMarketHandler(AsyncHandlerMixin, MarketHandler):
+    """The asynchronous subhandler for market-related queries."""
+
+    async def _sharded_query(
+        self,
+        query: Callable[..., Any],
+        pair: str,
+        start: Timestamp,
+        end: Timestamp,
+        window: timedelta,
+        workers: int,
+        **kwargs,
+    ) -> Dict:
+        """Query a date range in concurrent windows and merge the results.
+
+        :param query: The handler method returning a single window
+        :param pair: The asset pair to look up
+        :param start: The start of the date range
+        :param end: The end of the date range
+        :param window: The maximum length of a single window
+        :param workers: The number of windows to fetch concurrently
+        :param kwargs: Additional filters to pass to the query method
+        :return: A single response covering the full date range
+        """
+        windows = _time_windows(start, end, window)
+        semaphore = asyncio.Semaphore(self._fanout(workers))
+
+        async def fetch(bounds):
+            async with semaphore:
+                return await query(
+                    pair, startDate=bounds[0], endDate=bounds[1], **kwargs
+                )
+
+        responses = await asyncio.gather(*map(fetch, windows))
+        return _merge_windows(responses, windows)
+
+
+class AsyncSignatureHandler(AsyncHandlerMixin, SignatureHandler):
+    """The asynchronous subhandler for signature-related queries."""
+
+
+class AsyncTokenHandler(AsyncHandlerMixin, TokenHandler):
+    """The asynchronous subhandler for token-related queries."""
+
+
+class AsyncTransactionHandler(AsyncHandlerMixin, TransactionHandler):
+    """The asynchronous subhandler for transaction-related queries."""
+
+
+_CLOSED = object()  # marks the end of a subscription's message queue
+
+
+class AsyncSubscription:
+    """An asynchronous iterator over the messages of one subscription.
+
+    The subscription is sent to the websocket server when iteration starts,
+    connecting the handler first if necessary. Iteration ends once the
+    subscription is cancelled or the connection closes.
+    """
+
+    def __init__(self, handler: "AsyncWebsocketHandler"):
+        """Return a new :code:`AsyncSubscription` instance.
+
+        :param handler: The websocket handler owning the connection
+        """
+        self.handler = handler
+        self.internal_id = None
+        self.queue = asyncio.Queue()
+
+    @property
+    def external_id(self) -> Optional[str]:
+        """Return the subscription ID assigned by the server, once confirmed."""
+        for external_id, internal_id in self.handler.external_registry.items():
+            if internal_id == self.internal_id:
+                return external_id
+        return None
+
+    def _put(self, ws, message: Dict):
+        """Queue a message routed to this subscription."""
+        self.queue.put_nowait(message)
+
+    def _close(self):
+        """End iteration once the messages received so far are consumed."""
+        self.queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        if self.queue.empty():
+            if self.internal_id not in self.handler.internal_registry:
+                raise StopAsyncIteration
+            await self.handler._activate(self.internal_id)
+        message = await self.queue.get()
+        if message is _CLOSED:
+            raise StopAsyncIteration
+        return message
+
+    async def unsubscribe(self):
+        """Cancel the subscription and end iteration."""
+        await self.handler._unsubscribe(self.internal_id)
+        self._close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.unsubscribe()
+
+
+class AsyncWebsocketHandler(WebsocketHandler):
+    """The asynchronous subhandler for websocket-related queries.
+
+    All subscriptions share one aiohttp websocket connection, which is opened
+    on first use. Messages are routed through the same internal and external
+    registries as in the synchronous handler, either to an
+    :code:`AsyncSubscription` iterator or to a registered callback. Callbacks
+    run on the event loop and must not block, coroutine functions are
+    scheduled as tasks.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        blockchain_id: str,
+        url: str = None,
+        session: AsyncSession = None,
+    ):
+        """Return a new :code:`AsyncWebsocketHandler` instance.
+
+        :param api_key: The API key to attach to payloads
+        :param blockchain_id: The ID of the blockchain to query for
+        :param url: The websocket server URL
+        :param session: The HTTP session to open the connection with, a new
+            session is created if none is given
+        """
+        super().__init__(api_key, blockchain_id, url=url, reconnect=False)
+        self.session = session or AsyncSession()
+
+        self._sent = set()  # internal IDs subscribed on the current connection
+        self._tasks = set()
+        self._reader = None
+        self._connecting = None
+
+    def _create_app(self):
+        # the aiohttp connection is only opened once a subscription is used
+        return None
+
+    @property
+    def connected(self) -> bool:
+        """Return whether the websocket connection is open."""
+        return self.ws is not None and not self.ws.closed
+
+    def _spawn(self, coroutine: Awaitable):
+        """Run a coroutine in the background, keeping a reference to it."""
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def connect(self, **kwargs):
+        """Open the shared websocket connection unless it is open already.
+
+        All registered subscriptions are sent to the server once connected.
+        Any keyword arguments are passed on to aiohttp's :code:`ws_connect`.
+
+        :param kwargs: Additional arguments to pass to the websocket client
+        """
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self.connected:
+                return
+            self.ws = await self.session.client.ws_connect(
+                self.url,
+                headers={
+                    "x-api-key": self.api_key,
+                    "x-amberdata-blockchain-id": self.blockchain_id,
+                },
+                **kwargs,
+            )
+            self._sent = set()
+            self._reader = asyncio.ensure_future(self._receive(self.ws))
+            await self._on_open(self.ws)
+
+    async def _activate(self, internal_id: str):
+        """Make sure a registered subscription is sent on the open connection.
+
+        :param internal_id: The internal ID of the subscription
+        """
+        await self.connect()
+        if internal_id in self._sent or internal_id not in self.internal_registry:
+            return
+        self._sent.add(internal_id)
+        self.expected_ids.add(internal_id)
+        await self._websocket_send(self.internal_registry[internal_id]["payload"])
+
+    async def _websocket_send(self, payload: Dict):
+        """Send a message to the websocket server.
+
+        :param payload: The payload to JSON serialize and send
+        """
+        await self.ws.send_str(jsonlib.dumps(payload))
+
+    def register(self, params: Union[Iterable[str], str], callback=None) -> str:
+        """Register a new event to listen for and its callback.
+
+        The callback is called with the aiohttp websocket connection and the
+        deserialized message. If the connection is open already, the
+        subscription is sent right away.
+
+        :param params: The event to subscribe to
+        :param callback: The callback function or coroutine function to execute
+        :return: The internal ID of the subscription
+        """
+        if asyncio.iscoroutinefunction(callback):
+            coroutine_function = callback
+
+            def callback(ws, message):
+                self._spawn(coroutine_function(ws, message))
+
+        internal_id = super().register(params, callback)
+        if self.connected:
+            self._spawn(self._activate(internal_id))
+        return internal_id
+
+    def subscribe(self, params: Union[Iterable[str], str]) -> AsyncSubscription:
+        """Subscribe to an event and iterate over its messages.
+
+        The returned subscription is an asynchronous iterator, and also an
+        asynchronous context manager cancelling the subscription on exit:
+
+        .. code-block:: python
+
+            async for message in w3.eth.websocket.subscribe("block"):
+                print(message["params"]["result"]["number"])
+
+        :param params: The event to subscribe to
+        :return: The subscription yielding the deserialized messages
+        """
+        subscription = AsyncSubscription(self)
+        subscription.internal_id = self.register(params, callback=subscription._put)
+        self.internal_registry[subscription.internal_id]["subscription"] = subscription
+        return subscription
+
+    async def unregister(self, external_id: str):
+        """Unregister a subscription from the websocket server.
+
+        :param external_id: The subscription ID to remove
+        """
+        internal_id = self.external_registry[external_id]
+        subscription = self.internal_registry[internal_id].get("subscription")
+        payload = self._remove(external_id)
+        self._sent.discard(internal_id)
+        if subscription is not None:
+            subscription._close()
+        if self.connected:
+            await self._websocket_send(payload)
+
+    async def _unsubscribe(self, internal_id: str):
+        """Cancel a subscription by its internal ID, confirmed or not.
+
+        :param internal_id: The internal ID of the subscription
+        """
+        for external_id, registered_id in list(self.external_registry.items()):
+            if registered_id == internal_id:
+                await self.unregister(external_id)
+                return
+        # not confirmed yet, the confirmation is answered with an unsubscribe
+        self.internal_registry.pop(internal_id, None)
+        self._sent.discard(internal_id)
+
+    def _route(self, ws, message: Dict[str, Any]):
+        """Route a deserialized message to its subscription or registry.
+
+        Unlike the synchronous handler, this tolerates messages of
+        subscriptions that were cancelled while the server was still
+        confirming or delivering them.
+
+        :param ws: The websocket client instance
+        :param message: The message received from the websocket server
+        """
+        internal_id = message.get("id")
+        if message.get("params"):
+            external_id = message["params"].get("subscription")
+            if external_id not in self.external_registry:
+                return
+        elif (
+            type(message.get("result")) is str
+            and internal_id in self.expected_ids
+            and internal_id not in self.internal_registry
+        ):
+            self.expected_ids.remove(internal_id)
+            unsubscribe_id = str(uuid4())
+            self.expected_ids.add(unsubscribe_id)
+            self._spawn(
+                self._websocket_send(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "unsubscribe",
+                        "params": [message["result"]],
+                        "id": unsubscribe_id,
+                    }
+                )
+            )
+            return
+        super()._route(ws, message)
+
+    async def _receive(self, ws: "aiohttp.ClientWebSocketResponse"):
+        """Route incoming messages until the connection closes.
+
+        :param ws: The websocket connection
+        """
+        try:
+            async for message in ws:
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    try:
+                        self._on_message(ws, message.data)
+                    except Exception as error:
+                        self._on_error(ws, error)
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    self._on_error(ws, ws.exception())
+        finally:
+            self._on_close(ws)
+
+    async def _on_open(self, ws):
+        """An internal handler for websocket open events.
+
+        This sends every registered subscription that has not been sent on
+        the connection yet, and then calls the user-defined on-open handler.
+
+        :param ws: The websocket connection
+        """
+        for internal_id in list(self.internal_registry.keys()):
+            payload = self.internal_registry.get(internal_id, {}).get("payload")
+            if payload is None:
+                raise ValueError(
+                    f"Payload for internal ID {internal_id} does not exist"
+                )
+            if internal_id not in self._sent:
+                self._sent.add(internal_id)
+                self.expected_ids.add(internal_id)
+                await self._websocket_send(payload)
+
+        self.on_open(ws)
+
+    def _on_close(self, ws):
+        """An internal handler for websocket close events.
+
+        This ends the iteration of all subscriptions, which remain registered
+        and are sent again once the handler reconnects.
+
+        :param ws: The websocket connection
+        """
+        for subscription in self.internal_registry.values():
+            if "subscription" in subscription:
+                subscription["subscription"]._close()
+        super()._on_close(ws)
+
+    async def run(self, **kwargs):
+        """Connect and route messages until the connection closes.
+
+        Any keyword arguments are passed on to aiohttp's :code:`ws_connect`.
+
+        :param kwargs: Additional arguments to pass to the websocket client
+        """
+        await self.connect(**kwargs)
+        await asyncio.shield(self._reader)
+
+    async def close(self):
+        """Close the websocket connection and wait for the reader to finish."""
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await self._reader
+            self._reader = None
+
+
+class AsyncAPIHandler(APIHandler):
+    """The asynchronous API handler object for client requests."""
+
+    SUBHANDLERS = {
+        "address": "web3data.handlers.aio:AsyncAddressHandler",
+        "token": "web3data.handlers.aio:AsyncTokenHandler",
+        "contract": "web3data.handlers.aio:AsyncContractHandler",
+        "transaction": "web3data.handlers.aio:AsyncTransactionHandler",
+        "block": "web3data.handlers.aio:AsyncBlockHandler",
+        "signature": "web3data.handlers.aio:AsyncSignatureHandler",
+        "market": "web3data.handlers.aio:AsyncMarketHandler",
+    }
+
+    @staticmethod
+    def _create_session():
+        return AsyncSession()
+
+    def _create_handler(self, name: str):
+        if name == "websocket":
+            return AsyncWebsocketHandler(
+                api_key=self.api_key,
+                blockchain_id=self.blockchain_id,
+                session=self.session,
+            )
+        return super()._create_handler(name)
+
+    async def _rpc_post(self, payload: Union[Dict, List[Dict]]) -> Any:
+        """Send a JSON-RPC request object or batch and parse the response.
+
+        :param payload: A JSON-RPC request object or a batch of them
+        :return: The parsed response body
+        """
+        request = self._rpc_request(payload)
+
+        async def fetch() -> Outcome:
+            async with self.session.client.post(
+                **request, timeout=_client_timeout(self.timeout)
+            ) as resp:
+                return resp.status, resp.headers, await resp.read()
+
+        _, _, content = await send_request_async(self, request["url"], fetch)
+        return jsonlib.loads(content)
+
+    async def rpc(self, method: str, params: List[str], ident: int = 1):
+        """Perform an asynchronous HTTP POST RPC call on the API.
+
+        Consult the docs here for further details on supported commands:
+        https://docs.amberdata.io/reference#rpc-overview
+
+        :param method: The RPC method to call
+        :param params: Parameters attached to the RPC call
+        :param ident: RPC call identifier
+        """
+        return await self._rpc_post(self._rpc_payload(method, params, ident))
+
+    async def rpc_batch(
+        self,
+        calls: Iterable[Tuple[str, List[Any]]],
+        batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+    ) -> List[Dict]:
+        """Perform many RPC calls as concurrent JSON-RPC batch requests.
+
+        :param calls: The (method, params) tuples to call
+        :param batch_size: The maximum number of calls per HTTP request
+        :return: One JSON-RPC response object per call, in call order
+        """
+
+        async def send(batch):
+            try:
+                response = await self._rpc_post(batch)
+            except Exception as exc:
+                return self._rpc_batch_error(batch, exc)
+            return self._match_rpc_responses(batch, response)
+
+        self._check_rpc_support()
+        batches = list(self._rpc_batches(calls, batch_size))
+        responses = await asyncio.gather(*map(send, batches))
+        return [result for batch in responses for result in batch]
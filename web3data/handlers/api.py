@@ -1,54 +1,289 @@
 """This module contains the main API handler class."""
 
-from typing import Any, List
+import importlib
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import requests
 
-from web3data import __version__
+from web3data import __version__, jsonlib
+from web3data.cache import BlockCache, DiskCache, ResponseCache, SingleFlight
 from web3data.chains import Chains
+from web3data.deadline import (
+    DEFAULT_TIMEOUT,
+    Timeout,
+    request_timeout,
+)
 from web3data.exceptions import APIError
-from web3data.handlers.address import AddressHandler
-from web3data.handlers.block import BlockHandler
-from web3data.handlers.contract import ContractHandler
-from web3data.handlers.market import MarketHandler
-from web3data.handlers.signature import SignatureHandler
-from web3data.handlers.token import TokenHandler
-from web3data.handlers.transaction import TransactionHandler
-from web3data.handlers.websocket import WebsocketHandler
+from web3data.handlers.base import send_request
+from web3data.ratelimit import ConcurrencyLimiter, RateLimiter
+from web3data.retry import Outcome, RetryPolicy
+from web3data.session import create_session
+
+DEFAULT_RPC_BATCH_SIZE = 100
+
+
+def _load_handler(path: str) -> type:
+    """Import a handler class from its "module:Class" path.
+
+    :param path: The module and class name, separated by a colon
+    :return: The handler class
+    """
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
 
 
 class APIHandler:
     """The API handler object for client requests."""
 
-    def __init__(self, api_key: str, blockchain_id: str, chain: Chains):
+    # handler classes are imported on first access, so only the modules of
+    # the sub-handlers in use are loaded
+    SUBHANDLERS = {
+        "address": "web3data.handlers.address:AddressHandler",
+        "token": "web3data.handlers.token:TokenHandler",
+        "contract": "web3data.handlers.contract:ContractHandler",
+        "transaction": "web3data.handlers.transaction:TransactionHandler",
+        "block": "web3data.handlers.block:BlockHandler",
+        "signature": "web3data.handlers.signature:SignatureHandler",
+        "market": "web3data.handlers.market:MarketHandler",
+    }
+    WEBSOCKET_HANDLER = "web3data.handlers.websocket:WebsocketHandler"
+
+    def __init__(
+        self,
+        api_key: str,
+        blockchain_id: str,
+        chain: Chains,
+        session: requests.Session = None,
+        cache: ResponseCache = None,
+        disk_cache: DiskCache = None,
+        block_cache: BlockCache = None,
+        retry: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        concurrency_limiter: ConcurrencyLimiter = None,
+        singleflight: SingleFlight = None,
+        timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    ):
         """Return a new API handler instance.
 
         :param api_key: The API key to attach to request headers
         :param blockchain_id: The ID of the blockchain to query for
         :param chain: The enum value for the blockchain to query for
+        :param session: The HTTP session shared by all sub-handlers, a new
+            pooled session is created if none is given
+        :param cache: An optional response cache shared by all sub-handlers
+        :param disk_cache: An optional persistent cache for immutable responses
+        :param block_cache: An optional reorg-aware cache for blocks by number
+        :param retry: An optional policy for retrying failed requests, shared by
+            all sub-handlers and RPC calls
+        :param rate_limiter: An optional limiter pacing the requests of all
+            sub-handlers and RPC calls
+        :param concurrency_limiter: An optional adaptive limit on the number of
+            requests in flight across all sub-handlers and RPC calls
+        :param singleflight: An optional group coalescing identical requests that
+            are in flight at the same time
+        :param timeout: The connect and read timeout in seconds of all requests,
+            either as one number or a (connect, read) tuple, or None to wait
+            indefinitely
         """
 
         self.api_key = api_key
         self.blockchain_id = blockchain_id
         self.chain = chain
+        self.session = session or self._create_session()
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.block_cache = block_cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.singleflight = singleflight
+        self.timeout = timeout
 
         # TODO: Validation
-        headers = {
+        self.headers = {
             "x-api-key": self.api_key,
             "x-amberdata-blockchain-id": self.blockchain_id,
             "User-Agent": f"web3data-py v{__version__}",
         }
-        self.address = AddressHandler(headers, chain)
-        self.token = TokenHandler(headers, chain)
-        self.contract = ContractHandler(headers, chain)
-        self.transaction = TransactionHandler(headers, chain)
-        self.block = BlockHandler(headers, chain)
-        self.signature = SignatureHandler(headers, chain)
-        self.market = MarketHandler(headers, chain)
-        self.websocket = WebsocketHandler(
-            api_key=self.api_key, blockchain_id=self.blockchain_id
+        # sub-handlers and the websocket handler are created on first access,
+        # where the websocket handler creates the block handler it backfills from
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str):
+        """Create a sub-handler or the websocket handler on first access.
+
+        The handler is then stored as a regular attribute, so later lookups
+        do not pass through here again.
+
+        :param name: The name of the missing attribute
+        :return: The newly created handler
+        """
+        if name != "websocket" and name not in self.SUBHANDLERS:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        with self._lock:
+            handler = self.__dict__.get(name)
+            if handler is None:
+                handler = self._create_handler(name)
+                setattr(self, name, handler)
+        return handler
+
+    def _create_handler(self, name: str):
+        """Create the sub-handler or websocket handler of the given name.
+
+        :param name: The attribute name of the handler
+        :return: The handler sharing this handler's session and transport options
+        """
+        if name == "websocket":
+            return _load_handler(self.WEBSOCKET_HANDLER)(
+                api_key=self.api_key,
+                blockchain_id=self.blockchain_id,
+                blocks=self.block,
+            )
+        return _load_handler(self.SUBHANDLERS[name])(
+            self.headers,
+            self.chain,
+            session=self.session,
+            cache=self.cache,
+            disk_cache=self.disk_cache,
+            block_cache=self.block_cache,
+            retry=self.retry,
+            rate_limiter=self.rate_limiter,
+            concurrency_limiter=self.concurrency_limiter,
+            singleflight=self.singleflight,
+            timeout=self.timeout,
         )
 
+    @staticmethod
+    def _create_session():
+        return create_session()
+
+    @staticmethod
+    def _rpc_payload(method: str, params: List[Any], ident: int) -> Dict:
+        """Build the JSON-RPC request object for a single call.
+
+        :param method: The RPC method to call
+        :param params: Parameters attached to the RPC call
+        :param ident: RPC call identifier
+        :return: The JSON-RPC request object
+        """
+        return {"jsonrpc": "2.0", "method": method, "params": params, "id": ident}
+
+    def _check_rpc_support(self):
+        """Raise an :code:`APIError` if the chain does not support RPC calls."""
+        if self.chain not in (Chains.ETH, Chains.ETH_RINKEBY, Chains.BTC):
+            raise APIError(f"RPC calls are not supported for {self.chain}")
+
+    def _rpc_request(self, payload: Union[Dict, List[Dict]]) -> Dict:
+        """Build the HTTP request arguments for an RPC call.
+
+        :param payload: A JSON-RPC request object or a batch of them
+        :return: The keyword arguments to pass to the session's POST method
+        """
+        self._check_rpc_support()
+        return {
+            "url": "https://rpc.web3api.io/",
+            "json": payload,
+            "headers": {"x-amberdata-blockchain-id": self.blockchain_id},
+            "params": {"x-api-key": self.api_key},
+        }
+
+    def _rpc_post(self, payload: Union[Dict, List[Dict]]) -> Any:
+        """Send a JSON-RPC request object or batch and parse the response.
+
+        :param payload: A JSON-RPC request object or a batch of them
+        :return: The parsed response body
+        """
+        request = self._rpc_request(payload)
+
+        def fetch() -> Outcome:
+            resp = self.session.post(**request, timeout=request_timeout(self.timeout))
+            return resp.status_code, resp.headers, resp.content
+
+        _, _, content = send_request(self, request["url"], fetch)
+        return jsonlib.loads(content)
+
+    def _rpc_batches(
+        self, calls: Iterable[Tuple[str, List[Any]]], batch_size: int
+    ) -> Iterator[List[Dict]]:
+        """Split RPC calls into JSON-RPC batch arrays.
+
+        Every call is assigned its position in :code:`calls` as identifier, so
+        responses can be matched back to their requests.
+
+        :param calls: The (method, params) tuples to call
+        :param batch_size: The maximum number of calls per batch
+        :return: An iterator over the batch arrays
+        """
+        batch = []
+        for ident, (method, params) in enumerate(calls):
+            batch.append(self._rpc_payload(method, params, ident))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _match_rpc_responses(batch: List[Dict], response: Any) -> List[Dict]:
+        """Match the responses of a batch back to its requests by identifier.
+
+        If the API answers a batch with a single error object, that error is
+        reported for every call in the batch. Calls without a response are
+        reported with an internal error.
+
+        :param batch: The JSON-RPC request objects sent in the batch
+        :param response: The parsed response body
+        :return: One response object per request, in request order
+        """
+        if not isinstance(response, list):
+            error = (
+                (response or {}).get("error") if isinstance(response, dict) else None
+            )
+            response = [
+                {"jsonrpc": "2.0", "id": call["id"], "error": error} for call in batch
+            ]
+        by_id = {item.get("id"): item for item in response if isinstance(item, dict)}
+        missing = {"code": -32603, "message": "No response received for this call"}
+        return [
+            by_id.get(call["id"])
+            or {"jsonrpc": "2.0", "id": call["id"], "error": missing}
+            for call in batch
+        ]
+
+    @staticmethod
+    def _rpc_batch_error(batch: List[Dict], error: Exception) -> List[Dict]:
+        """Report a failed batch request as an error of each of its calls.
+
+        :param batch: The JSON-RPC request objects sent in the batch
+        :param error: The exception raised while sending the batch
+        :return: One error response object per request, carrying the exception
+            in its :code:`data` field
+        """
+        return [
+            {
+                "jsonrpc": "2.0",
+                "id": call["id"],
+                "error": {
+                    "code": -32603,
+                    "message": f"The batch request failed: {error}",
+                    "data": error,
+                },
+            }
+            for call in batch
+        ]
+
     def rpc(self, method: str, params: List[str], ident: int = 1):
         """Perform an HTTP POST RPC call on the API.
 
@@ -59,17 +294,34 @@ class APIHandler:
         :param params: Parameters attached to the RPC call
         :param ident: RPC call identifier
         """
-        if self.chain not in (Chains.ETH, Chains.ETH_RINKEBY, Chains.BTC):
-            raise APIError(f"RPC calls are not supported for {self.chain}")
+        return self._rpc_post(self._rpc_payload(method, params, ident))
 
-        return requests.post(
-            "https://rpc.web3api.io/",
-            json={
-                "jsonrpc": "2.0",
-                "method": method,
-                "params": params,
-                "id": ident,
-            },
-            headers={"x-amberdata-blockchain-id": self.blockchain_id},
-            params={"x-api-key": self.api_key},
-        ).json()
+    def rpc_batch(
+        self,
+        calls: Iterable[Tuple[str, List[Any]]],
+        batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+    ) -> List[Dict]:
+        """Perform many RPC calls as JSON-RPC batch requests.
+
+        The calls are sent in batch arrays of up to :code:`batch_size` calls
+        each, so checking many balances or receipts costs one round trip per
+        batch instead of one per call. Errors are reported per call in the
+        :code:`error` field of the respective response object. If a batch
+        request fails as a whole, e.g. due to a connection error, each of its
+        calls reports an internal error with the exception as :code:`data`,
+        and the results of the other batches are still returned.
+
+        :param calls: The (method, params) tuples to call
+        :param batch_size: The maximum number of calls per HTTP request
+        :return: One JSON-RPC response object per call, in call order
+        """
+        self._check_rpc_support()
+        results = []
+        for batch in self._rpc_batches(calls, batch_size):
+            try:
+                response = self._rpc_post(batch)
+            except Exception as exc:
+                results.extend(self._rpc_batch_error(batch, exc))
+            else:
+                results.extend(self._match_rpc_responses(batch, response))
+        return results
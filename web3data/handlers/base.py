@@ -1,13 +1,90 @@
 """This module contains the API handler's base class."""
 
-from json.decoder import JSONDecodeError
-from typing import Dict, Union
+import copy
+import gzip
+import threading
+from collections import deque
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
 import requests
 from requests.compat import urljoin
 
+from web3data import jsonlib
+from web3data.cache import MISSING, BlockCache, DiskCache, ResponseCache, SingleFlight
 from web3data.chains import Chains
+from web3data.deadline import (
+    DEFAULT_TIMEOUT,
+    ContextExecutor,
+    Timeout,
+    check_deadline,
+    request_timeout,
+)
 from web3data.exceptions import APIError, EmptyResponseError
+from web3data.ratelimit import ConcurrencyLimiter, RateLimiter
+from web3data.retry import Outcome, RetryPolicy
+from web3data.session import create_session
+from web3data.streaming import DEFAULT_CHUNK_SIZE, CSVParser, RecordParser
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SHARD_BLOCKS = 10000
+DEFAULT_SHARD_PAGES = 10
+DEFAULT_SCAN_WORKERS = 4
+
+Persist = Union[bool, Callable[[Any], bool]]
+
+
+def is_error_response(response: Any) -> bool:
+    """Return whether a parsed API response reports an error status.
+
+    The API mirrors the HTTP status in the :code:`status` member of its
+    response envelope, which also reports errors of otherwise successful
+    requests.
+
+    :param response: The parsed API response
+    :return: Whether the response's status is 400 or above
+    """
+    if not isinstance(response, dict):
+        return False
+    try:
+        return int(response.get("status") or 0) >= 400
+    except (TypeError, ValueError):
+        return False
+
+
+def send_request(handler: Any, url: str, request: Callable[[], Outcome]) -> Outcome:
+    """Perform a request within the rate limit, retrying it if configured.
+
+    This is shared by all handlers sending requests, which provide the
+    :code:`retry`, :code:`rate_limiter`, and :code:`concurrency_limiter`
+    attributes.
+
+    :param handler: The handler whose transport options apply
+    :param url: The full request URL
+    :param request: A function performing the request once
+    :return: The status code, headers, and body of the final response
+    """
+
+    def attempt() -> Outcome:
+        check_deadline()
+        if handler.rate_limiter is not None:
+            handler.rate_limiter.acquire(url)
+        if handler.concurrency_limiter is not None:
+            return handler.concurrency_limiter.call(request)
+        return request()
+
+    if handler.retry is None:
+        return attempt()
+    return handler.retry.call(attempt)
 
 
 class BaseHandler:
@@ -25,19 +102,378 @@ class BaseHandler:
         Chains.ZEC,
     )
 
-    def __init__(self, chain: Chains):
+    def __init__(
+        self,
+        chain: Chains,
+        session: requests.Session = None,
+        cache: ResponseCache = None,
+        disk_cache: DiskCache = None,
+        block_cache: BlockCache = None,
+        retry: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        concurrency_limiter: ConcurrencyLimiter = None,
+        singleflight: SingleFlight = None,
+        timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    ):
+        """Return a new handler instance.
+
+        :param chain: The blockchain to fetch the information for
+        :param session: The HTTP session to perform requests with, a new
+            pooled session is created if none is given
+        :param cache: An optional cache for parsed API responses
+        :param disk_cache: An optional persistent cache for immutable responses
+        :param block_cache: An optional reorg-aware cache for blocks by number
+        :param retry: An optional policy for retrying failed requests
+        :param rate_limiter: An optional limiter pacing the requests sent
+        :param concurrency_limiter: An optional adaptive limit on the number of
+            requests in flight
+        :param singleflight: An optional group coalescing identical requests that
+            are in flight at the same time
+        :param timeout: The connect and read timeout in seconds, either as one
+            number or a (connect, read) tuple, or None to wait indefinitely
+        """
         self.chain = chain
+        self.session = session or self._create_session()
+        self.cache = cache
+        self.disk_cache = disk_cache
+        self.block_cache = block_cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.singleflight = singleflight
+        self.timeout = timeout
+        self._export = None  # the CSV sink and compression of an export copy
+
+    @staticmethod
+    def _create_session():
+        return create_session()
+
+    def export_csv(self, sink: BinaryIO = None, compress: bool = False):
+        """Return a copy of this handler that streams its responses as CSV.
+
+        Queries made through the copy request the CSV format, bypass the caches,
+        and never hold the full response in memory. Without a sink, they return
+        an iterator over the parsed rows. With a sink, the raw CSV is written to
+        it chunk by chunk, optionally gzip-compressed, and they return the number
+        of CSV bytes received.
+
+        :param sink: An optional binary file-like object to write the CSV to
+        :param compress: Whether to gzip-compress the CSV written to the sink
+        :return: The exporting copy of the handler
+        """
+        handler = copy.copy(self)
+        handler._export = (sink, compress)
+        return handler
 
     def _check_chain_supported(self):
         if self.chain in self.LIMITED:
             raise APIError(f"This method is not supported for {self.chain}")
 
+    def _fanout(self, workers: int) -> int:
+        """Return the number of concurrent tasks a fan-out path should schedule.
+
+        With an adaptive concurrency limiter, enough tasks to reach its maximum
+        limit are scheduled, and the limiter decides how many of their requests
+        are in flight at once. This only applies to fan-outs over a known set
+        of requests, such as balance chunks, scan shards, and market windows.
+        Pagination keeps the caller's prefetch window, as scheduling more
+        tasks would request pages past the end of the result set.
+
+        :param workers: The number of concurrent tasks requested by the caller
+        :return: The number of concurrent tasks to schedule
+        """
+        if self.concurrency_limiter is None:
+            return workers
+        return max(workers, self.concurrency_limiter.max_limit)
+
+    @staticmethod
+    def _page_records(response: Dict) -> List[Dict]:
+        """Extract the list of records from a paginated API response.
+
+        :param response: The parsed API response of a single page
+        :return: The records contained in the page
+        """
+        payload = response.get("payload") or {}
+        records = payload.get("records")
+        if records is None:
+            records = payload.get("data") or []
+        return records
+
+    @staticmethod
+    def _check_page(response: Dict) -> Dict:
+        """Raise an :code:`APIError` if a page reports an error status.
+
+        An error response carries no records and would otherwise be taken
+        for the last page, silently cutting the iteration short.
+
+        :param response: The parsed API response of a single page
+        :return: The unchanged response
+        """
+        if is_error_response(response):
+            raise APIError(
+                f"The API returned status {response.get('status')}: {response}"
+            )
+        return response
+
+    @staticmethod
+    def _is_last_page(response: Dict, page: int, size: int, count: int) -> bool:
+        """Determine whether a page is the last one of a result set.
+
+        :param response: The parsed API response of the page
+        :param page: The zero-based index of the page
+        :param size: The requested number of records per page
+        :param count: The number of records contained in the page
+        :return: True if no further pages need to be requested
+        """
+        total = (response.get("payload") or {}).get("totalRecords")
+        if total is not None and (page + 1) * size >= int(total):
+            return True
+        return count < size
+
+    def _paginate(
+        self,
+        query: Callable[..., Dict],
+        *args,
+        size: int = DEFAULT_PAGE_SIZE,
+        page: int = 0,
+        prefetch: int = 0,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """Lazily iterate over the records of a paginated endpoint.
+
+        Without prefetching, pages are requested one at a time and only once
+        all records of the previous page have been consumed, so memory usage
+        does not depend on the size of the full result set. Iteration stops
+        after the first short or empty page, while a page reporting an error
+        status raises an :code:`APIError`.
+
+        With a prefetch window, up to :code:`prefetch` upcoming pages are
+        fetched concurrently on a bounded worker pool while records are still
+        yielded in page order. No further pages are requested once a short or
+        empty page has arrived.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param size: The number of records to request per page
+        :param page: The zero-based index of the first page to request
+        :param prefetch: The number of pages to fetch ahead concurrently
+        :param kwargs: Additional filters to pass to the query method
+        :return: An iterator over the records of all pages
+        """
+        if prefetch > 0:
+            yield from self._prefetch_pages(query, args, kwargs, size, page, prefetch)
+            return
+
+        while True:
+            response = self._check_page(query(*args, page=page, size=size, **kwargs))
+            records = self._page_records(response)
+            yield from records
+            if self._is_last_page(response, page, size, len(records)):
+                return
+            page += 1
+
+    def _prefetch_pages(
+        self,
+        query: Callable[..., Dict],
+        args: tuple,
+        kwargs: Dict,
+        size: int,
+        page: int,
+        prefetch: int,
+    ) -> Iterator[Dict]:
+        """Iterate over paginated records while fetching pages ahead.
+
+        A page reporting an error status raises an :code:`APIError` once the
+        records of all preceding pages have been yielded.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param kwargs: Additional filters to pass to the query method
+        :param size: The number of records to request per page
+        :param page: The zero-based index of the first page to request
+        :param prefetch: The maximum number of pages in flight
+        :return: An iterator over the records of all pages
+        """
+        exhausted = threading.Event()
+
+        def fetch(number: int) -> Dict:
+            response = self._check_page(query(*args, page=number, size=size, **kwargs))
+            count = len(self._page_records(response))
+            if self._is_last_page(response, number, size, count):
+                exhausted.set()
+            return response
+
+        pending = deque()
+        executor = ContextExecutor(max_workers=prefetch)
+        try:
+            for _ in range(prefetch):
+                pending.append((page, executor.submit(fetch, page)))
+                page += 1
+            while pending:
+                number, future = pending.popleft()
+                response = future.result()
+                records = self._page_records(response)
+                yield from records
+                if self._is_last_page(response, number, size, len(records)):
+                    return
+                if not exhausted.is_set():
+                    pending.append((page, executor.submit(fetch, page)))
+                    page += 1
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     @staticmethod
+    def _block_number(record: Dict) -> int:
+        """Return the block number of a record for ordering purposes.
+
+        :param record: A transaction or log record
+        :return: The record's block number
+        """
+        return int(record.get("blockNumber") or 0)
+
+    def _crawl_shard(
+        self,
+        query: Callable[..., Dict],
+        args: tuple,
+        kwargs: Dict,
+        shard: range,
+        size: int,
+        max_pages: int,
+    ) -> Optional[List[Dict]]:
+        """Fetch all records of a block range shard ordered by block number.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param kwargs: Additional filters to pass to the query method
+        :param shard: The block range to fetch records for
+        :param size: The number of records to request per page
+        :param max_pages: The number of pages after which to give up on the shard
+        :return: The shard's records, or None if the shard should be split
+        """
+        filters = dict(kwargs, blockNumberGte=shard.start, blockNumberLt=shard.stop)
+        records = []
+        for page in range(max_pages):
+            response = self._check_page(query(*args, page=page, size=size, **filters))
+            page_records = self._page_records(response)
+            records.extend(page_records)
+            if self._is_last_page(response, page, size, len(page_records)):
+                return sorted(records, key=self._block_number)
+        if len(shard) == 1:
+            # a single block cannot be split any further
+            records.extend(
+                self._paginate(query, *args, size=size, page=max_pages, **filters)
+            )
+            return records
+        return None
+
+    def _scan_blocks(
+        self,
+        query: Callable[..., Dict],
+        *args,
+        start_block: int,
+        end_block: int,
+        shard_blocks: int = DEFAULT_SHARD_BLOCKS,
+        max_pages: int = DEFAULT_SHARD_PAGES,
+        workers: int = DEFAULT_SCAN_WORKERS,
+        size: int = DEFAULT_PAGE_SIZE,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """Crawl a block range in concurrent shards, ordered by block number.
+
+        The block range is split into shards of :code:`shard_blocks` blocks,
+        which are fetched concurrently on a bounded worker pool. A shard that
+        spans more than :code:`max_pages` pages is split in half and both
+        halves are crawled again, so busy ranges end up in small shards.
+        Records are yielded in ascending block number order, and a page
+        reporting an error status raises an :code:`APIError`.
+
+        :param query: The handler method returning a single page
+        :param args: Positional arguments to pass to the query method
+        :param start_block: The first block number to include
+        :param end_block: The block number to stop at (exclusive)
+        :param shard_blocks: The initial number of blocks per shard
+        :param max_pages: The number of pages after which a shard is split
+        :param workers: The number of shards to crawl concurrently
+        :param size: The number of records to request per page
+        :param kwargs: Additional filters to pass to the query method
+        :return: An iterator over the records of the block range
+        """
+        shards = (
+            range(lower, min(lower + shard_blocks, end_block))
+            for lower in range(start_block, end_block, shard_blocks)
+        )
+        workers = self._fanout(workers)
+        executor = ContextExecutor(max_workers=workers)
+
+        def submit(shard: range):
+            return shard, executor.submit(
+                self._crawl_shard, query, args, kwargs, shard, size, max_pages
+            )
+
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < workers:
+                    shard = next(shards, None)
+                    if shard is None:
+                        break
+                    pending.append(submit(shard))
+                if not pending:
+                    return
+                shard, future = pending.popleft()
+                records = future.result()
+                if records is None:
+                    middle = shard.start + len(shard) // 2
+                    pending.appendleft(submit(range(middle, shard.stop)))
+                    pending.appendleft(submit(range(shard.start, middle)))
+                    continue
+                yield from records
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _cache_lookup(self, key: Hashable, url: str, persist: Persist) -> Any:
+        """Look up a response in the configured caches.
+
+        :param key: The request's cache key
+        :param url: The full request URL
+        :param persist: Whether the response may be read from the persistent cache
+        :return: The cached response, or :code:`MISSING` if there is none
+        """
+        if self.cache is not None:
+            result = self.cache.get(key)
+            if result is not MISSING:
+                return result
+        if persist and self.disk_cache is not None:
+            return self.disk_cache.get(key)
+        return MISSING
+
+    def _cache_store(self, key: Hashable, url: str, persist: Persist, result: Any):
+        """Store a fresh response in the configured caches.
+
+        :param key: The request's cache key
+        :param url: The full request URL
+        :param persist: Whether, or a predicate deciding whether, the response is
+            immutable and may be written to the persistent cache
+        :param result: The parsed API response
+        """
+        if self.cache is not None:
+            self.cache.set(key, result, url)
+        if self.disk_cache is not None and (
+            persist(result) if callable(persist) else persist
+        ):
+            self.disk_cache.set(key, result)
+
     def raw_query(
+        self,
         base_url: str,
         route: str,
         headers: Dict[str, str],
         params: Dict[str, str],
+        persist: Persist = False,
     ) -> Union[Dict, str]:
         """Perform an HTTP GET request on an API REST endpoint.
 
@@ -45,24 +481,180 @@ class BaseHandler:
         :param route: The endpoint route after the base (variable suffix)
         :param headers: Headers to attach to the API request
         :param params: Query parameters to attach to the URL
-        :return: The API response parsed into a dict
+        :param persist: Whether the response is immutable and may be kept in the
+            persistent cache, or a predicate on the response deciding that
+        :return: The API response parsed into a dict, or the CSV rows or number of
+            bytes written by an :code:`export_csv` copy
         """
-        resp = requests.get(
-            url=urljoin(base_url, route), headers=headers, params=params
-        )
+        url = urljoin(base_url, route)
+        if self._export is not None:
+            sink, compress = self._export
+            params = dict(params, format="csv")
+            if sink is None:
+                return self._stream_csv(url, headers, params)
+            return self._download_csv(url, headers, params, sink, compress)
+
+        key = ResponseCache.make_key(url, headers, params)
+        result = self._cache_lookup(key, url, persist)
+        if result is not MISSING:
+            return result
+
+        def fetch() -> Outcome:
+            resp = self.session.get(
+                url=url,
+                headers=headers,
+                params=params,
+                timeout=request_timeout(self.timeout),
+            )
+            return resp.status_code, resp.headers, resp.content
+
+        def load() -> Union[Dict, str]:
+            status, _, content = send_request(self, url, fetch)
+            if status >= 400:
+                # error responses are neither parsed nor cached
+                raise APIError(f"The API returned status {status}: {content}")
+            result = self._parse_response(content, params)
+            if not is_error_response(result):
+                self._cache_store(key, url, persist, result)
+            return result
+
+        if self.singleflight is None:
+            return load()
+        return self.singleflight.do(SingleFlight.make_key(url, headers, params), load)
+
+    def _open_stream(
+        self, url: str, headers: Dict[str, str], params: Dict[str, str]
+    ) -> requests.Response:
+        """Send a GET request and return the response before reading its body.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: The response, whose body still needs to be streamed and closed
+        """
+
+        def fetch() -> Outcome:
+            resp = self.session.get(
+                url=url,
+                headers=headers,
+                params=params,
+                timeout=request_timeout(self.timeout),
+                stream=True,
+            )
+            if resp.status_code >= 400:
+                # error bodies are small, reading them releases the connection
+                resp.content
+            return resp.status_code, resp.headers, resp
+
+        status, _, resp = send_request(self, url, fetch)
+        if status >= 400:
+            raise APIError(f"The API returned status {status}: {resp.content}")
+        return resp
 
-        if not resp.content:
+    def stream_query(
+        self,
+        base_url: str,
+        route: str,
+        headers: Dict[str, str],
+        params: Dict[str, str],
+    ) -> Iterator[Dict]:
+        """Stream the records of an API REST endpoint without buffering the response.
+
+        The records in :code:`payload.records` are parsed incrementally while the
+        response body arrives, and yielded one at a time, so the full document is
+        never held in memory. The request is only sent once iteration starts, and
+        streamed responses bypass the caches.
+
+        :param base_url: The API base URL (common prefix)
+        :param route: The endpoint route after the base (variable suffix)
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: An iterator over the response's records
+        """
+        url = urljoin(base_url, route)
+        with self._open_stream(url, headers, params) as resp:
+            parser, received = RecordParser(), 0
+            try:
+                for chunk in resp.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                    received += len(chunk)
+                    yield from parser.feed(chunk)
+                if not received:
+                    raise EmptyResponseError("The API returned an empty JSON response")
+                yield from parser.close()
+            except ValueError as exc:
+                raise APIError(f"Unable to parse API response to JSON: {exc}")
+
+    def _stream_csv(
+        self, url: str, headers: Dict[str, str], params: Dict[str, str]
+    ) -> Iterator[List[str]]:
+        """Stream the rows of a CSV response.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :return: An iterator over the parsed rows
+        """
+        with self._open_stream(url, headers, params) as resp:
+            parser, received = CSVParser(), 0
+            for chunk in resp.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                received += len(chunk)
+                yield from parser.feed(chunk)
+            if not received:
+                raise EmptyResponseError("The API returned an empty CSV response")
+            yield from parser.close()
+
+    def _download_csv(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        params: Dict[str, str],
+        sink: BinaryIO,
+        compress: bool,
+    ) -> int:
+        """Write a CSV response to a file-like object chunk by chunk.
+
+        :param url: The full request URL
+        :param headers: Headers to attach to the API request
+        :param params: Query parameters to attach to the URL
+        :param sink: The binary file-like object to write to
+        :param compress: Whether to gzip-compress the written data
+        :return: The number of CSV bytes received
+        """
+        received = 0
+        with self._open_stream(url, headers, params) as resp:
+            target = gzip.GzipFile(fileobj=sink, mode="wb") if compress else sink
+            try:
+                for chunk in resp.iter_content(chunk_size=DEFAULT_CHUNK_SIZE):
+                    received += len(chunk)
+                    target.write(chunk)
+            finally:
+                if compress:
+                    # writes the gzip trailer, but leaves the sink open
+                    target.close()
+        if not received:
+            raise EmptyResponseError("The API returned an empty CSV response")
+        return received
+
+    @staticmethod
+    def _parse_response(content: bytes, params: Dict[str, str]) -> Union[Dict, str]:
+        """Validate a raw API response body and parse it.
+
+        :param content: The raw response body
+        :param params: The query parameters the request was sent with
+        :return: The API response parsed into a dict, or the raw text for CSV
+        """
+        if not content:
             # triggered if the API returns empty response body
             raise EmptyResponseError("The API returned an empty JSON response")
 
         if params.get("format", "") == "csv":
-            return resp.text
+            return content.decode("utf-8", errors="replace")
 
         try:
-            result = resp.json()
-        except JSONDecodeError:
+            result = jsonlib.loads(content)
+        except ValueError:
             # triggered e.g. when API returns empty response or XML error message
-            raise APIError(f"Unable to parse API response to JSON: {resp.content}")
+            raise APIError(f"Unable to parse API response to JSON: {content}")
         if not result:
             # triggered if the API returns empty JSON object response
             raise EmptyResponseError("The API returned an empty JSON response")
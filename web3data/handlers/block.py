@@ -1,22 +1,63 @@
 """This module contains the address subhandler."""
 
-from typing import Any, Dict
+import re
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterator, Optional
 
+from web3data.cache import MISSING
 from web3data.chains import Chains
-from web3data.handlers.base import BaseHandler
+from web3data.handlers.base import BaseHandler, Persist
+
+if TYPE_CHECKING:  # pragma: no cover
+    from web3data.handlers.websocket import WebsocketHandler
+
+BLOCK_HASH = re.compile(r"(0x)?[0-9a-fA-F]{64}")
+BLOCK_URL = re.compile(r"/blocks/(\d+)/(transactions)?$")
+HEAD_URL = re.compile(r"/blocks//?(metrics/latest)?$")
+
+
+def _block_hash(response: Dict) -> Optional[str]:
+    """Extract the hash of the block a response refers to.
+
+    :param response: The parsed block or block transactions response
+    :return: The block hash, or None if the response does not contain it
+    """
+    payload = response.get("payload") or {}
+    if isinstance(payload, dict) and payload.get("hash"):
+        return payload["hash"]
+    records = BaseHandler._page_records(response) if isinstance(payload, dict) else []
+    return records[0].get("blockHash") if records else None
+
+
+def _head_number(response: Dict) -> Optional[int]:
+    """Extract the highest block number contained in a response.
+
+    :param response: The parsed blocks or block metrics response
+    :return: The highest block number, or None if the response contains none
+    """
+    payload = response.get("payload") or {}
+    if not isinstance(payload, dict):
+        return None
+    numbers = [
+        int(item[field])
+        for item in [payload, *BaseHandler._page_records(response)]
+        for field in ("number", "blockNumber")
+        if isinstance(item, dict) and item.get(field) is not None
+    ]
+    return max(numbers, default=None)
 
 
 class BlockHandler(BaseHandler):
     """The subhandler for block-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`BlockHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
         self.base_url = "https://web3api.io/api/v2/blocks/{id}/"
 
@@ -26,6 +67,7 @@ class BlockHandler(BaseHandler):
         headers: Dict[str, str],
         params: Dict[str, Any],
         block_id: str = "",
+        persist: Persist = False,
     ) -> Dict:
         """Helper method for block-related API queries.
 
@@ -33,6 +75,7 @@ class BlockHandler(BaseHandler):
         :param headers: The headers to attach to the request
         :param params: The request's query parameters
         :param block_id: The block ID to query for
+        :param persist: Whether the response may be kept in the persistent cache
         :return: The parsed API response
         """
         return self.raw_query(
@@ -40,11 +83,91 @@ class BlockHandler(BaseHandler):
             route=route,
             headers=headers,
             params=params,
+            persist=persist,
         )
 
+    def _persistence(self, block_id: str) -> Persist:
+        """Determine whether a block response may be kept in the persistent cache.
+
+        A block hash always identifies the same contents, whereas the block
+        at a given number may still change through a reorganization until it
+        is deep enough below the chain head known to the block cache.
+
+        :param block_id: The block's ID (number or hash)
+        :return: Whether, or a predicate deciding whether, to persist the response
+        """
+        if BLOCK_HASH.fullmatch(str(block_id)):
+            return True
+        if self.block_cache is not None and str(block_id).isdigit():
+            number = int(block_id)
+            return lambda response: self.block_cache.is_confirmed(self.chain, number)
+        return False
+
+    def _cache_lookup(self, key: Hashable, url: str, persist: Persist) -> Any:
+        """Look up a response in the block cache and the configured caches.
+
+        :param key: The request's cache key
+        :param url: The full request URL
+        :param persist: Whether the response may be read from the persistent cache
+        :return: The cached response, or :code:`MISSING` if there is none
+        """
+        if self.block_cache is not None and BLOCK_URL.search(url):
+            result = self.block_cache.get(key)
+            if result is not MISSING:
+                return result
+        return super()._cache_lookup(key, url, persist)
+
+    def _cache_store(self, key: Hashable, url: str, persist: Persist, result: Any):
+        """Store a fresh response and update the block cache's view of the chain.
+
+        Block responses by number are added to the block cache, and responses
+        of the block list and latest metrics endpoints advance the chain head.
+
+        :param key: The request's cache key
+        :param url: The full request URL
+        :param persist: Whether, or a predicate deciding whether, the response is
+            immutable and may be written to the persistent cache
+        :param result: The parsed API response
+        """
+        if self.block_cache is not None and isinstance(result, dict):
+            match = BLOCK_URL.search(url)
+            if match:
+                number = int(match.group(1))
+                self.block_cache.set(
+                    self.chain, number, key, result, _block_hash(result)
+                )
+            elif HEAD_URL.search(url):
+                head = _head_number(result)
+                if head is not None:
+                    self.block_cache.observe(self.chain, head)
+        super()._cache_store(key, url, persist, result)
+
+    def track_head(self, websocket: "WebsocketHandler"):
+        """Follow the chain head through a websocket block subscription.
+
+        Every new block advances the block cache's head and evicts cached
+        responses of a block number that shows up with a different hash. The
+        subscription is active once the websocket handler is running.
+
+        :param websocket: The websocket handler of the same chain
+        """
+        if self.block_cache is None:
+            raise ValueError("Tracking the chain head requires a block cache")
+
+        def on_block(ws, message):
+            block = message["params"]["result"]
+            self.block_cache.observe(
+                self.chain, int(block["number"]), block.get("hash")
+            )
+
+        websocket.register("block", callback=on_block)
+
     def single(self, block_id: str, **kwargs) -> Dict:
         """Retrieves the block specified by its id (number or hash).
 
+        With a block cache, blocks by number are cached indefinitely once
+        they have enough confirmations, and briefly while near the chain tip.
+
         :param block_id: The block's ID to fetch information for
         :key validationMethod: The validation method to be added to the response: none, basic, full.
             Default: none. (str)
@@ -56,11 +179,14 @@ class BlockHandler(BaseHandler):
             route="",
             headers=self.initial_headers,
             params=kwargs,
+            persist=self._persistence(block_id),
         )
 
     def total(self, **kwargs) -> Dict:
         """Retrieves all the blocks within the specified range.
 
+        With a block cache, the response advances the cache's chain head.
+
         :key startNumber: The range of blocks to return, inclusive (startNumber and endNumber
             should be both specified, or both empty) (str)
         :key endNumber: The end of the range of blocks to return, exclusive (startNumber and endNumber
@@ -161,6 +287,7 @@ class BlockHandler(BaseHandler):
             can not exceed 1 minute (startDate and endDate should be both specified, or both empty) (int)
         :key endDate: Filter by transactions executed before this date. Note that the interval
             can not exceed 1 minute (startDate and endDate should be both specified, or both empty). (int)
+        :key page: The page number to return. (int)
         :key size: The number of results to return. (int)
         :return: The API response parsed into a dict
         """
@@ -169,11 +296,27 @@ class BlockHandler(BaseHandler):
             route="transactions",
             headers=self.initial_headers,
             params=kwargs,
+            persist=self._persistence(block_id),
         )
 
+    def iter_transactions(self, block_id: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the transactions of a block, page by page.
+
+        This takes the same filters as :code:`transactions`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param block_id: The block's ID to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.transactions, block_id, **kwargs)
+
     def metrics_latest(self, **kwargs) -> Dict:
         """Get metrics for recent confirmed blocks for a given blockchain.
 
+        With a block cache, the response advances the cache's chain head.
+
         :key timeFormat: The time format to use for the timestamps (milliseconds, ms, iso, iso8611). (str)
         :return: The API response parsed into a dict
         """
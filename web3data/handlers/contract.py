@@ -9,14 +9,15 @@ from web3data.handlers.base import BaseHandler
 class ContractHandler(BaseHandler):
     """The subhandler for contract-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`ContractHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
         self.base_url = "https://web3api.io/api/v2/contracts/{hash}/"
 
@@ -26,6 +27,7 @@ class ContractHandler(BaseHandler):
         headers: Dict[str, str],
         params: Dict[str, str],
         address: str = "",
+        persist: bool = False,
     ) -> Dict:
         """Helper method for contract-related API queries.
 
@@ -33,6 +35,7 @@ class ContractHandler(BaseHandler):
         :param headers: The headers to attach to the request
         :param params: The request's query parameters
         :param address: The contract address string to query for
+        :param persist: Whether the response may be kept in the persistent cache
         :return: The parsed API response
         """
 
@@ -42,6 +45,7 @@ class ContractHandler(BaseHandler):
             route=route,
             headers=headers,
             params=params,
+            persist=persist,
         )
 
     def audit(self, address: str, **kwargs) -> Dict:
@@ -98,4 +102,5 @@ class ContractHandler(BaseHandler):
             route="functions",
             headers=self.initial_headers,
             params=kwargs,
+            persist=True,
         )
@@ -1,26 +1,219 @@
 """This module contains the address subhandler."""
 
+import json
 import warnings
-from typing import Dict
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from web3data.chains import Chains
-from web3data.handlers.base import BaseHandler
+from web3data.deadline import ContextExecutor
+from web3data.exceptions import APIError
+from web3data.handlers.base import BaseHandler, is_error_response
+
+MAX_HISTORY_WINDOW = timedelta(days=180)
+DEFAULT_SHARD_WINDOW = timedelta(days=30)
+DEFAULT_SHARD_WORKERS = 4
+ISO_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z")
+
+Timestamp = Union[int, str, datetime]
+
+
+def _to_millis(value: Timestamp) -> int:
+    """Convert a date filter value to a millisecond UNIX timestamp.
+
+    :param value: A millisecond timestamp or a datetime
+    :return: The timestamp in milliseconds
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def _time_windows(
+    start: Timestamp, end: Timestamp, window: timedelta
+) -> List[Tuple[int, int]]:
+    """Split a date range into consecutive windows.
+
+    :param start: The start of the date range
+    :param end: The end of the date range
+    :param window: The maximum length of a single window
+    :return: A list of (start, end) millisecond timestamp tuples
+    """
+    if window <= timedelta(0) or window > MAX_HISTORY_WINDOW:
+        raise ValueError(
+            f"The window must be positive and at most {MAX_HISTORY_WINDOW}"
+        )
+    start, end = _to_millis(start), _to_millis(end)
+    if start >= end:
+        raise ValueError("The start date must be before the end date")
+
+    step = int(window.total_seconds() * 1000)
+    return [(lower, min(lower + step, end)) for lower in range(start, end, step)]
+
+
+def _row_time(row: Any, index: int) -> Optional[int]:
+    """Return the timestamp of a row in milliseconds.
+
+    :param row: A dict-based or list-based row
+    :param index: The position of the timestamp in list-based rows
+    :return: The timestamp, or None if the row has no readable timestamp
+    """
+    if isinstance(row, dict):
+        value = row.get("timestamp")
+    else:
+        value = row[index] if index < len(row) else None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        for time_format in ISO_FORMATS:
+            try:
+                value = datetime.strptime(value.replace("Z", "+0000"), time_format)
+                break
+            except ValueError:
+                pass
+        else:
+            return None
+    if isinstance(value, (int, float, datetime)) and not isinstance(value, bool):
+        return _to_millis(value)
+    return None
+
+
+def _merge_rows(
+    chunks: List[List[Any]], boundaries: List[int], columns: List[str]
+) -> List[Any]:
+    """Concatenate the rows of consecutive windows in timestamp order.
+
+    Adjacent windows share their boundary timestamp, so rows at that instant
+    may be returned by both. Such a row is dropped from the later window once
+    for every identical boundary row of the earlier window, which keeps
+    identical rows returned by a single window, e.g. two equal trades within
+    the same millisecond. Rows without a timestamp are kept at the end.
+
+    :param chunks: The rows of every window, in window order
+    :param boundaries: The timestamps shared by each pair of adjacent windows
+    :param columns: The column names describing list-based rows
+    :return: The ordered rows without boundary duplicates
+    """
+    index = columns.index("timestamp") if "timestamp" in columns else 0
+
+    def key(row):
+        return json.dumps(row, sort_keys=True, default=str)
+
+    merged = list(chunks[0]) if chunks else []
+    for previous, chunk, boundary in zip(chunks, chunks[1:], boundaries):
+        shared = Counter(
+            key(row) for row in previous if _row_time(row, index) == boundary
+        )
+        for row in chunk:
+            if shared and _row_time(row, index) == boundary and shared[key(row)] > 0:
+                shared[key(row)] -= 1
+                continue
+            merged.append(row)
+
+    def order(row):
+        timestamp = _row_time(row, index)
+        return timestamp is None, timestamp or 0
+
+    return sorted(merged, key=order)
+
+
+def _merge_windows(responses: List[Dict], windows: List[Tuple[int, int]]) -> Dict:
+    """Merge the responses of consecutive time windows into one.
+
+    An :code:`APIError` is raised if any window returned an error response,
+    rather than merging a range with a hole in it.
+
+    :param responses: The parsed API responses in window order
+    :param windows: The (start, end) millisecond timestamps of the windows
+    :return: A single response covering the full date range
+    """
+    for response, (lower, upper) in zip(responses, windows):
+        if is_error_response(response):
+            raise APIError(
+                f"The window from {lower} to {upper} failed with status "
+                f"{response.get('status')}: {response}"
+            )
+    result = dict(responses[0])
+    payload = dict(result.get("payload") or {})
+    metadata = dict(payload.get("metadata") or {})
+    columns = metadata.get("columns") or []
+    if "startDate" in metadata:
+        metadata["startDate"] = windows[0][0]
+    if "endDate" in metadata:
+        metadata["endDate"] = windows[-1][1]
+
+    boundaries = [upper for _, upper in windows[:-1]]
+    chunks = [(r.get("payload") or {}).get("data") for r in responses]
+    if isinstance(chunks[0], dict):
+        keys = {}  # the keys of all windows, in order of appearance
+        for chunk in chunks:
+            keys.update(dict.fromkeys(chunk or {}))
+        data = {
+            key: _merge_rows(
+                [(chunk or {}).get(key) or [] for chunk in chunks], boundaries, columns
+            )
+            for key in keys
+        }
+    else:
+        data = _merge_rows([chunk or [] for chunk in chunks], boundaries, columns)
+
+    if metadata:
+        payload["metadata"] = metadata
+    payload["data"] = data
+    result["payload"] = payload
+    return result
 
 
 class MarketHandler(BaseHandler):
     """The subhandler for market-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`MarketHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
         self.base_url = "https://web3api.io/api/v2/"
 
+    def _sharded_query(
+        self,
+        query: Callable[..., Dict],
+        pair: str,
+        start: Timestamp,
+        end: Timestamp,
+        window: timedelta,
+        workers: int,
+        **kwargs,
+    ) -> Dict:
+        """Query a date range in parallel windows and merge the results.
+
+        :param query: The handler method returning a single window
+        :param pair: The asset pair to look up
+        :param start: The start of the date range
+        :param end: The end of the date range
+        :param window: The maximum length of a single window
+        :param workers: The number of windows to fetch concurrently
+        :param kwargs: Additional filters to pass to the query method
+        :return: A single response covering the full date range
+        """
+        windows = _time_windows(start, end, window)
+
+        def fetch(bounds):
+            return query(pair, startDate=bounds[0], endDate=bounds[1], **kwargs)
+
+        with ContextExecutor(max_workers=self._fanout(workers)) as executor:
+            responses = list(executor.map(fetch, windows))
+        return _merge_windows(responses, windows)
+
     def exchanges(self, **kwargs) -> Dict:
         """Retrieves information about supported exchange-pairs.
 
@@ -100,6 +293,18 @@ class MarketHandler(BaseHandler):
             params=kwargs,
         )
 
+    def iter_rankings(self, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the market rankings, page by page.
+
+        This takes the same filters as :code:`rankings`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.rankings, **kwargs)
+
     def price_pairs(self) -> Dict:
         """Retrieves the assets for which latest prices are available.
 
@@ -245,6 +450,33 @@ class MarketHandler(BaseHandler):
             params=kwargs,
         )
 
+    def sharded_uniswap_liquidity(
+        self,
+        pair: str,
+        startDate: Timestamp,
+        endDate: Timestamp,
+        window: timedelta = DEFAULT_SHARD_WINDOW,
+        workers: int = DEFAULT_SHARD_WORKERS,
+        **kwargs,
+    ) -> Dict:
+        """Retrieves the Uniswap liquidity for an arbitrarily long date range.
+
+        The date range is split into windows of at most :code:`window` length,
+        which are fetched concurrently and merged into a single response. The
+        merged rows are ordered by timestamp and deduplicated at window edges.
+        This takes the same filters as :code:`uniswap_liquidity`.
+
+        :param pair: The asset pair to look up
+        :param startDate: The start of the date range (ms timestamp or datetime)
+        :param endDate: The end of the date range (ms timestamp or datetime)
+        :param window: The maximum length of a single window, at most 180 days
+        :param workers: The number of windows to fetch concurrently
+        :return: The merged API responses parsed into a dict
+        """
+        return self._sharded_query(
+            self.uniswap_liquidity, pair, startDate, endDate, window, workers, **kwargs
+        )
+
     def trade_pairs_historical(self, pair: str, **kwargs) -> Dict:
         """Retrieves the historical (time series) trade data for the specified
         pair.
@@ -266,6 +498,39 @@ class MarketHandler(BaseHandler):
             params=kwargs,
         )
 
+    def sharded_trade_pairs_historical(
+        self,
+        pair: str,
+        startDate: Timestamp,
+        endDate: Timestamp,
+        window: timedelta = DEFAULT_SHARD_WINDOW,
+        workers: int = DEFAULT_SHARD_WORKERS,
+        **kwargs,
+    ) -> Dict:
+        """Retrieves the historical trade data for an arbitrarily long date range.
+
+        The date range is split into windows of at most :code:`window` length,
+        which are fetched concurrently and merged into a single response. The
+        merged rows are ordered by timestamp and deduplicated at window edges.
+        This takes the same filters as :code:`trade_pairs_historical`.
+
+        :param pair: The asset pair to look up
+        :param startDate: The start of the date range (ms timestamp or datetime)
+        :param endDate: The end of the date range (ms timestamp or datetime)
+        :param window: The maximum length of a single window, at most 180 days
+        :param workers: The number of windows to fetch concurrently
+        :return: The merged API responses parsed into a dict
+        """
+        return self._sharded_query(
+            self.trade_pairs_historical,
+            pair,
+            startDate,
+            endDate,
+            window,
+            workers,
+            **kwargs,
+        )
+
     def ohlcv_pair_latest(self, pair: str, **kwargs) -> Dict:
         """Retrieves the latest open-high-low-close for the specified pair.
 
@@ -307,6 +572,39 @@ class MarketHandler(BaseHandler):
             params=kwargs,
         )
 
+    def sharded_ohlcv_pair_historical(
+        self,
+        pair: str,
+        startDate: Timestamp,
+        endDate: Timestamp,
+        window: timedelta = DEFAULT_SHARD_WINDOW,
+        workers: int = DEFAULT_SHARD_WORKERS,
+        **kwargs,
+    ) -> Dict:
+        """Retrieves the historical open-high-low-close data for an arbitrarily long date range.
+
+        The date range is split into windows of at most :code:`window` length,
+        which are fetched concurrently and merged into a single response. The
+        merged rows are ordered by timestamp and deduplicated at window edges.
+        This takes the same filters as :code:`ohlcv_pair_historical`.
+
+        :param pair: The asset pair to look up
+        :param startDate: The start of the date range (ms timestamp or datetime)
+        :param endDate: The end of the date range (ms timestamp or datetime)
+        :param window: The maximum length of a single window, at most 180 days
+        :param workers: The number of windows to fetch concurrently
+        :return: The merged API responses parsed into a dict
+        """
+        return self._sharded_query(
+            self.ohlcv_pair_historical,
+            pair,
+            startDate,
+            endDate,
+            window,
+            workers,
+            **kwargs,
+        )
+
     def price_pair_historical(self, pair: str, **kwargs) -> Dict:
         """Retrieves the historical prices for the specified asset.
 
@@ -396,6 +694,39 @@ class MarketHandler(BaseHandler):
             params=kwargs,
         )
 
+    def sharded_ticker_bid_ask_historical(
+        self,
+        pair: str,
+        startDate: Timestamp,
+        endDate: Timestamp,
+        window: timedelta = DEFAULT_SHARD_WINDOW,
+        workers: int = DEFAULT_SHARD_WORKERS,
+        **kwargs,
+    ) -> Dict:
+        """Retrieves the historical bid/ask ticker data for an arbitrarily long date range.
+
+        The date range is split into windows of at most :code:`window` length,
+        which are fetched concurrently and merged into a single response. The
+        merged rows are ordered by timestamp and deduplicated at window edges.
+        This takes the same filters as :code:`ticker_bid_ask_historical`.
+
+        :param pair: The asset pair to look up
+        :param startDate: The start of the date range (ms timestamp or datetime)
+        :param endDate: The end of the date range (ms timestamp or datetime)
+        :param window: The maximum length of a single window, at most 180 days
+        :param workers: The number of windows to fetch concurrently
+        :return: The merged API responses parsed into a dict
+        """
+        return self._sharded_query(
+            self.ticker_bid_ask_historical,
+            pair,
+            startDate,
+            endDate,
+            window,
+            workers,
+            **kwargs,
+        )
+
     def token_price_historical(self, address: str, **kwargs) -> Dict:
         """
 
@@ -487,3 +818,15 @@ class MarketHandler(BaseHandler):
             headers=self.initial_headers,
             params=kwargs,
         )
+
+    def iter_token_rankings_latest(self, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the latest token rankings, page by page.
+
+        This takes the same filters as :code:`token_rankings_latest`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.token_rankings_latest, **kwargs)
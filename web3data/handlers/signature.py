@@ -9,14 +9,15 @@ from web3data.handlers.base import BaseHandler
 class SignatureHandler(BaseHandler):
     """The subhandler for signature-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`SignatureHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
         self.base_url = "https://web3api.io/api/v2/signatures/"
 
@@ -33,4 +34,5 @@ class SignatureHandler(BaseHandler):
             route=signature,
             headers=self.initial_headers,
             params={},
+            persist=True,
         )
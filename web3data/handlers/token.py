@@ -1,6 +1,6 @@
 """This module contains the address subhandler."""
 
-from typing import Dict
+from typing import Dict, Iterator
 
 from web3data.chains import Chains
 from web3data.handlers.base import BaseHandler
@@ -9,26 +9,31 @@ from web3data.handlers.base import BaseHandler
 class TokenHandler(BaseHandler):
     """The subhandler for token-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`TokenHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
 
-    def _token_query(self, address: str, route: str, params: Dict[str, str]):
+    def _token_query(
+        self, address: str, route: str, params: Dict[str, str], stream: bool = False
+    ):
         """Helper method for token-related API queries.
 
         :param route: The endpoint route to query
         :param params: The request's query parameters
         :param address: The token address string to query for
-        :return: The parsed API response
+        :param stream: Whether to stream the response's records instead
+        :return: The parsed API response, or an iterator over its records
         """
         self._check_chain_supported()
-        return self.raw_query(
+        query = self.stream_query if stream else self.raw_query
+        return query(
             base_url=f"https://web3api.io/api/v2/tokens/{address}/",
             route=route,
             headers=self.initial_headers,
@@ -91,6 +96,32 @@ class TokenHandler(BaseHandler):
         self._check_chain_supported()
         return self._token_query(address, "holders/latest", kwargs)
 
+    def iter_holders_latest(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the latest holders of a token, page by page.
+
+        This takes the same filters as :code:`holders_latest`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The token address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.holders_latest, address, **kwargs)
+
+    def stream_holders_latest(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Stream the latest holders of a token without buffering the response.
+
+        This takes the same filters as :code:`holders_latest`, but parses the records
+        of a single, possibly very large page incrementally and yields them one by one.
+
+        :param address: The token's smart contract address
+        :key page: The page number to return. (int)
+        :key size: Number of records per page (int)
+        :return: An iterator over the records of the page
+        """
+        return self._token_query(address, "holders/latest", kwargs, stream=True)
+
     def supply_historical(self, address: str, **kwargs) -> Dict:
         """Retrieves the historical token supplies (and derivatives) for the
         specified address.
@@ -153,6 +184,19 @@ class TokenHandler(BaseHandler):
         self._check_chain_supported()
         return self._token_query(address, "transfers", kwargs)
 
+    def iter_transfers(self, address: str, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over the transfers of a token, page by page.
+
+        This takes the same filters as :code:`transfers`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :param address: The token address to fetch information for
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.transfers, address, **kwargs)
+
     def velocity(self, address: str, **kwargs) -> Dict:
         """Retrieves the historical velocity for the specified address.
 
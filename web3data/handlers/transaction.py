@@ -1,22 +1,36 @@
 """This module contains the address subhandler."""
 
-from typing import Dict
+from typing import Dict, Iterator
 
 from web3data.chains import Chains
 from web3data.handlers.base import BaseHandler
 
 
+def _is_confirmed(response: Dict) -> bool:
+    """Determine whether a transaction response is final.
+
+    Pending transactions have not been included in a block yet, so their
+    information may still change and must not be persisted.
+
+    :param response: The parsed transaction information response
+    :return: True if the transaction has been included in a block
+    """
+    payload = response.get("payload") if isinstance(response, dict) else None
+    return isinstance(payload, dict) and payload.get("blockNumber") is not None
+
+
 class TransactionHandler(BaseHandler):
     """The subhandler for transaction-related queries."""
 
-    def __init__(self, initial_headers: Dict[str, str], chain: Chains):
+    def __init__(self, initial_headers: Dict[str, str], chain: Chains, **kwargs):
         """Return a new :code:`TranscationHandler` instance.
 
         :param initial_headers: Base headers to attach to every request
         :param chain: The blockchain to fetch the information for
+        :param kwargs: Transport options passed on to :code:`BaseHandler`
         """
 
-        super().__init__(chain)
+        super().__init__(chain, **kwargs)
         self.initial_headers = initial_headers
         self.base_url = "https://web3api.io/api/v2/transactions/"
 
@@ -37,6 +51,7 @@ class TransactionHandler(BaseHandler):
             route=tx_hash,
             headers=self.initial_headers,
             params=kwargs,
+            persist=_is_confirmed,
         )
 
     def token_transfers(self, tx_hash: str) -> Dict:
@@ -70,6 +85,7 @@ class TransactionHandler(BaseHandler):
             Options: true, false. (bool)
         :key currency: The currency of the price information (usd or btc.)
             - only used in conjunction with includePrice. (str)
+        :key page: The page number to return. (int)
         :key size: The number of results to return. (int)
         :key includeFunctions: Indicates whether or not to include log
             information for each transaction, if available (false|true) (bool)
@@ -85,6 +101,37 @@ class TransactionHandler(BaseHandler):
             params=kwargs,
         )
 
+    def scan_find(self, start_block: int, end_block: int, **kwargs) -> Iterator[Dict]:
+        """Crawl matching transactions over a block range in concurrent shards.
+
+        The block range is split into shards that are fetched in parallel, and
+        shards spanning too many pages are split again. This takes the same
+        filters as :code:`find` and yields the records ordered by block number.
+
+        :param start_block: The first block number to include
+        :param end_block: The block number to stop at (exclusive)
+        :key shard_blocks: The initial number of blocks per shard (int)
+        :key max_pages: The number of pages after which a shard is split (int)
+        :key workers: The number of shards to crawl concurrently (int)
+        :key size: The number of records to request per page (int)
+        :return: An iterator over the records of the block range
+        """
+        return self._scan_blocks(
+            self.find, start_block=start_block, end_block=end_block, **kwargs
+        )
+
+    def iter_find(self, **kwargs) -> Iterator[Dict]:
+        """Lazily iterate over all transactions matching the given filters, page by page.
+
+        This takes the same filters as :code:`find`, but yields the individual
+        records and requests the next page only once the current one is consumed.
+
+        :key size: The number of records to request per page (int)
+        :key prefetch: The number of pages to fetch ahead concurrently, 0 to disable (int)
+        :return: An iterator over the records of all pages
+        """
+        return self._paginate(self.find, **kwargs)
+
     def gas_percentiles(self, **kwargs) -> Dict:
         """Retrieves the latest gas price percentiles for the transactions.
 
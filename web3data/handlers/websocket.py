@@ -1,38 +1,88 @@
 """This module implements the websocket handler."""
 
-import json
-from typing import Iterable, Union
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
 from uuid import uuid4
 
-import websocket
-
+from web3data import jsonlib
+from web3data.dispatch import DEFAULT_MAX_LATENCY, Batcher, Dispatcher
 from web3data.exceptions import APIError
+from web3data.retry import RETRY_EXCEPTIONS, RetryPolicy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from web3data.handlers.block import BlockHandler
+
+DEFAULT_RECONNECT_ATTEMPTS = 10
+DEFAULT_MAX_BACKFILL = 1000
 
 
 class WebsocketHandler:
     """The subhandler for websocket-related queries."""
 
-    def __init__(self, api_key: str, blockchain_id: str, url: str = None):
+    def __init__(
+        self,
+        api_key: str,
+        blockchain_id: str,
+        url: str = None,
+        reconnect: bool = True,
+        backoff: RetryPolicy = None,
+        blocks: "BlockHandler" = None,
+        max_backfill: int = DEFAULT_MAX_BACKFILL,
+        dispatcher: Dispatcher = None,
+    ):
         """Return a new :code:`WebsocketHandler` instance.
 
         :param api_key: The API key to attach to payloads
         :param blockchain_id: The ID of the blockchain to query for
         :param url: The websocket server URL
+        :param reconnect: Whether to reconnect when the connection drops
+        :param backoff: The delays between reconnection attempts, where
+            :code:`max_attempts` limits the consecutive failed attempts
+        :param blocks: An optional block handler to fetch the blocks missed by
+            "block" subscriptions
+        :param max_backfill: The maximum number of missed blocks to fetch per gap
+        :param dispatcher: An optional dispatcher running the callbacks on worker
+            threads, instead of on the thread reading from the socket, in which
+            case missed blocks are fetched on a separate thread as well
         """
 
         self.api_key = api_key
         self.blockchain_id = blockchain_id
         self.url = url or "wss://ws.web3api.io/"
+        self.reconnect = reconnect
+        self.backoff = backoff or RetryPolicy(max_attempts=DEFAULT_RECONNECT_ATTEMPTS)
+        self.blocks = blocks
+        self.max_backfill = max_backfill
+        self.dispatcher = dispatcher
 
         self.expected_ids = set()  # internal IDs that still need confirmation
         self.internal_registry = {}  # internal ID -> payload and callback
         self.external_registry = {}  # subscription ID -> internal ID
+        self.heads = {}  # internal ID -> number and hash of the last block delivered
+
+        self.reconnects = 0
+        self.backfilled = 0
+        self._opened = False
+        self._stopped = threading.Event()
+        self._backfills = set()  # threads fetching missed blocks
+        self._lock = threading.Lock()
+
+        self.ws = self._create_app()
 
-        self.ws = websocket.WebSocketApp(
+    def _create_app(self):
+        """Create the websocket client application.
+
+        :return: The websocket client instance, not connected yet
+        """
+        # websocket-client is slow to import and only needed for streaming
+        import websocket
+
+        return websocket.WebSocketApp(
             self.url,
             on_message=lambda ws, message: self._on_message(ws, message),
             on_error=lambda ws, message: self._on_error(ws, message),
-            on_close=lambda ws: self._on_close(ws),
+            on_close=lambda ws, *args: self._on_close(ws),
             on_open=lambda ws: self._on_open(ws),
             header=[
                 f"x-api-key: {self.api_key}",
@@ -45,9 +95,15 @@ class WebsocketHandler:
 
         :param payload: The payload to JSON serialize and send
         """
-        self.ws.send(json.dumps(payload))  # pragma: no cover
-
-    def register(self, params: Union[Iterable[str], str], callback=None):
+        self.ws.send(jsonlib.dumps(payload))  # pragma: no cover
+
+    def register(
+        self,
+        params: Union[Iterable[str], str],
+        callback=None,
+        batch_size: Optional[int] = None,
+        max_latency: Optional[float] = DEFAULT_MAX_LATENCY,
+    ) -> str:
         """Register a new event to listen for and its callback.
 
         This will subscribe to the given event identifiers and execute
@@ -61,8 +117,21 @@ class WebsocketHandler:
         The latter argiment is the message, deserialized from the JSON object
         received by the websocket server.
 
+        With a dispatcher, the callback runs on one of its worker threads.
+        Errors raised by the callback are passed on to the error handler.
+
+        With a batch size, the callback receives a list of messages instead,
+        once :code:`batch_size` messages arrived or the oldest of them waited
+        for :code:`max_latency` seconds. Without a dispatcher, batches flushed
+        due to latency are delivered on the subscription's flusher thread.
+
         :param params: The event to subscribe to
         :param callback: The callback function to execute
+        :param batch_size: The number of messages to deliver at once, or None to
+            deliver every message separately
+        :param max_latency: The maximum number of seconds a message waits for
+            its batch to fill up, or None to only deliver full batches
+        :return: The internal ID of the subscription
         """
         params = (params,) if type(params) is str else params
 
@@ -77,6 +146,15 @@ class WebsocketHandler:
                 "params": params,
             },
         }
+        if batch_size is not None:
+            self.internal_registry[internal_id]["batch"] = Batcher(
+                lambda messages: self._deliver(
+                    self.ws, internal_id, callback, messages
+                ),
+                batch_size,
+                max_latency,
+            )
+        return internal_id
 
     def unregister(self, external_id):
         """Unregister a subscription from the websocket server.
@@ -88,9 +166,22 @@ class WebsocketHandler:
 
         :param external_id: The subscription ID to remove
         """
+        self._websocket_send(self._remove(external_id))
+
+    def _remove(self, external_id: str) -> Dict:
+        """Remove a subscription from the registries.
+
+        :param external_id: The subscription ID to remove
+        :return: The unsubscribe message to send to the websocket server
+        """
         internal_id = self.external_registry[external_id]
-        del self.internal_registry[internal_id]
+        subscription = self.internal_registry.pop(internal_id)
         del self.external_registry[external_id]
+        if "batch" in subscription:
+            subscription["batch"].close()
+        self.heads.pop(internal_id, None)
+        if self.dispatcher is not None:
+            self.dispatcher.remove(internal_id)
 
         internal_id = str(uuid4())
         self.expected_ids.add(internal_id)
@@ -100,7 +191,7 @@ class WebsocketHandler:
             "params": [external_id],
             "id": internal_id,
         }
-        self._websocket_send(payload)
+        return payload
 
     def run(self, **kwargs):
         """Run the websocket listening loop.
@@ -109,6 +200,11 @@ class WebsocketHandler:
         events to the websocket server, handle the responses, and then
         distribute the incoming messages across the registered callbacks.
 
+        If the connection drops, the handler reconnects after the backoff
+        policy's delay and subscribes to all registered events again. The
+        loop ends once :code:`close` is called, or when reconnecting is
+        disabled or keeps failing.
+
         Any keyword arguments passed to this method are passed on to the
         websocket client's :code:`run_forever` method. Please consult the
         project's documentation for more details:
@@ -116,7 +212,32 @@ class WebsocketHandler:
 
         :param kwargs: Additional arguments to pass to the websocket client
         """
-        self.ws.run_forever(**kwargs)  # pragma: no cover
+        self._stopped.clear()
+        failures = 0
+        while True:
+            self._opened = False
+            self.ws.run_forever(**kwargs)
+            if not self.reconnect or self._stopped.is_set():
+                break
+            # only count attempts that failed before the connection opened
+            failures = 0 if self._opened else failures + 1
+            if failures >= self.backoff.max_attempts:
+                break
+            if self._stopped.wait(self.backoff.delay(failures + 1)):
+                break
+            self.reconnects += 1
+        for thread in list(self._backfills):
+            thread.join()
+        for subscription in list(self.internal_registry.values()):
+            if "batch" in subscription:
+                subscription["batch"].flush()
+        if self.dispatcher is not None:
+            self.dispatcher.join()
+
+    def close(self):
+        """Stop the listening loop and close the connection."""
+        self._stopped.set()
+        self.ws.close()
 
     def _on_message(self, ws, message):
         """An internal message handler to distribute responses.
@@ -136,15 +257,36 @@ class WebsocketHandler:
         :param ws: The websocket client instance
         :param message: The raw received message as serialized JSON
         """
-        message = json.loads(message)
+        self._route(ws, jsonlib.loads(message))
+
+    def _route(self, ws, message: Dict[str, Any]):
+        """Route a deserialized message to its subscription or registry.
 
+        :param ws: The websocket client instance
+        :param message: The message received from the websocket server
+        """
         if message.get("params"):
             # handle data message and execute user callback
             external_id = message.get("params", {}).get("subscription")
             internal_id = self.external_registry[external_id]
             subscription = self.internal_registry[internal_id]
-            callback = subscription["callback"]
-            callback(ws, message)
+            with self._lock:
+                backlog = subscription.get("backlog")
+                if backlog is not None:
+                    # missed blocks are still being fetched, so wait for them
+                    backlog.append(message)
+                    return
+                if self.dispatcher is not None and self._gap(internal_id, message):
+                    subscription["backlog"] = deque()
+                    thread = threading.Thread(
+                        target=self._drain_backlog,
+                        args=(ws, internal_id, message),
+                        daemon=True,
+                    )
+                    self._backfills.add(thread)
+                    thread.start()
+                    return
+            self._process(ws, internal_id, message)
         elif type(message.get("result")) is str:
             # handle subscription acknowledgement
             internal_id = message.get("id")
@@ -157,6 +299,145 @@ class WebsocketHandler:
         else:
             raise APIError(f"Received unknown message: {message}")
 
+    def _process(self, ws, internal_id: str, message: Dict[str, Any]):
+        """Fill the gap before a data message and deliver the messages.
+
+        :param ws: The websocket client instance
+        :param internal_id: The internal ID of the subscription
+        :param message: The data message received
+        """
+        subscription = self.internal_registry.get(internal_id)
+        if subscription is None:
+            # the subscription was removed while its backlog was drained
+            return
+        for item in self._backfill(internal_id, message):
+            if "batch" in subscription:
+                subscription["batch"].add(item)
+            else:
+                self._deliver(ws, internal_id, subscription["callback"], item)
+
+    def _drain_backlog(self, ws, internal_id: str, message: Dict[str, Any]):
+        """Process a message with a gap and the messages that arrived meanwhile.
+
+        This runs on a separate thread, so fetching the missed blocks does not
+        stop the socket thread from reading the messages of other subscriptions.
+
+        :param ws: The websocket client instance
+        :param internal_id: The internal ID of the subscription
+        :param message: The data message whose gap needs to be filled
+        """
+        try:
+            while True:
+                try:
+                    self._process(ws, internal_id, message)
+                except Exception as error:
+                    self._on_error(ws, error)
+                with self._lock:
+                    subscription = self.internal_registry.get(internal_id, {})
+                    if not subscription.get("backlog"):
+                        subscription.pop("backlog", None)
+                        return
+                    message = subscription["backlog"].popleft()
+        finally:
+            self._backfills.discard(threading.current_thread())
+
+    def _deliver(
+        self, ws, internal_id: str, callback, message: Union[Dict, List[Dict]]
+    ):
+        """Call a subscription's callback, or queue the call on the dispatcher.
+
+        :param ws: The websocket client instance
+        :param internal_id: The internal ID of the subscription
+        :param callback: The subscription's callback function
+        :param message: The data message, or batch of messages, to deliver
+        """
+        if self.dispatcher is None:
+            self._call(callback, ws, message)
+        else:
+            self.dispatcher.submit(internal_id, self._call, callback, ws, message)
+
+    def _call(self, callback, ws, message: Union[Dict, List[Dict]]):
+        """Call a callback, reporting its errors to the error handler.
+
+        :param callback: The subscription's callback function
+        :param ws: The websocket client instance
+        :param message: The data message, or batch of messages, to deliver
+        """
+        try:
+            callback(ws, message)
+        except Exception as error:
+            self._on_error(ws, error)
+
+    def _gap(self, internal_id: str, message: Dict[str, Any]) -> range:
+        """Return the numbers of the blocks missed before a block message.
+
+        :param internal_id: The internal ID of the subscription
+        :param message: The data message received
+        :return: The numbers of the blocks to fetch, empty if there are none
+        """
+        payload = self.internal_registry[internal_id]["payload"]
+        last = self.heads.get(internal_id)
+        if (
+            self.blocks is None
+            or tuple(payload["params"]) != ("block",)
+            or last is None
+        ):
+            return range(0)
+        number = int(message["params"]["result"]["number"])
+        return range(max(last[0] + 1, number - self.max_backfill), number)
+
+    def _backfill(self, internal_id: str, message: Dict[str, Any]) -> List[Dict]:
+        """Fill the gap between a block message and the last block delivered.
+
+        Missed blocks, e.g. those mined while the connection was down, are
+        fetched through the block handler and delivered in order before the
+        new block, as messages of the same subscription. A block delivered
+        already, as after resubscribing, is skipped. Blocks the API does not
+        return are reported to the error handler and skipped. If fetching a
+        block fails due to a connection error or timeout, only the blocks
+        before it are delivered, and the rest of the gap, including the new
+        block, is fetched again once the next block arrives.
+
+        :param internal_id: The internal ID of the subscription
+        :param message: The data message received
+        :return: The messages to deliver, in order
+        """
+        payload = self.internal_registry[internal_id]["payload"]
+        if self.blocks is None or tuple(payload["params"]) != ("block",):
+            return [message]
+
+        params = message["params"]
+        head = int(params["result"]["number"]), params["result"].get("hash")
+        if head == self.heads.get(internal_id):
+            return []
+
+        messages = []
+        for number in self._gap(internal_id, message):
+            try:
+                block = self.blocks.single(number)
+            except APIError as error:
+                self._on_error(self.ws, error)
+                continue
+            except RETRY_EXCEPTIONS as error:
+                self._on_error(self.ws, error)
+                return messages
+            result = block.get("payload") or {}
+            self.heads[internal_id] = number, result.get("hash")
+            messages.append(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "subscription",
+                    "params": {
+                        "subscription": params["subscription"],
+                        "result": result,
+                    },
+                }
+            )
+            self.backfilled += 1
+        self.heads[internal_id] = head
+        messages.append(message)
+        return messages
+
     def _on_error(self, ws, error):
         """An internal handler for websocket errors.
 
@@ -179,6 +460,9 @@ class WebsocketHandler:
 
         :param ws: The websocket client instance
         """
+        # subscription IDs are only valid on the connection that assigned them
+        self.external_registry.clear()
+        self.expected_ids.clear()
         self.on_close(ws)
 
     def on_close(self, ws):
@@ -193,8 +477,9 @@ class WebsocketHandler:
         """An internal handler for websocket open events.
 
         This handler will iterate over all internal identifiers
-        and submit subscription a request for each. If no payload
-        information can be found, a :code:`ValueError` is raised.
+        and submit subscription a request for each, so subscriptions are
+        renewed after reconnecting. If no payload information can be found,
+        a :code:`ValueError` is raised.
 
         After the requests have been sent, the user-defined on-open
         handler is called.
@@ -207,8 +492,10 @@ class WebsocketHandler:
                 raise ValueError(
                     f"Payload for internal ID {internal_id} does not exist"
                 )
+            self.expected_ids.add(internal_id)
             self._websocket_send(payload)
 
+        self._opened = True
         self.on_open(ws)
 
     def on_open(self, ws):
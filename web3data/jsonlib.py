@@ -0,0 +1,97 @@
+"""This module contains the pluggable JSON backend used to parse API responses.
+
+By default, the standard library's :code:`json` module is used, which
+decodes every document exactly. If :code:`orjson` is installed, it can be
+enabled with :code:`set_backend("orjson")` to speed up parsing of large
+payloads, and custom functions can be plugged in the same way.
+
+Note that orjson decodes integer literals beyond 64 bits, such as token
+amounts in wei, as floats and thus loses precision. Only enable it if the
+responses of interest contain no such integers.
+"""
+
+import json
+from typing import Any, Callable, NamedTuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JSONBackend(NamedTuple):
+    """A pair of JSON decoding and encoding functions."""
+
+    name: str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any], str]
+
+
+def _orjson_loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON with orjson, falling back to the standard library.
+
+    The few documents orjson rejects but the standard library accepts, such
+    as those containing :code:`NaN`, are parsed with :code:`json`. Invalid
+    documents still raise a :code:`json.JSONDecodeError`.
+
+    :param data: The JSON document
+    :return: The decoded object
+    """
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode("utf-8")
+
+
+BACKENDS = {"json": JSONBackend("json", json.loads, json.dumps)}
+if orjson is not None:
+    BACKENDS["orjson"] = JSONBackend("orjson", _orjson_loads, _orjson_dumps)
+
+_backend = BACKENDS["json"]
+
+
+def get_backend() -> JSONBackend:
+    """Return the active JSON backend."""
+    return _backend
+
+
+def set_backend(backend: Union[str, JSONBackend]) -> JSONBackend:
+    """Select the JSON backend used to parse and serialize API payloads.
+
+    A custom backend's :code:`loads` must accept bytes and raise a
+    :code:`ValueError` subclass, e.g. :code:`json.JSONDecodeError`, for invalid
+    documents.
+
+    :param backend: The name of an available backend ("json" or "orjson"), or a
+        custom :code:`JSONBackend`
+    :return: The previously active backend
+    """
+    global _backend
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"The JSON backend {backend} is not available")
+        backend = BACKENDS[backend]
+    previous, _backend = _backend, backend
+    return previous
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode a JSON document with the active backend.
+
+    :param data: The JSON document
+    :return: The decoded object
+    """
+    return _backend.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Encode an object as a JSON document with the active backend.
+
+    :param obj: The object to encode
+    :return: The JSON document
+    """
+    return _backend.dumps(obj)
@@ -0,0 +1,310 @@
+"""This module contains the client-side request rate and concurrency limiters."""
+
+import re
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from web3data.retry import Outcome
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 32
+DEFAULT_BACKOFF_RATIO = 0.5
+DEFAULT_LATENCY_TOLERANCE = 2.0
+DEFAULT_LATENCY_SMOOTHING = 0.1
+THROTTLE_STATUSES = frozenset((429, 503))
+
+
+class TokenBucket:
+    """A thread-safe token bucket pacing requests to a fixed rate.
+
+    Callers reserve a token and are told how long to wait before using it,
+    so the bucket itself never blocks. This makes it usable from threads and
+    event loops alike. Up to :code:`burst` requests may be sent at once after
+    an idle period, after which requests are spaced :code:`1 / rate` seconds
+    apart.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Return a new :code:`TokenBucket` instance.
+
+        :param rate: The number of requests allowed per second
+        :param burst: The number of requests that may be sent back to back
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("The rate must be positive and the burst at least 1")
+        self.rate = rate
+        self.burst = burst
+
+        self._interval = 1.0 / rate
+        self._next = 0.0  # the time at which the bucket is full again
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token from the bucket.
+
+        :return: The number of seconds to wait before the token may be used
+        """
+        with self._lock:
+            now = time.monotonic()
+            full_at = max(self._next, now)
+            start = max(now, full_at - (self.burst - 1) * self._interval)
+            self._next = full_at + self._interval
+            return start - now
+
+
+class RateLimiter:
+    """A client-side rate limiter shared by all handlers of a client.
+
+    Every request takes a token from the global bucket. Requests whose URL
+    matches one of the endpoint family patterns additionally take a token
+    from that family's bucket, where the first matching pattern wins. The
+    family token is taken first, and the global token only once the family
+    allows the request, so that the global token is never spent before the
+    request is actually sent. Concurrent threads and coroutines together thus
+    never exceed the configured rates, and requests queued behind a stricter
+    family do not hold up other endpoints.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        families: Dict[str, Union[float, TokenBucket]] = None,
+    ):
+        """Return a new :code:`RateLimiter` instance.
+
+        :param rate: The number of requests allowed per second across all endpoints
+        :param burst: The number of requests that may be sent back to back
+        :param families: A mapping of URL regular expressions to the rate, or a
+            dedicated token bucket, of the matching endpoints
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.families = [
+            (
+                re.compile(pattern),
+                limit if isinstance(limit, TokenBucket) else TokenBucket(limit),
+            )
+            for pattern, limit in (families or {}).items()
+        ]
+
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _buckets(self, url: str) -> List[TokenBucket]:
+        """Return the buckets a request needs a token from.
+
+        :param url: The full request URL
+        :return: The matching family bucket, if any, followed by the global bucket
+        """
+        for pattern, bucket in self.families:
+            if pattern.search(url):
+                return [bucket, self.bucket]
+        return [self.bucket]
+
+    def _count_throttled(self):
+        """Record that a request had to wait for a token."""
+        with self._lock:
+            self.throttled += 1
+
+    def acquire(self, url: str):
+        """Block the calling thread until a request may be sent.
+
+        :param url: The full request URL
+        """
+        throttled = False
+        for bucket in self._buckets(url):
+            delay = bucket.reserve()
+            if delay > 0:
+                throttled = True
+                time.sleep(delay)
+        if throttled:
+            self._count_throttled()
+
+    async def acquire_async(self, url: str):
+        """Wait without blocking the event loop until a request may be sent.
+
+        :param url: The full request URL
+        """
+        import asyncio
+
+        throttled = False
+        for bucket in self._buckets(url):
+            delay = bucket.reserve()
+            if delay > 0:
+                throttled = True
+                await asyncio.sleep(delay)
+        if throttled:
+            self._count_throttled()
+
+
+def _wake(future: "asyncio.Future"):
+    """Resolve a waiter's future unless it has been cancelled already."""
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """An adaptive limit on the number of requests in flight.
+
+    The limit follows an additive-increase, multiplicative-decrease (AIMD)
+    scheme. While the limit is fully used and response times stay close to
+    their smoothed baseline, it grows by roughly one per round trip. A
+    throttling status code, a connection failure, or a response slower than
+    :code:`latency_tolerance` times the baseline shrinks it by
+    :code:`backoff_ratio`. Requests that started before the last decrease do
+    not shrink it again, so one burst of errors only counts once.
+
+    The limiter can be shared by threads and event loops, and reports its
+    current :code:`limit`, the requests :code:`inflight`, and the latency
+    :code:`baseline` in seconds.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        smoothing: float = DEFAULT_LATENCY_SMOOTHING,
+        statuses: Iterable[int] = THROTTLE_STATUSES,
+    ):
+        """Return a new :code:`ConcurrencyLimiter` instance.
+
+        :param initial_limit: The number of concurrent requests to start with
+        :param min_limit: The lowest the limit can shrink to
+        :param max_limit: The highest the limit can grow to
+        :param backoff_ratio: The factor to shrink the limit by on overload
+        :param latency_tolerance: The ratio to the baseline latency above which a
+            response counts as a latency spike
+        :param smoothing: The weight of a new sample in the latency baseline
+        :param statuses: The HTTP status codes signalling overload
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("The limits must satisfy 1 <= min <= initial <= max")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.statuses = frozenset(statuses)
+
+        self.inflight = 0
+        self.baseline = None
+
+        self._limit = float(initial_limit)
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        self._waiters = []  # futures of coroutines waiting for a free slot
+
+    @property
+    def limit(self) -> int:
+        """Return the current maximum number of requests in flight."""
+        return int(self._limit)
+
+    def acquire(self):
+        """Block the calling thread until a request slot is free."""
+        with self._condition:
+            while self.inflight >= self.limit:
+                self._condition.wait()
+            self.inflight += 1
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request slot is free."""
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        while True:
+            with self._condition:
+                if self.inflight < self.limit:
+                    self.inflight += 1
+                    return
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def release(self, started: Optional[float] = None, status: Optional[int] = None):
+        """Free a request slot and adapt the limit to the request's outcome.
+
+        :param started: The monotonic start time of the request, or None if the
+            request was abandoned and should not affect the limit
+        :param status: The response's status code, or None if the request failed
+        """
+        with self._condition:
+            self.inflight -= 1
+            if started is not None:
+                self._update(started, status)
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _update(self, started: float, status: Optional[int]):
+        """Adapt the limit to a finished request, with the lock held.
+
+        :param started: The monotonic start time of the request
+        :param status: The response's status code, or None if the request failed
+        """
+        latency = time.monotonic() - started
+        overloaded = status is None or status in self.statuses
+        if not overloaded:
+            if self.baseline is None:
+                self.baseline = latency
+            overloaded = latency > self.baseline * self.latency_tolerance
+            self.baseline += self.smoothing * (latency - self.baseline)
+
+        if overloaded:
+            if started > self._last_decrease:
+                self._limit = max(self._limit * self.backoff_ratio, self.min_limit)
+                self._last_decrease = time.monotonic()
+        elif self.inflight + 1 >= self.limit:
+            # only grow while the current limit is actually in use
+            self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+
+    def call(self, request: Callable[[], Outcome]) -> Outcome:
+        """Perform a request once a slot is free and learn from its outcome.
+
+        :param request: A function performing the request once
+        :return: The status code, headers, and body of the response
+        """
+        self.acquire()
+        started, status = time.monotonic(), None
+        try:
+            outcome = request()
+            status = outcome[0]
+            return outcome
+        finally:
+            self.release(started, status)
+
+    async def call_async(self, request: Callable[[], Awaitable[Outcome]]) -> Outcome:
+        """Perform an asynchronous request once a slot is free.
+
+        :param request: A coroutine function performing the request once
+        :return: The status code, headers, and body of the response
+        """
+        import asyncio
+
+        await self.acquire_async()
+        started, status = time.monotonic(), None
+        try:
+            outcome = await request()
+            status = outcome[0]
+            return outcome
+        except asyncio.CancelledError:
+            started = None
+            raise
+        finally:
+            self.release(started, status)
@@ -0,0 +1,203 @@
+"""This module contains the retry policy for failed API requests."""
+
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable, Mapping, Optional, Tuple
+
+import requests
+
+from web3data.deadline import current_deadline
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+# the status code, headers, and raw body of an HTTP response
+Outcome = Tuple[int, Mapping[str, str], bytes]
+
+
+def retry_exceptions() -> Tuple[type, ...]:
+    """Return the exception types retried by default.
+
+    The timeout and connection errors of asyncio and aiohttp are only included
+    once those modules are loaded, so the synchronous client never has to
+    import them.
+
+    :return: The connection error and timeout exception types
+    """
+    exceptions = RETRY_EXCEPTIONS
+    if "asyncio" in sys.modules:
+        exceptions += (sys.modules["asyncio"].TimeoutError,)
+    if "aiohttp" in sys.modules:
+        exceptions += (sys.modules["aiohttp"].ClientConnectionError,)
+    return exceptions
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse the value of a :code:`Retry-After` header.
+
+    :param value: The header value, either in seconds or as an HTTP date
+    :return: The number of seconds to wait, or None if the value is invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """A retry policy with exponential backoff for transient API failures.
+
+    Requests failing with one of the configured status codes or exceptions
+    are repeated up to :code:`max_attempts` times in total. The delay before
+    the n-th retry grows as :code:`backoff * 2 ** (n - 1)`, capped at
+    :code:`max_backoff`. With jitter enabled, a random delay between zero and
+    that value is chosen instead, so concurrent clients do not retry in lock
+    step. A :code:`Retry-After` header sent by the API takes precedence over
+    the computed delay.
+
+    No retry is scheduled if it could not start before the active deadline.
+    A single policy can be shared by all handlers of a client, and counts the
+    retries and the requests it gave up on.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        jitter: bool = True,
+        statuses: Iterable[int] = RETRY_STATUSES,
+        exceptions: Optional[Tuple[type, ...]] = None,
+        respect_retry_after: bool = True,
+    ):
+        """Return a new :code:`RetryPolicy` instance.
+
+        :param max_attempts: The maximum number of attempts per request
+        :param backoff: The delay in seconds before the first retry
+        :param max_backoff: The maximum computed delay in seconds
+        :param jitter: Whether to randomize the delay between zero and its maximum
+        :param statuses: The HTTP status codes to retry
+        :param exceptions: The exception types to retry, by default connection
+            errors and timeouts
+        :param respect_retry_after: Whether to wait as long as the API's
+            :code:`Retry-After` header asks for
+        """
+        if max_attempts < 1:
+            raise ValueError("A retry policy needs at least one attempt")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.exceptions = tuple(exceptions) if exceptions is not None else None
+        self.respect_retry_after = respect_retry_after
+
+        self.retries = 0
+        self.give_ups = 0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Return the number of seconds to wait after a failed attempt.
+
+        :param attempt: The one-based number of the failed attempt
+        :param retry_after: The failed response's :code:`Retry-After` header
+        :return: The delay before the next attempt
+        """
+        if self.respect_retry_after:
+            requested = parse_retry_after(retry_after)
+            if requested is not None:
+                return requested
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _next_delay(
+        self, attempt: int, outcome: Optional[Outcome], error: Optional[Exception]
+    ) -> Optional[float]:
+        """Decide whether to retry an attempt and how long to wait before.
+
+        :param attempt: The one-based number of the attempt
+        :param outcome: The attempt's response, if one was received
+        :param error: The exception raised by the attempt, if any
+        :return: The delay before the next attempt, or None to stop retrying
+        """
+        if error is None and outcome[0] not in self.statuses:
+            return None
+        delay = None
+        if attempt < self.max_attempts:
+            headers = outcome[1] if outcome is not None else {}
+            delay = self.delay(attempt, headers.get("Retry-After"))
+            deadline = current_deadline()
+            if deadline is not None and delay >= deadline.remaining():
+                # the next attempt could not start before the deadline
+                delay = None
+        with self._lock:
+            if delay is None:
+                self.give_ups += 1
+            else:
+                self.retries += 1
+        return delay
+
+    def call(self, request: Callable[[], Outcome]) -> Outcome:
+        """Perform a request, retrying it according to the policy.
+
+        If the last attempt still fails with a retryable status code, its
+        response is returned. If it raises, the exception is propagated.
+
+        :param request: A function performing the request once
+        :return: The status code, headers, and body of the final response
+        """
+        exceptions = retry_exceptions() if self.exceptions is None else self.exceptions
+        attempt = 1
+        while True:
+            outcome, error = None, None
+            try:
+                outcome = request()
+            except exceptions as exc:
+                error = exc
+            delay = self._next_delay(attempt, outcome, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return outcome
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, request: Callable[[], Awaitable[Outcome]]) -> Outcome:
+        """Perform an asynchronous request, retrying it according to the policy.
+
+        :param request: A coroutine function performing the request once
+        :return: The status code, headers, and body of the final response
+        """
+        import asyncio
+
+        exceptions = retry_exceptions() if self.exceptions is None else self.exceptions
+        attempt = 1
+        while True:
+            outcome, error = None, None
+            try:
+                outcome = await request()
+            except exceptions as exc:
+                error = exc
+            delay = self._next_delay(attempt, outcome, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return outcome
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,90 @@
+"""This module contains helpers to create pooled HTTP sessions."""
+
+from typing import TYPE_CHECKING
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_ASYNC_POOL_SIZE = 100
+
+
+def create_session(
+    pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True
+) -> requests.Session:
+    """Return a new HTTP session with a connection pool attached.
+
+    The session keeps connections to the API hosts open between requests,
+    so subsequent queries skip the TCP and TLS handshakes. It is safe to
+    share a single session across all handlers of a client.
+
+    :param pool_size: The maximum number of connections to keep per host
+    :param keep_alive: Whether to reuse connections across requests
+    :return: The configured session instance
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def _import_aiohttp():
+    """Import aiohttp on first use, as only the async client needs it.
+
+    :return: The aiohttp module
+    """
+    try:
+        import aiohttp
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            "The async client requires aiohttp, install it with "
+            "'pip install web3data[async]'"
+        )
+    return aiohttp
+
+
+class AsyncSession:
+    """A lazily opened, pooled :code:`aiohttp` session.
+
+    An :code:`aiohttp.ClientSession` must be created inside a running event
+    loop. This wrapper defers its creation to the first request, so async
+    handlers can be built synchronously and still share one connection pool.
+    """
+
+    def __init__(
+        self, pool_size: int = DEFAULT_ASYNC_POOL_SIZE, keep_alive: bool = True
+    ):
+        """Return a new :code:`AsyncSession` instance.
+
+        :param pool_size: The maximum number of simultaneous connections, further
+            requests wait for a free connection
+        :param keep_alive: Whether to reuse connections across requests
+        """
+        _import_aiohttp()  # fail early if it is not installed
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self._client = None
+
+    @property
+    def client(self) -> "aiohttp.ClientSession":
+        """Return the underlying client session, opening it if necessary."""
+        if self._client is None or self._client.closed:
+            aiohttp = _import_aiohttp()
+            self._client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size, force_close=not self.keep_alive
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Close the underlying client session and its connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
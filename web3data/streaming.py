@@ -0,0 +1,223 @@
+"""This module contains the incremental parser for streamed API responses."""
+
+import codecs
+import csv
+import json
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+RECORDS_PATH = ("payload", "records")
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the characters that can follow a valid prefix of a number within the number
+NUMBER_CONTINUATION = frozenset("0123456789.eE+-")
+
+# the parser states
+_VALUE = "value"  # expecting the value of the next object on the path
+_MEMBERS = "members"  # inside an object on the path, expecting its members
+_ITEMS = "items"  # inside the target array, expecting its items
+
+
+class RecordParser:
+    """An incremental parser for the items of one array in a JSON document.
+
+    The document is fed in chunks as they arrive from the network, and every
+    item of the array at :code:`path` is returned as soon as it is complete.
+    Only the item currently being received is buffered, so memory usage does
+    not depend on the size of the document. Members outside the path are
+    skipped, and everything after the array is ignored.
+
+    Items are decoded with the standard library's :code:`json` module, as the
+    faster backends of :code:`web3data.jsonlib` cannot decode partial input.
+    """
+
+    def __init__(self, path: Sequence[str] = RECORDS_PATH):
+        """Return a new :code:`RecordParser` instance.
+
+        :param path: The object keys leading from the document root to the array
+        """
+        self.path = tuple(path)
+        self.done = False
+
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._depth = 0  # the number of objects on the path entered so far
+        self._state = _VALUE
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Parse the next chunk of the document.
+
+        :param chunk: The raw bytes received
+        :return: The array items completed by this chunk
+        """
+        if self.done:
+            return []
+        self._buffer += self._text.decode(chunk)
+        return self._advance(final=False)
+
+    def close(self) -> List[Any]:
+        """Finish parsing once the whole document has been received.
+
+        :return: The array items completed by the end of the document
+        """
+        if self.done:
+            return []
+        self._buffer += self._text.decode(b"", final=True)
+        items = self._advance(final=True)
+        if not self.done:
+            raise ValueError(f"Incomplete JSON document: {self._buffer[:100]}")
+        return items
+
+    def _decode(self, buffer: str, pos: int, final: bool) -> Tuple[Any, Optional[int]]:
+        """Decode a complete JSON value from the buffer.
+
+        :param buffer: The text received but not yet consumed
+        :param pos: The index the value starts at
+        :param final: Whether the whole document has been received
+        :return: The value and the index after it, or None if more data is needed
+        """
+        try:
+            value, end = self._decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None, None
+        if (
+            not final
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+        ):
+            # the decoder accepts truncated numbers, e.g. "12" of "12.5", so a
+            # number ending at the buffer's end, or followed by a character
+            # that would continue it, may be completed by the next chunk
+            if end == len(buffer) or buffer[end] in NUMBER_CONTINUATION:
+                return None, None
+        return value, end
+
+    def _advance(self, final: bool) -> List[Any]:
+        """Consume as much of the buffer as possible.
+
+        :param final: Whether the whole document has been received
+        :return: The array items completed so far
+        """
+        items = []
+        buffer, pos = self._buffer, 0
+        while not self.done:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+
+            if self._state is _ITEMS:
+                if char == "]":
+                    self.done = True
+                elif char == ",":
+                    pos += 1
+                else:
+                    item, end = self._decode(buffer, pos, final)
+                    if end is None:
+                        break
+                    items.append(item)
+                    pos = end
+            elif self._state is _MEMBERS:
+                if char == "}":
+                    # the object ended without containing the path
+                    self.done = True
+                elif char == ",":
+                    pos += 1
+                else:
+                    key, end = self._decode(buffer, pos, final)
+                    if end is None:
+                        break
+                    colon = WHITESPACE.match(buffer, end).end()
+                    if colon == len(buffer):
+                        break
+                    if not isinstance(key, str) or buffer[colon] != ":":
+                        raise ValueError(f"Invalid JSON object member at {pos}")
+                    if key == self.path[self._depth]:
+                        self._depth += 1
+                        self._state = _VALUE
+                        pos = colon + 1
+                        continue
+                    start = WHITESPACE.match(buffer, colon + 1).end()
+                    _, end = self._decode(buffer, start, final)
+                    if end is None:
+                        break
+                    pos = end
+            else:
+                expected = "[" if self._depth == len(self.path) else "{"
+                if char == expected:
+                    self._state = _ITEMS if expected == "[" else _MEMBERS
+                    pos += 1
+                elif self._depth == 0:
+                    raise ValueError(f"Expected a JSON object: {buffer[:100]}")
+                else:
+                    # the path leads to a null or scalar value, so there are no items
+                    self.done = True
+
+        self._buffer = "" if self.done else buffer[pos:]
+        return items
+
+
+class CSVParser:
+    """An incremental parser for CSV documents.
+
+    The document is fed in chunks as they arrive from the network, and every
+    row is returned as soon as its line, or all lines of a row with quoted line
+    breaks, have been received. Undecodable bytes are replaced, as they are in
+    buffered CSV responses.
+    """
+
+    def __init__(self):
+        """Return a new :code:`CSVParser` instance."""
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""  # the last, incomplete line
+        self._lines = []  # complete lines of a row that is still quoted
+        self._quoted = False
+
+    def feed(self, chunk: bytes) -> List[List[str]]:
+        """Parse the next chunk of the document.
+
+        :param chunk: The raw bytes received
+        :return: The rows completed by this chunk
+        """
+        *lines, self._pending = (self._pending + self._text.decode(chunk)).split("\n")
+        return self._rows(lines)
+
+    def close(self) -> List[List[str]]:
+        """Finish parsing once the whole document has been received.
+
+        :return: The rows completed by the end of the document
+        """
+        last = self._pending + self._text.decode(b"", final=True)
+        self._pending = ""
+        rows = self._rows([last] if last else [])
+        if self._lines:
+            # an unterminated quote, parse the remainder leniently
+            if last:
+                self._lines[-1] = last
+            rows.extend(csv.reader(self._lines))
+            self._lines = []
+        return rows
+
+    def _rows(self, lines: List[str]) -> List[List[str]]:
+        """Parse the complete lines received so far.
+
+        :param lines: The new lines, without their line break
+        :return: The rows made up of complete lines
+        """
+        complete = 0
+        for index, line in enumerate(lines):
+            # doubled quotes within a quoted field do not change the parity
+            if line.count('"') % 2:
+                self._quoted = not self._quoted
+            if not self._quoted:
+                complete = index + 1
+        if not complete:
+            self._lines.extend(line + "\n" for line in lines)
+            return []
+        rows = self._lines + [line + "\n" for line in lines[:complete]]
+        self._lines = [line + "\n" for line in lines[complete:]]
+        return list(csv.reader(rows))